@@ -0,0 +1,337 @@
+"""Asyncio HTTP/JSON API over DatabaseManager for concurrent local clients"""
+import asyncio
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+import campus_import
+from campus_export import EXPORT_COLUMNS
+
+
+TABLES = ('students', 'faculty', 'courses', 'rooms', 'timetable')
+
+ADDERS = {
+    'students': 'add_student',
+    'faculty': 'add_faculty',
+    'courses': 'add_course',
+    'rooms': 'add_room',
+}
+
+# Largest page a client may ask for; leave out limit to stream the whole table instead
+MAX_PAGE = 1000
+STREAM_BATCH = 1000
+MAX_BODY = 1024 * 1024
+MAX_BATCH = 100
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Stream:
+    """A response body produced piece by piece and sent with chunked transfer encoding"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+
+class CampusAPI:
+    """Routes HTTP requests to DatabaseManager calls run on a bounded thread pool.
+
+    Each pool thread keeps its own pooled SQLite connection, so reads run in parallel;
+    writes are serialised because SQLite allows a single writer anyway. Identical GET
+    requests that arrive while one is in flight share its result.
+    """
+
+    def __init__(self, db_manager, workers=8):
+        self.db_manager = db_manager
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='campus-api')
+        self.write_lock = None
+        self.inflight = {}
+        self.coalesced = 0
+
+    async def call(self, fn, *args, **kwargs):
+        """Run a blocking DatabaseManager call on the pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, functools.partial(fn, *args, **kwargs))
+
+    async def write(self, fn, *args, **kwargs):
+        if self.write_lock is None:
+            self.write_lock = asyncio.Lock()
+        async with self.write_lock:
+            return await self.call(fn, *args, **kwargs)
+
+    async def shared(self, key, fn, *args, **kwargs):
+        """Run a read once for every identical request waiting on it"""
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(self.call(fn, *args, **kwargs))
+        self.inflight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+
+    # Routing
+
+    async def handle(self, method, target, body=b''):
+        """Answer one request; returns (status, JSON-serialisable payload or Stream)"""
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        query = dict(parse_qsl(url.query))
+        if not parts or parts[0] != 'api':
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {url.path}")
+        parts = parts[1:]
+
+        if parts == ['stats'] and method == 'GET':
+            return HTTPStatus.OK, await self.shared(('stats',), self.db_manager.get_stats)
+        if parts == ['batch'] and method == 'POST':
+            return HTTPStatus.OK, await self.batch(self.parse_json(body))
+        if parts == ['timetable', 'generate'] and method == 'POST':
+            return HTTPStatus.OK, await self.generate(self.parse_json(body) if body else {})
+        if parts == ['timetable', 'versions'] and method == 'GET':
+            return HTTPStatus.OK, await self.versions()
+        if parts[:2] == ['timetable', 'versions'] and parts[3:] == ['activate'] and method == 'POST':
+            version_id = self.parse_int(parts[2], 'version')
+            repair = query.get('repair') in ('1', 'true')
+            active = await self.write(self.db_manager.activate_timetable_version, version_id, repair)
+            return HTTPStatus.OK, {'active': active,
+                                   'unscheduled': [list(item) for item in self.db_manager.unscheduled]}
+        if parts == ['timetable', 'diff'] and method == 'GET':
+            return HTTPStatus.OK, await self.diff(query)
+
+        if not parts or parts[0] not in TABLES or len(parts) > 2:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {url.path}")
+        table = parts[0]
+        if len(parts) == 1:
+            if method == 'GET':
+                return HTTPStatus.OK, await self.list_rows(table, query, url.query)
+            if method == 'POST' and table in ADDERS:
+                return HTTPStatus.CREATED, await self.add(table, self.parse_json(body))
+        else:
+            row_id = self.parse_int(parts[1], 'id')
+            if method == 'GET':
+                return HTTPStatus.OK, await self.get_row(table, row_id)
+            if method == 'DELETE':
+                if not await self.write(self.db_manager.delete_many, table, [row_id]):
+                    raise HTTPError(HTTPStatus.NOT_FOUND, f"No {table} row {row_id}")
+                return HTTPStatus.OK, {'deleted': row_id}
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {url.path}")
+
+    def parse_json(self, body):
+        try:
+            return json.loads(body or b'null')
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {str(e)}")
+
+    def parse_int(self, value, name):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+
+    def as_dict(self, table, row):
+        return dict(zip(EXPORT_COLUMNS[table], row))
+
+    def list_filters(self, table, query):
+        search = query.get('search')
+        filters = {column: query[column]
+                   for column in self.db_manager.FILTER_COLUMNS.get(table, ()) if column in query}
+        return search, filters
+
+    async def list_rows(self, table, query, query_string):
+        """A page of rows after an opaque cursor, or the whole table as a stream"""
+        search, filters = self.list_filters(table, query)
+        if 'limit' not in query:
+            return Stream(self.stream_rows(table, search, filters))
+
+        limit = min(max(self.parse_int(query['limit'], 'limit'), 1), MAX_PAGE)
+        after = None
+        if query.get('after'):
+            after = self.parse_json(query['after'])
+            if not isinstance(after, list):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "after must be a cursor from a previous page")
+        rows = await self.shared(('list', table, query_string), self.db_manager.get_page, table,
+                                 limit, after=after, search=search, filters=filters)
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = json.dumps(list(self.db_manager.page_key(table, rows[-1])))
+        return {'rows': [self.as_dict(table, row) for row in rows], 'next': next_cursor}
+
+    async def stream_rows(self, table, search, filters):
+        """Yield a JSON array of every matching row, one keyset batch at a time"""
+        yield b'['
+        after, first = None, True
+        while True:
+            rows = await self.call(self.db_manager.get_page, table, STREAM_BATCH, after=after,
+                                   search=search, filters=filters, cache=False)
+            if rows:
+                chunk = ','.join(json.dumps(self.as_dict(table, row)) for row in rows)
+                yield (chunk if first else ',' + chunk).encode()
+                first = False
+            if len(rows) < STREAM_BATCH:
+                break
+            after = self.db_manager.page_key(table, rows[-1])
+        yield b']'
+
+    async def get_row(self, table, row_id):
+        rows = await self.shared(('get', table, row_id), self.db_manager.get_rows, table, [row_id])
+        if not rows:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No {table} row {row_id}")
+        return self.as_dict(table, rows[0])
+
+    async def add(self, table, record):
+        try:
+            row = campus_import.validate_record(table, record)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        row_id = await self.write(getattr(self.db_manager, ADDERS[table]), *row)
+        return {'id': row_id}
+
+    async def generate(self, options):
+        if not isinstance(options, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected a JSON object")
+        if options.get('optimise'):
+            count = await self.write(self.db_manager.optimise_timetable,
+                                     time_budget=float(options.get('time_budget', 10.0)))
+        else:
+            count = await self.write(self.db_manager.generate_timetable)
+        return {'entries': count, 'unscheduled': len(self.db_manager.unscheduled)}
+
+    async def versions(self):
+        rows = await self.call(self.db_manager.get_timetable_versions)
+        return [dict(zip(('version_id', 'created_at', 'source', 'sessions', 'unscheduled', 'score',
+                          'active'), row[:6] + (bool(row[6]),))) for row in rows]
+
+    async def diff(self, query):
+        old = self.parse_int(query.get('from'), 'from')
+        new = self.parse_int(query['to'], 'to') if 'to' in query else None
+        diff = await self.call(self.db_manager.diff_timetable_versions, old, new)
+        session = ('faculty_id', 'room_id', 'day', 'slot_id')
+        return {
+            'moved': [{'course_id': course_id, 'from': dict(zip(session, before)),
+                       'to': dict(zip(session, after))}
+                      for course_id, before, after in diff['moved']],
+            'added': [dict(zip(('course_id',) + session, row)) for row in diff['added']],
+            'removed': [dict(zip(('course_id',) + session, row)) for row in diff['removed']],
+        }
+
+    async def batch(self, requests):
+        """Answer several requests in one round trip; reads among them run concurrently"""
+        if not isinstance(requests, list) or len(requests) > MAX_BATCH:
+            raise HTTPError(HTTPStatus.BAD_REQUEST,
+                            f"Expected a list of at most {MAX_BATCH} requests")
+
+        async def one(request):
+            try:
+                method = request.get('method', 'GET').upper()
+                body = json.dumps(request['body']).encode() if 'body' in request else b''
+                status, payload = await self.handle(method, request['path'], body)
+                if isinstance(payload, Stream):
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Batched lists need a limit")
+            except HTTPError as e:
+                status, payload = e.status, {'error': str(e)}
+            except (AttributeError, KeyError, TypeError):
+                status, payload = HTTPStatus.BAD_REQUEST, {'error': "Malformed batch entry"}
+            except (ValueError, LookupError) as e:
+                status, payload = HTTPStatus.BAD_REQUEST, {'error': str(e)}
+            return {'status': int(status), 'body': payload}
+
+        return await asyncio.gather(*(one(request) for request in requests))
+
+    # HTTP/1.1 transport
+
+    async def serve_connection(self, reader, writer):
+        """Read requests off one keep-alive connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, {'error': "Bad request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (version == 'HTTP/1.1'
+                              and headers.get('connection', '').lower() != 'close')
+
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY:
+                    await self.respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                       {'error': "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self.handle(method.upper(), target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except ValueError as e:
+                    status, payload = HTTPStatus.BAD_REQUEST, {'error': str(e)}
+                except Exception as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        status = HTTPStatus(status)
+        head = [f"HTTP/1.1 {status.value} {status.phrase}",
+                "Content-Type: application/json",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if isinstance(payload, Stream):
+            head.append("Transfer-Encoding: chunked")
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+            async for chunk in payload.chunks:
+                writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                # Let a slow client apply back-pressure instead of buffering the table
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+        else:
+            body = json.dumps(payload).encode()
+            head.append(f"Content-Length: {len(body)}")
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        return await asyncio.start_server(self.serve_connection, host, port, backlog=1024)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+def serve(db_manager, host='127.0.0.1', port=8080, workers=8):
+    """Run the API until interrupted"""
+    api = CampusAPI(db_manager, workers)
+
+    async def run():
+        server = await api.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
@@ -0,0 +1,126 @@
+"""Benchmarks of DatabaseManager and timetable generation on synthetic campuses.
+
+    python campus_bench.py --scales 1000,10000,100000 --output bench.json
+
+Prints (or writes) one JSON document so runs of different versions can be diffed.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import campus_synth
+from campus_db import DatabaseManager
+
+
+DEFAULT_SCALES = (1000, 10000, 100000)
+
+
+def timed(fn, repeat=1):
+    """Best wall-clock time of fn over repeat runs, and its last result"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def revision():
+    """Short git revision of the code under test, if it is a checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_scale(students, seed, repeat, directory, log):
+    """Run every benchmark on a fresh database of the given size"""
+    path = os.path.join(directory, f"bench_{students}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    db_manager = DatabaseManager(path)
+    timings = {}
+
+    def measure(name, fn, cold=True):
+        if cold:
+            db_manager.clear_cache()
+        timings[name], result = timed(fn, 1 if cold else repeat)
+        log(f"  {name}: {timings[name] * 1000:.1f} ms")
+        return result
+
+    log(f"{students} students")
+    # The sample rows in a new database are left in; they are a rounding error at scale
+    rows = measure('insert', lambda: campus_synth.generate_campus(db_manager, students, seed))
+    for table in ('students', 'faculty', 'courses', 'rooms'):
+        getter = getattr(db_manager, f'get_all_{table}')
+        measure(f'get_all_{table}', getter)
+        measure(f'get_all_{table}_cached', getter, cold=False)
+    measure('course_conflicts', db_manager.course_conflicts)
+    sessions = measure('generate_timetable', db_manager.generate_timetable)
+    unscheduled = len(db_manager.unscheduled)
+    clashes = len(measure('clash_report', db_manager.student_clash_report))
+    measure('get_timetable', db_manager.get_timetable)
+    measure('get_timetable_page', lambda: db_manager.get_page('timetable', 100, offset=sessions // 2))
+    measure('range_query', lambda: db_manager.find_sessions(('Tue', 'Thu'), '10:00', '14:00'))
+    measure('stats', db_manager.get_stats)
+    measure('stats_cached', db_manager.get_stats, cold=False)
+    measure('search', lambda: db_manager.get_page('students', 50, search='Priya'))
+    db_manager.close()
+    os.remove(path)
+
+    return {
+        'scale': students,
+        'rows': rows,
+        'sessions': sessions,
+        'unscheduled': unscheduled,
+        'clashes': clashes,
+        'timings': {name: round(seconds, 6) for name, seconds in timings.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the campus data layer")
+    parser.add_argument('--scales', default=','.join(str(s) for s in DEFAULT_SCALES),
+                        help="comma-separated student counts")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help="runs of each cached benchmark")
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    parser.add_argument('--dir', help="directory for the scratch databases")
+    args = parser.parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    scales = [int(scale) for scale in args.scales.split(',') if scale]
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        results = [bench_scale(scale, args.seed, args.repeat, directory, log) for scale in scales]
+
+    report = {
+        'revision': revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
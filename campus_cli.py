@@ -0,0 +1,349 @@
+"""Command line interface for scripted and scheduled use, without loading Tk"""
+import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import json
+import sqlite3
+import sys
+
+from campus_db import DatabaseManager
+
+
+def cmd_import(db_manager, args):
+    """Bulk import a CSV or JSON Lines file"""
+    import campus_import
+
+    result = campus_import.import_file(db_manager, args.entity, args.path, fmt=args.format,
+                                       chunk_size=args.chunk_size, reject_file=args.rejects)
+    print(result.summary())
+    for line_no, reason in result.rejected[:10]:
+        print(f"  line {line_no}: {reason}", file=sys.stderr)
+    return 0
+
+
+def cmd_export(db_manager, args):
+    """Stream a table out to a CSV or JSON Lines file"""
+    import campus_export
+
+    count = campus_export.export_file(db_manager, args.table, args.path, fmt=args.format,
+                                      skip_unchanged=args.skip_unchanged)
+    if count is None:
+        print(f"{args.table}: unchanged since the last export to {args.path}")
+    else:
+        print(f"{args.table}: {count} rows exported to {args.path}")
+    return 0
+
+
+def cmd_calendars(db_manager, args):
+    """Write iCalendar feeds per room, faculty member or student cohort"""
+    import datetime
+    import campus_export
+
+    term_start = datetime.date.fromisoformat(args.term_start) if args.term_start else None
+    counts = campus_export.export_calendars(db_manager, args.kind, args.directory,
+                                            term_start=term_start, weeks=args.weeks,
+                                            workers=args.workers, skip_unchanged=not args.force)
+    if counts is None:
+        print(f"{args.kind} calendars in {args.directory} are up to date")
+    else:
+        print(f"{len(counts)} {args.kind} calendars, {sum(counts.values())} events "
+              f"written to {args.directory}")
+    return 0
+
+
+def cmd_generate(db_manager, args):
+    """Rebuild the timetable"""
+    if args.keep is not None:
+        db_manager.keep_versions = args.keep
+    if args.optimise:
+        count = db_manager.optimise_timetable(starts=args.starts, workers=args.workers,
+                                              seed=args.seed, time_budget=args.time_budget)
+        print(f"Optimised timetable with {count} entries "
+              f"(penalty score {db_manager.last_score['total']:.1f})")
+    else:
+        count = db_manager.generate_timetable()
+        print(f"Timetable generated with {count} entries")
+    print(f"Version {db_manager.active_timetable_version()} is now active")
+    if db_manager.unscheduled:
+        print(f"{len(db_manager.unscheduled)} sessions could not be placed", file=sys.stderr)
+    return 0
+
+
+def cmd_versions(db_manager, args):
+    """List, compare, switch between, snapshot or prune timetable versions"""
+    if args.action == 'list':
+        for version_id, created, source, sessions, unscheduled, score, active in \
+                db_manager.get_timetable_versions():
+            extra = f", score {score:.1f}" if score is not None else ""
+            print(f"{'*' if active else ' '} {version_id}: {source} {created} UTC, {sessions} sessions"
+                  f"{extra}")
+    elif args.action == 'activate':
+        if len(args.versions) != 1:
+            raise ValueError("activate takes one version id")
+        active = db_manager.activate_timetable_version(args.versions[0], repair=args.repair)
+        if active != args.versions[0]:
+            print(f"Restored version {args.versions[0]} as version {active}")
+        print(f"Version {active} is now active")
+        for course_id, reason in db_manager.unscheduled:
+            print(f"  unscheduled course {course_id}: {reason}")
+    elif args.action == 'diff':
+        if len(args.versions) not in (1, 2):
+            raise ValueError("diff takes a version id and optionally a second one (default the active)")
+        diff = db_manager.diff_timetable_versions(*args.versions)
+        for course_id, before, after in diff['moved']:
+            print(f"  moved   course {course_id}: {describe_session(before)} -> {describe_session(after)}")
+        for kind in ('added', 'removed'):
+            for row in diff[kind]:
+                print(f"  {kind:<7} course {row[0]}: {describe_session(row[1:])}")
+        print(f"{len(diff['moved'])} moved, {len(diff['added'])} added, {len(diff['removed'])} removed")
+    elif args.action == 'snapshot':
+        print(f"Saved the active timetable as version {db_manager.snapshot_timetable()}")
+    else:
+        pruned = db_manager.prune_timetable_versions(args.keep)
+        print(f"{len(pruned)} versions deleted")
+    return 0
+
+
+def describe_session(session):
+    import campus_scheduler
+
+    faculty_id, room_id, day, slot_id = session
+    return f"{campus_scheduler.WEEKDAYS[day][:3]} slot {slot_id} room {room_id} faculty {faculty_id}"
+
+
+def cmd_enroll(db_manager, args):
+    """Enroll (or with --remove, unenroll) the student_id/course_id pairs of a file"""
+    import campus_import
+
+    pairs = []
+    for line_no, record in campus_import.read_records(args.path, args.format):
+        try:
+            pairs.append((int(record['student_id']), int(record['course_id'])))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"line {line_no}: expected integer student_id and course_id")
+    if args.remove:
+        print(f"{db_manager.unenroll(pairs)} of {len(pairs)} enrollments removed")
+    else:
+        print(f"{db_manager.enroll(pairs)} of {len(pairs)} enrollments added")
+    return 0
+
+
+def cmd_clashes(db_manager, args):
+    """Report students timetabled into two classes at once"""
+    report = db_manager.student_clash_report()
+    students = {row[0] for row in report}
+    print(f"{len(students)} students with {len(report)} clashes")
+    for student_id, course_id, other_id, day, time_slot in report[:args.limit]:
+        print(f"  student {student_id}: courses {course_id} and {other_id} on {day} {time_slot}")
+    return 1 if report and args.check else 0
+
+
+def cmd_sessions(db_manager, args):
+    """List the timetable sessions on some days and between two times"""
+    days = [day for day in args.days.split(',') if day] if args.days else None
+    rows = db_manager.find_sessions(days, args.start, args.end)
+    for row in rows[:args.limit]:
+        print(f"  {row[5]} {row[6]}: {row[1]} {row[2]} ({row[3]}, {row[4]})")
+    print(f"{len(rows)} sessions")
+    return 0
+
+
+def cmd_delete(db_manager, args):
+    """Delete rows by id, or every row matching the filters, in one transaction"""
+    ids = list(args.ids)
+    if args.filter:
+        filters = {}
+        for item in args.filter:
+            column, _, value = item.partition('=')
+            if not column or not value:
+                raise ValueError(f"--filter needs COLUMN=VALUE, got {item!r}")
+            filters[column] = value
+        id_column = db_manager.ID_COLUMNS[args.table]
+        clauses, params = db_manager.search_condition(args.table, None, filters)
+        ids += [row[0] for row in db_manager.execute_query(
+            f"SELECT {id_column} FROM {args.table} WHERE {' AND '.join(clauses)}", tuple(params))]
+    if not ids:
+        raise ValueError("Nothing to delete: give ids or --filter")
+    print(f"{db_manager.delete_many(args.table, ids)} {args.table} deleted")
+    return 0
+
+
+def cmd_stats(db_manager, args):
+    """Print the dashboard statistics"""
+    stats = db_manager.get_stats()
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return 0
+    for key in ('students', 'faculty', 'courses', 'rooms', 'sessions'):
+        print(f"{key.title()}: {stats[key]}")
+    print(f"Room utilisation: {stats['room_utilisation']:.1f}%")
+    print(f"Timetable clashes: {stats['conflicts']}")
+    for department, heads in stats['departments'].items():
+        print(f"  {department or 'No department'}: {heads['students']} students, "
+              f"{heads['faculty']} faculty")
+    return 0
+
+
+def cmd_synth(db_manager, args):
+    """Add a deterministic synthetic campus of the given size"""
+    import campus_synth
+
+    counts = campus_synth.generate_campus(db_manager, args.students, seed=args.seed)
+    print(', '.join(f"{count} {table}" for table, count in counts.items()) + " added")
+    return 0
+
+
+def cmd_serve(db_manager, args):
+    """Serve the HTTP/JSON API until interrupted"""
+    import campus_api
+
+    print(f"Serving on http://{args.host}:{args.port}/api/", file=sys.stderr)
+    campus_api.serve(db_manager, args.host, args.port, args.workers)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='campus', description="Campus management system")
+    parser.add_argument('--db', default="campus_management.db", help="database file")
+    parser.add_argument('--timing', action='store_true',
+                        help="report start-up and command time on stderr")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="record query and operation timings and write them to PATH "
+                             "on exit (Prometheus text if it ends in .prom, JSON otherwise)")
+    parser.add_argument('--slow-ms', type=float, default=100.0,
+                        help="with --metrics, log statements slower than this with their query plan")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    entities = ('students', 'faculty', 'courses', 'rooms')
+    sub = commands.add_parser('import', help="bulk import students, faculty, courses or rooms")
+    sub.add_argument('entity', choices=entities)
+    sub.add_argument('path')
+    sub.add_argument('--format', choices=('csv', 'jsonl'))
+    sub.add_argument('--chunk-size', type=int, default=5000)
+    sub.add_argument('--rejects', help="write rejected rows to this JSON Lines file")
+    sub.set_defaults(handler=cmd_import)
+
+    sub = commands.add_parser('export', help="export a table or the timetable")
+    sub.add_argument('table', choices=entities + ('timetable',))
+    sub.add_argument('path')
+    sub.add_argument('--format', choices=('csv', 'jsonl'))
+    sub.add_argument('--skip-unchanged', action='store_true',
+                     help="do nothing if the table has not changed since the last export")
+    sub.set_defaults(handler=cmd_export)
+
+    sub = commands.add_parser('calendars', help="write iCalendar feeds of the timetable")
+    sub.add_argument('kind', choices=('room', 'faculty', 'cohort'))
+    sub.add_argument('directory')
+    sub.add_argument('--term-start', help="first day of term, YYYY-MM-DD (default this week)")
+    sub.add_argument('--weeks', type=int, default=15)
+    sub.add_argument('--workers', type=int)
+    sub.add_argument('--force', action='store_true', help="rewrite feeds even if unchanged")
+    sub.set_defaults(handler=cmd_calendars)
+
+    sub = commands.add_parser('generate-timetable', help="rebuild the timetable")
+    sub.add_argument('--optimise', action='store_true',
+                     help="run a parallel multi-start search instead of a single pass")
+    sub.add_argument('--starts', type=int)
+    sub.add_argument('--workers', type=int)
+    sub.add_argument('--seed', type=int, default=0)
+    sub.add_argument('--time-budget', type=float, default=10.0)
+    sub.add_argument('--keep', type=int, help="older timetable versions to keep (default 10)")
+    sub.set_defaults(handler=cmd_generate)
+
+    sub = commands.add_parser('versions', help="list, diff, activate, snapshot or prune timetable versions")
+    sub.add_argument('action', nargs='?', default='list',
+                     choices=('list', 'diff', 'activate', 'snapshot', 'prune'))
+    sub.add_argument('versions', nargs='*', type=int)
+    sub.add_argument('--keep', type=int, default=10, help="versions prune leaves besides the active one")
+    sub.add_argument('--repair', action='store_true',
+                     help="activate a copy, placing sessions lost to deletes since the version was made")
+    sub.set_defaults(handler=cmd_versions)
+
+    sub = commands.add_parser('enroll', help="bulk enroll students from a student_id,course_id file")
+    sub.add_argument('path')
+    sub.add_argument('--format', choices=('csv', 'jsonl'))
+    sub.add_argument('--remove', action='store_true', help="unenroll the listed pairs instead")
+    sub.set_defaults(handler=cmd_enroll)
+
+    sub = commands.add_parser('clashes', help="list students with two classes at the same time")
+    sub.add_argument('--limit', type=int, default=20, help="clashes to print")
+    sub.add_argument('--check', action='store_true', help="exit with status 1 if there are any")
+    sub.set_defaults(handler=cmd_clashes)
+
+    sub = commands.add_parser('sessions', help="list timetable sessions by day and time range")
+    sub.add_argument('--days', help="comma-separated day names or prefixes, e.g. Tue,Thu")
+    sub.add_argument('--from', dest='start', help="sessions ending after this time (HH:MM, 24-hour)")
+    sub.add_argument('--to', dest='end', help="sessions starting before this time (HH:MM, 24-hour)")
+    sub.add_argument('--limit', type=int, default=50, help="sessions to print")
+    sub.set_defaults(handler=cmd_sessions)
+
+    sub = commands.add_parser('delete', help="delete rows and everything that depends on them")
+    sub.add_argument('table', choices=entities + ('timetable',))
+    sub.add_argument('ids', nargs='*', type=int)
+    sub.add_argument('--filter', action='append', metavar='COLUMN=VALUE',
+                     help="delete the rows matching a tab filter, e.g. semester=8 (repeatable)")
+    sub.set_defaults(handler=cmd_delete)
+
+    sub = commands.add_parser('stats', help="print summary statistics")
+    sub.add_argument('--json', action='store_true')
+    sub.set_defaults(handler=cmd_stats)
+
+    sub = commands.add_parser('synth', help="add synthetic students, faculty, courses and rooms")
+    sub.add_argument('--students', type=int, default=10000)
+    sub.add_argument('--seed', type=int, default=0)
+    sub.set_defaults(handler=cmd_synth)
+
+    sub = commands.add_parser('serve', help="run the HTTP/JSON API for local clients")
+    sub.add_argument('--host', default='127.0.0.1')
+    sub.add_argument('--port', type=int, default=8080)
+    sub.add_argument('--workers', type=int, default=8, help="database worker threads")
+    sub.set_defaults(handler=cmd_serve)
+
+    commands.add_parser('gui', help="open the desktop application")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    metrics = None
+    if args.metrics:
+        import campus_metrics
+        metrics = campus_metrics.Metrics(slow_threshold=args.slow_ms / 1000)
+
+    if args.command == 'gui':
+        # The only command that needs Tk, so it is the only one that imports it
+        import campus_mgt_sys
+        db_manager = DatabaseManager(args.db, metrics=metrics)
+        campus_mgt_sys.main(db_manager=db_manager)
+        if metrics is not None:
+            db_manager.write_metrics(args.metrics)
+        return 0
+
+    try:
+        db_manager = DatabaseManager(args.db, metrics=metrics)
+    except sqlite3.Error as e:
+        print(f"Error: cannot open {args.db}: {str(e)}", file=sys.stderr)
+        return 1
+    ready = time.perf_counter()
+    try:
+        status = args.handler(db_manager, args)
+    except (OSError, ValueError, RuntimeError, sqlite3.Error) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        status = 1
+    finally:
+        db_manager.close()
+    if metrics is not None:
+        db_manager.write_metrics(args.metrics)
+        if metrics.slow_count:
+            print(f"{metrics.slow_count} statements took over {args.slow_ms:g} ms; "
+                  f"see {args.metrics}", file=sys.stderr)
+    if args.timing:
+        print(f"start-up {(ready - STARTED) * 1000:.1f} ms, "
+              f"{args.command} {(time.perf_counter() - ready) * 1000:.1f} ms", file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
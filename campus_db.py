@@ -0,0 +1,1801 @@
+"""SQLite data layer: connection pooling, caching, change events and scheduling entry points"""
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from itertools import combinations
+
+import campus_metrics
+import campus_scheduler
+
+
+READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.IGNORECASE)
+WRITE_TABLE = re.compile(r"^\s*(?:INSERT|REPLACE)(?:\s+OR\s+\w+)?\s+INTO\s+(\w+)"
+                         r"|^\s*UPDATE(?:\s+OR\s+\w+)?\s+(\w+)"
+                         r"|^\s*DELETE\s+FROM\s+(\w+)", re.IGNORECASE)
+
+# Tables a DELETE also writes through the schema's ON DELETE CASCADE / SET NULL rules
+DELETE_CASCADES = {
+    'students': ('enrollments',),
+    'faculty': ('courses', 'timetable'),
+    'courses': ('enrollments', 'timetable'),
+    'rooms': ('timetable',),
+    'timetable_versions': ('timetable',),
+}
+
+
+@lru_cache(maxsize=1024)
+def query_tables(query):
+    """Classify a statement as ('read' | 'write' | 'schema' | 'other', tables it reads or writes)"""
+    match = WRITE_TABLE.match(query)
+    if match:
+        tables = {name.lower() for name in match.groups() if name}
+        if match.group(3):
+            tables.update(DELETE_CASCADES.get(match.group(3).lower(), ()))
+        return 'write', frozenset(tables)
+    if re.match(r"\s*(SELECT|WITH)\b", query, re.IGNORECASE):
+        return 'read', frozenset(name.lower() for name in READ_TABLES.findall(query))
+    if re.match(r"\s*(CREATE|DROP|ALTER)\b", query, re.IGNORECASE):
+        return 'schema', frozenset()
+    return 'other', frozenset()
+
+
+def remove_database_files(path):
+    """Delete a database file along with its WAL and shared-memory files"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+class QueryCache:
+    """LRU cache of query results, bounded by entry count and approximate size in bytes"""
+
+    def __init__(self, max_entries=512, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.by_table = {}
+        self.size = 0
+        # Bumped on every invalidation so a read that raced a write is not stored
+        self.epoch = 0
+        self.versions = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, rows, tables, epoch):
+        size = self.estimate(rows)
+        with self.lock:
+            if epoch != self.epoch or size > self.max_bytes or key in self.entries:
+                return
+            self.entries[key] = (rows, tables, size)
+            self.size += size
+            for table in tables:
+                self.by_table.setdefault(table, set()).add(key)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self.drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def drop(self, key):
+        rows, tables, size = self.entries.pop(key)
+        self.size -= size
+        for table in tables:
+            keys = self.by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def invalidate(self, tables):
+        """Forget every result that read one of the tables"""
+        with self.lock:
+            self.epoch += 1
+            for table in tables:
+                for key in self.by_table.pop(table, ()):
+                    if key in self.entries:
+                        self.drop(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.epoch += 1
+            self.entries.clear()
+            self.by_table.clear()
+            self.size = 0
+
+    def sync_versions(self, versions):
+        """Invalidate the tables whose change counters moved since the last sync"""
+        previous, self.versions = self.versions, versions
+        if previous is not None:
+            changed = [table for table, version in versions.items()
+                       if previous.get(table) != version]
+            if changed:
+                self.invalidate(changed)
+
+    def estimate(self, rows):
+        """Rough memory footprint of a result, extrapolated from its first row"""
+        size = sys.getsizeof(rows)
+        if rows:
+            first = rows[0]
+            size += len(rows) * (sys.getsizeof(first) + sum(sys.getsizeof(v) for v in first))
+        return size
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'invalidations': self.invalidations, 'entries': len(self.entries),
+                    'bytes': self.size}
+
+
+class DatabaseManager:
+    # Size of the per-connection prepared statement cache
+    STATEMENT_CACHE_SIZE = 256
+
+    # Pragmas applied to every connection; journal_mode is set once per database file
+    DEFAULT_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,        # negative values are KiB, so ~64 MB
+        'mmap_size': 268435456,      # 256 MB
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+    }
+
+    # Integer primary key of each entity table
+    ID_COLUMNS = {
+        'students': 'student_id',
+        'faculty': 'faculty_id',
+        'courses': 'course_id',
+        'rooms': 'room_id',
+        'timetable': 'timetable_id',
+    }
+
+    # Tables whose writes bump a table_versions counter
+    VERSIONED_TABLES = tuple(ID_COLUMNS) + ('enrollments', 'time_slots', 'timetable_versions',
+                                            'active_timetable')
+
+    # day is 0 for Monday; slot_id refers to time_slots
+    TIMETABLE_COLUMNS = ('course_id', 'faculty_id', 'room_id', 'day', 'slot_id')
+
+    # The timetable holds every kept version; this picks out the rows of the active one
+    ACTIVE_VERSION = "(SELECT version_id FROM active_timetable)"
+
+    DAY_NAME = ("CASE t.day " + ' '.join(f"WHEN {day} THEN '{name}'" for day, name
+                                         in enumerate(campus_scheduler.WEEKDAYS)) + " END")
+
+    # Day name and slot label for display, then the day number and minutes to sort and compute on
+    TIMETABLE_SELECT = f'''SELECT t.timetable_id, c.course_code, c.course_name,
+                          f.name, r.room_name, {DAY_NAME}, s.label,
+                          t.day, s.start_minute, s.end_minute
+                          FROM active_timetable a
+                          JOIN timetable t ON t.version_id = a.version_id
+                          JOIN time_slots s ON t.slot_id = s.slot_id
+                          JOIN courses c ON t.course_id = c.course_id
+                          JOIN faculty f ON t.faculty_id = f.faculty_id
+                          JOIN rooms r ON t.room_id = r.room_id'''
+
+    # Paged listings: (select, key columns in sort order, positions of the key in a row)
+    PAGE_SOURCES = {
+        'students': ("SELECT * FROM students", ('student_id',), (0,)),
+        'faculty': ("SELECT * FROM faculty", ('faculty_id',), (0,)),
+        'courses': ("SELECT * FROM courses", ('course_id',), (0,)),
+        'rooms': ("SELECT * FROM rooms", ('room_id',), (0,)),
+        'timetable': (TIMETABLE_SELECT, ('t.day', 's.start_minute', 't.timetable_id'), (7, 8, 0)),
+    }
+
+    # Full-text index of each entity table: (FTS5 table, indexed text columns)
+    SEARCH_SOURCES = {
+        'students': ('students_fts', ('name', 'email')),
+        'faculty': ('faculty_fts', ('name', 'email')),
+        'courses': ('courses_fts', ('course_code', 'course_name')),
+        'rooms': ('rooms_fts', ('room_name', 'building')),
+    }
+
+    # Exact-match filters offered on each entity tab, all backed by an index
+    FILTER_COLUMNS = {
+        'students': ('department', 'semester'),
+        'faculty': ('department',),
+        'courses': ('department',),
+        'rooms': ('building', 'room_type'),
+    }
+
+    # Dashboard aggregates in one statement; rows and slots booked more than once count as clashes
+    STATS_QUERY = f'''SELECT
+        (SELECT COUNT(*) FROM students),
+        (SELECT COUNT(*) FROM faculty),
+        (SELECT COUNT(*) FROM courses),
+        (SELECT COUNT(*) FROM rooms),
+        (SELECT COUNT(*) FROM timetable WHERE version_id = {ACTIVE_VERSION}),
+        (SELECT COUNT(*) FROM (SELECT 1 FROM timetable WHERE version_id = {ACTIVE_VERSION}
+                               GROUP BY room_id, day, slot_id)),
+        (SELECT COUNT(*) FROM (SELECT 1 FROM timetable WHERE version_id = {ACTIVE_VERSION}
+                               GROUP BY faculty_id, day, slot_id)),
+        (SELECT json_group_object(department, n) FROM
+            (SELECT COALESCE(department, '') AS department, COUNT(*) AS n
+             FROM students GROUP BY department)),
+        (SELECT json_group_object(department, n) FROM
+            (SELECT COALESCE(department, '') AS department, COUNT(*) AS n
+             FROM faculty GROUP BY department))'''
+
+    # Schema migrations in order; applying entry N brings PRAGMA user_version to N + 1
+    MIGRATIONS = [
+        # 1: secondary indexes for department/faculty/room lookups and timetable ordering
+        [
+            "CREATE INDEX IF NOT EXISTS idx_courses_faculty ON courses (faculty_id)",
+            "CREATE INDEX IF NOT EXISTS idx_courses_department ON courses (department)",
+            "CREATE INDEX IF NOT EXISTS idx_students_department ON students (department)",
+            "CREATE INDEX IF NOT EXISTS idx_timetable_day_slot ON timetable (day, time_slot)",
+            "CREATE INDEX IF NOT EXISTS idx_timetable_room_slot ON timetable (room_id, day, time_slot)",
+            "CREATE INDEX IF NOT EXISTS idx_timetable_faculty_slot ON timetable (faculty_id, day, time_slot)",
+        ],
+        # 2: the kind of room (Classroom or Lab) a course must be taught in
+        [
+            "ALTER TABLE courses ADD COLUMN room_type TEXT DEFAULT 'Classroom'",
+        ],
+        # 3: per-table change counters, bumped by triggers so writes from any process show up
+        [
+            '''CREATE TABLE IF NOT EXISTS table_versions (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )''',
+            lambda self, conn: self.create_version_triggers(conn),
+        ],
+        # 4: full-text search on names, emails and course codes, plus indexes for the tab filters
+        [
+            "CREATE INDEX IF NOT EXISTS idx_students_semester ON students (semester)",
+            "CREATE INDEX IF NOT EXISTS idx_faculty_department ON faculty (department)",
+            "CREATE INDEX IF NOT EXISTS idx_rooms_building ON rooms (building)",
+            "CREATE INDEX IF NOT EXISTS idx_rooms_type ON rooms (room_type)",
+            lambda self, conn: self.create_search_indexes(conn),
+        ],
+        # 5: which students take which courses, read in both directions
+        [
+            '''CREATE TABLE IF NOT EXISTS enrollments (
+                student_id INTEGER NOT NULL,
+                course_id INTEGER NOT NULL,
+                PRIMARY KEY (student_id, course_id),
+                FOREIGN KEY (student_id) REFERENCES students (student_id),
+                FOREIGN KEY (course_id) REFERENCES courses (course_id)
+            ) WITHOUT ROWID''',
+            "CREATE INDEX IF NOT EXISTS idx_enrollments_course ON enrollments (course_id, student_id)",
+            lambda self, conn: self.create_version_triggers(conn, ('enrollments',)),
+        ],
+        # 6: time slots as a table of start/end minutes; timetable days and slots become integers
+        [
+            '''CREATE TABLE IF NOT EXISTS time_slots (
+                slot_id INTEGER PRIMARY KEY,
+                label TEXT NOT NULL UNIQUE,
+                start_minute INTEGER NOT NULL,
+                end_minute INTEGER NOT NULL,
+                CHECK (0 <= start_minute AND start_minute < end_minute AND end_minute <= 1440)
+            )''',
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_time_slots_range ON time_slots (start_minute, end_minute)",
+            lambda self, conn: self.convert_timetable_slots(conn),
+            "CREATE INDEX IF NOT EXISTS idx_timetable_day_slot ON timetable (day, slot_id)",
+            "CREATE INDEX IF NOT EXISTS idx_timetable_room_slot ON timetable (room_id, day, slot_id)",
+            "CREATE INDEX IF NOT EXISTS idx_timetable_faculty_slot ON timetable (faculty_id, day, slot_id)",
+            "CREATE INDEX IF NOT EXISTS idx_timetable_course ON timetable (course_id)",
+            lambda self, conn: self.create_version_triggers(conn, ('timetable', 'time_slots')),
+        ],
+        # 7: ON DELETE rules on every foreign key, after clearing out rows already orphaned
+        [
+            "DELETE FROM enrollments WHERE student_id NOT IN (SELECT student_id FROM students)",
+            "DELETE FROM enrollments WHERE course_id NOT IN (SELECT course_id FROM courses)",
+            "UPDATE courses SET faculty_id = NULL WHERE faculty_id NOT IN (SELECT faculty_id FROM faculty)",
+            '''DELETE FROM timetable WHERE course_id NOT IN (SELECT course_id FROM courses)
+               OR room_id NOT IN (SELECT room_id FROM rooms)
+               OR faculty_id NOT IN (SELECT faculty_id FROM faculty)''',
+            # A course outlives its teacher, unscheduled until it gets a new one
+            lambda self, conn: self.rebuild_table(conn, 'courses', '''CREATE TABLE {name} (
+                course_id INTEGER PRIMARY KEY,
+                course_code TEXT NOT NULL,
+                course_name TEXT,
+                credits INTEGER,
+                department TEXT,
+                faculty_id INTEGER REFERENCES faculty (faculty_id) ON DELETE SET NULL,
+                room_type TEXT DEFAULT 'Classroom'
+            )'''),
+            # Sessions go with their course, teacher or room; a time slot in use cannot be deleted
+            lambda self, conn: self.rebuild_table(conn, 'timetable', '''CREATE TABLE {name} (
+                timetable_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                course_id INTEGER REFERENCES courses (course_id) ON DELETE CASCADE,
+                faculty_id INTEGER REFERENCES faculty (faculty_id) ON DELETE CASCADE,
+                room_id INTEGER REFERENCES rooms (room_id) ON DELETE CASCADE,
+                day INTEGER NOT NULL CHECK (day BETWEEN 0 AND 6),
+                slot_id INTEGER NOT NULL REFERENCES time_slots (slot_id) ON DELETE RESTRICT
+            )'''),
+            lambda self, conn: self.rebuild_table(conn, 'enrollments', '''CREATE TABLE {name} (
+                student_id INTEGER NOT NULL REFERENCES students (student_id) ON DELETE CASCADE,
+                course_id INTEGER NOT NULL REFERENCES courses (course_id) ON DELETE CASCADE,
+                PRIMARY KEY (student_id, course_id)
+            ) WITHOUT ROWID'''),
+            lambda self, conn: self.check_foreign_keys(conn),
+        ],
+        # 8: timetable versions; an existing timetable becomes version 1, the active one
+        [
+            '''CREATE TABLE IF NOT EXISTS timetable_versions (
+                version_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                source TEXT NOT NULL,
+                unscheduled INTEGER,
+                score REAL
+            )''',
+            '''INSERT INTO timetable_versions (version_id, created_at, source)
+               SELECT 1, datetime('now'), 'migrated' WHERE EXISTS (SELECT 1 FROM timetable)''',
+            '''CREATE TABLE IF NOT EXISTS active_timetable (
+                singleton INTEGER PRIMARY KEY CHECK (singleton = 1),
+                version_id INTEGER NOT NULL REFERENCES timetable_versions (version_id) ON DELETE RESTRICT
+            )''',
+            "INSERT INTO active_timetable (singleton, version_id) SELECT 1, version_id FROM timetable_versions",
+            "DROP INDEX IF EXISTS idx_timetable_day_slot",
+            "DROP INDEX IF EXISTS idx_timetable_room_slot",
+            "DROP INDEX IF EXISTS idx_timetable_faculty_slot",
+            "ALTER TABLE timetable ADD COLUMN version_id INTEGER",
+            "UPDATE timetable SET version_id = 1",
+            lambda self, conn: self.rebuild_table(conn, 'timetable', '''CREATE TABLE {name} (
+                timetable_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                course_id INTEGER REFERENCES courses (course_id) ON DELETE CASCADE,
+                faculty_id INTEGER REFERENCES faculty (faculty_id) ON DELETE CASCADE,
+                room_id INTEGER REFERENCES rooms (room_id) ON DELETE CASCADE,
+                day INTEGER NOT NULL CHECK (day BETWEEN 0 AND 6),
+                slot_id INTEGER NOT NULL REFERENCES time_slots (slot_id) ON DELETE RESTRICT,
+                version_id INTEGER NOT NULL REFERENCES timetable_versions (version_id) ON DELETE CASCADE
+            )'''),
+            "CREATE INDEX IF NOT EXISTS idx_timetable_version_slot ON timetable (version_id, day, slot_id)",
+            "CREATE INDEX IF NOT EXISTS idx_timetable_room_slot ON timetable (room_id, version_id, day, slot_id)",
+            "CREATE INDEX IF NOT EXISTS idx_timetable_faculty_slot ON timetable (faculty_id, version_id, day, slot_id)",
+            # active_timetable has counters of its own so other processes see a switch
+            lambda self, conn: self.create_version_triggers(conn, ('timetable_versions', 'active_timetable')),
+            # Switching versions changes what every timetable listing shows
+            '''CREATE TRIGGER IF NOT EXISTS active_timetable_switch AFTER UPDATE ON active_timetable
+               BEGIN
+                   UPDATE table_versions SET version = version + 1 WHERE table_name = 'timetable';
+               END''',
+            '''CREATE TRIGGER IF NOT EXISTS active_timetable_start AFTER INSERT ON active_timetable
+               BEGIN
+                   UPDATE table_versions SET version = version + 1 WHERE table_name = 'timetable';
+               END''',
+        ],
+    ]
+
+    def __init__(self, db_name="campus_management.db", cache_entries=512,
+                 cache_bytes=32 * 1024 * 1024, metrics=None, **pragmas):
+        self.db_name = db_name
+        # ":memory:" is backed by a private temporary file, removed on close() or garbage
+        # collection: shared-cache memory databases fail on table locks instead of waiting
+        self.path = db_name
+        if self.in_memory:
+            fd, self.path = tempfile.mkstemp(prefix='campus_mem_', suffix='.db')
+            os.close(fd)
+            self._remove_files = weakref.finalize(self, remove_database_files, self.path)
+        # A campus_metrics.Metrics to record timings into; None keeps the hot paths bare
+        self.metrics = metrics
+        # Read-through cache of SELECT results; cache_entries=0 turns it off
+        self.cache = QueryCache(cache_entries, cache_bytes) if cache_entries else None
+        self.unscheduled = []
+        self.last_score = None
+        # Keep an existing timetable in step with course/room/faculty changes
+        self.auto_repair = True
+        self._occupancy = None
+        self.pragmas = dict(self.DEFAULT_PRAGMAS)
+        self.pragmas.update(pragmas)
+        self._local = threading.local()
+        self._pool_lock = threading.Lock()
+        self._connections = []
+        self._listeners = []
+        self._stats = None
+        self._conflicts = None
+        self._time_slots = None
+        # Timetable versions kept besides the active one; None keeps them all
+        self.keep_versions = 10
+        self.init_database()
+
+    @property
+    def in_memory(self):
+        return self.db_name == ":memory:"
+
+    def get_connection(self):
+        """Return the calling thread's long-lived connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            start = time.perf_counter()
+            conn = sqlite3.connect(self.path, check_same_thread=False,
+                                   cached_statements=self.STATEMENT_CACHE_SIZE)
+            self.apply_pragmas(conn)
+            if self.metrics is not None:
+                self.metrics.record_connection(time.perf_counter() - start)
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.reserved = {}
+            self._local.changes = []
+            self._local.dirty = set()
+            self._local.data_version = None
+            with self._pool_lock:
+                self._connections.append(conn)
+        return conn
+
+    def apply_pragmas(self, conn):
+        """Apply the per-connection tuning pragmas"""
+        for name, value in self.pragmas.items():
+            if name != 'journal_mode' and value is not None:
+                conn.execute(f"PRAGMA {name} = {value}")
+
+    def close_thread_connection(self):
+        """Close the calling thread's pooled connection, for worker threads that are done with it"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        with self._pool_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+        self._local.conn = None
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._pool_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+        if self.in_memory:
+            self._remove_files()
+
+    @contextmanager
+    def transaction(self):
+        """Group statements so they commit once; nested blocks join the outer one"""
+        conn = self.get_connection()
+        depth = self._local.depth
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            if depth == 0:
+                conn.rollback()
+                # In-memory state may reflect the rolled back writes
+                self._occupancy = None
+            raise
+        else:
+            if depth == 0:
+                changes = self._local.changes
+                versions = self.table_versions(conn) if changes and self._listeners else {}
+                conn.commit()
+                self._local.changes = []
+                self.notify(changes, versions)
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                self._local.reserved = {}
+                self._local.changes = []
+                if self._local.dirty:
+                    # Other threads may have cached the pre-commit rows meanwhile
+                    if self.cache is not None:
+                        self.cache.invalidate(self._local.dirty)
+                    self._local.dirty = set()
+
+    def subscribe(self, listener):
+        """Call listener(table, op, keys, version) for every committed change.
+
+        op is 'insert', 'update' or 'delete' with the affected primary keys, or
+        'reset' (keys None) when the whole table was replaced. Listeners run on the
+        thread that made the change.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    def record_change(self, table, op, keys=None):
+        """Queue a change event, delivered once the enclosing transaction commits"""
+        self.get_connection()
+        self._local.changes.append((table, op, keys))
+
+    def notify(self, changes, versions):
+        for table, op, keys in changes:
+            for listener in list(self._listeners):
+                listener(table, op, keys, versions.get(table))
+
+    def create_version_triggers(self, conn, tables=None):
+        """Keep table_versions counting the writes to every listed table"""
+        for table in tables or self.ID_COLUMNS:
+            conn.execute("INSERT OR IGNORE INTO table_versions (table_name) VALUES (?)", (table,))
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+                             AFTER {event} ON {table}
+                             BEGIN
+                                 UPDATE table_versions SET version = version + 1
+                                 WHERE table_name = '{table}';
+                             END''')
+
+    def create_search_indexes(self, conn):
+        """Create the FTS5 tables over the entity tables and the triggers keeping them in sync"""
+        for table, (fts_table, columns) in self.SEARCH_SOURCES.items():
+            id_column = self.ID_COLUMNS[table]
+            column_list = ', '.join(columns)
+            new_values = ', '.join(f"new.{column}" for column in columns)
+            old_values = ', '.join(f"old.{column}" for column in columns)
+            try:
+                conn.execute(f'''CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table}
+                             USING fts5({column_list}, content='{table}',
+                                        content_rowid='{id_column}', prefix='2 3')''')
+            except sqlite3.OperationalError:
+                return
+            conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table}
+                         BEGIN
+                             INSERT INTO {fts_table} (rowid, {column_list})
+                             VALUES (new.{id_column}, {new_values});
+                         END''')
+            conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table}
+                         BEGIN
+                             INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+                             VALUES ('delete', old.{id_column}, {old_values});
+                         END''')
+            conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table}
+                         BEGIN
+                             INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+                             VALUES ('delete', old.{id_column}, {old_values});
+                             INSERT INTO {fts_table} (rowid, {column_list})
+                             VALUES (new.{id_column}, {new_values});
+                         END''')
+            conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+    def convert_timetable_slots(self, conn):
+        """Rebuild the timetable with day numbers and time_slots ids in place of the text columns"""
+        conn.executemany("INSERT OR IGNORE INTO time_slots VALUES (?, ?, ?, ?)",
+                         [(index + 1, label) + campus_scheduler.label_minutes(label)
+                          for index, label in enumerate(campus_scheduler.TIME_SLOTS)])
+        # Hand-entered labels map to the slot with the same times, or become slots of their own
+        slots = {}
+        for slot_id, label, start, end in conn.execute("SELECT * FROM time_slots"):
+            slots[label] = slots[start, end] = slot_id
+        aliases = []
+        for (label,) in conn.execute("SELECT DISTINCT time_slot FROM timetable").fetchall():
+            if label not in slots:
+                try:
+                    minutes = campus_scheduler.label_minutes(label)
+                except (AttributeError, ValueError):
+                    raise ValueError(f"Cannot convert timetable time slot {label!r}")
+                if minutes not in slots:
+                    slots[minutes] = conn.execute(
+                        "INSERT INTO time_slots (label, start_minute, end_minute) VALUES (?, ?, ?)",
+                        (label,) + minutes).lastrowid
+                slots[label] = slots[minutes]
+            aliases.append((label, slots[label]))
+        conn.execute("CREATE TEMP TABLE slot_aliases (label TEXT PRIMARY KEY, slot_id INTEGER)")
+        conn.executemany("INSERT INTO slot_aliases VALUES (?, ?)", aliases)
+
+        conn.execute('''CREATE TABLE timetable_new (
+            timetable_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER,
+            faculty_id INTEGER,
+            room_id INTEGER,
+            day INTEGER NOT NULL CHECK (day BETWEEN 0 AND 6),
+            slot_id INTEGER NOT NULL,
+            FOREIGN KEY (course_id) REFERENCES courses (course_id),
+            FOREIGN KEY (faculty_id) REFERENCES faculty (faculty_id),
+            FOREIGN KEY (room_id) REFERENCES rooms (room_id),
+            FOREIGN KEY (slot_id) REFERENCES time_slots (slot_id)
+        )''')
+        day_number = ("CASE t.day " + ' '.join(f"WHEN '{name}' THEN {day}" for day, name
+                                                in enumerate(campus_scheduler.WEEKDAYS)) + " END")
+        conn.execute(f'''INSERT INTO timetable_new
+                     SELECT t.timetable_id, t.course_id, t.faculty_id, t.room_id, {day_number}, s.slot_id
+                     FROM timetable t JOIN slot_aliases s ON t.time_slot = s.label''')
+        conn.execute("DROP TABLE slot_aliases")
+        sequence = self.autoincrement_sequence(conn, 'timetable')
+        # Dropping the old table takes its indexes and triggers with it
+        conn.execute("DROP TABLE timetable")
+        conn.execute("ALTER TABLE timetable_new RENAME TO timetable")
+        self.autoincrement_sequence(conn, 'timetable', sequence)
+        # Exports and caches keyed on the timetable version must see the new layout
+        conn.execute("UPDATE table_versions SET version = version + 1 WHERE table_name = 'timetable'")
+
+    def rebuild_table(self, conn, table, create_sql):
+        """Replace a table by one made from create_sql (with {name} for the table name),
+        keeping its rows, indexes and triggers; foreign keys must be off"""
+        extras = [sql for (sql,) in conn.execute(
+            '''SELECT sql FROM sqlite_master
+            WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL''', (table,))]
+        columns = ', '.join(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+        conn.execute(create_sql.format(name=f"{table}_new"))
+        conn.execute(f"INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table}")
+        sequence = self.autoincrement_sequence(conn, table)
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        self.autoincrement_sequence(conn, table, sequence)
+        for sql in extras:
+            conn.execute(sql)
+
+    def autoincrement_sequence(self, conn, table, value=None):
+        """Read, or with a value restore, the AUTOINCREMENT high-water mark of a table"""
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+            return None
+        if value is None:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+            return row[0] if row else None
+        # Keeps ids of deleted rows from being handed out again
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, value))
+
+    def check_foreign_keys(self, conn):
+        violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if violations:
+            table, rowid, parent, _ = violations[0]
+            raise ValueError(f"{len(violations)} rows break foreign keys, e.g. {table} row {rowid} -> {parent}")
+
+    def table_versions(self, conn=None):
+        """Change counter of every table; a table is unchanged while its counter is"""
+        conn = conn or self.get_connection()
+        return dict(conn.execute("SELECT table_name, version FROM table_versions"))
+
+    def init_database(self):
+        """Initialize database with required tables"""
+        conn = self.get_connection()
+        journal_mode = self.pragmas.get('journal_mode')
+        if journal_mode:
+            conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+
+        # Migrations rebuild tables, which foreign key actions would get in the way of;
+        # the pragma only takes effect outside a transaction
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            with self.transaction() as conn:
+                # Take the write lock up front so concurrent start-ups migrate one at a time
+                conn.execute("BEGIN IMMEDIATE")
+                self.create_tables(conn)
+                self.migrate(conn)
+                # Without FTS5 in this SQLite build, search falls back to LIKE scans
+                self.full_text = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'students_fts'").fetchone() is not None
+        finally:
+            if self.pragmas.get('foreign_keys') is not None:
+                conn.execute(f"PRAGMA foreign_keys = {self.pragmas['foreign_keys']}")
+
+    def schema_version(self, conn=None):
+        """Return the schema version recorded in PRAGMA user_version"""
+        conn = conn or self.get_connection()
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self, conn):
+        """Apply any pending schema migrations in place"""
+        version = self.schema_version(conn)
+        for target in range(version + 1, len(self.MIGRATIONS) + 1):
+            for step in self.MIGRATIONS[target - 1]:
+                if callable(step):
+                    step(self, conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {target}")
+        return self.schema_version(conn)
+
+    def create_tables(self, conn):
+        """Create the campus tables and seed sample data"""
+        cursor = conn.cursor()
+
+        # Students table
+        cursor.execute('''CREATE TABLE IF NOT EXISTS students (
+            student_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            department TEXT,
+            semester INTEGER,
+            email TEXT
+        )''')
+
+        # Faculty table
+        cursor.execute('''CREATE TABLE IF NOT EXISTS faculty (
+            faculty_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            department TEXT,
+            email TEXT,
+            phone TEXT
+        )''')
+
+        # Courses table
+        cursor.execute('''CREATE TABLE IF NOT EXISTS courses (
+            course_id INTEGER PRIMARY KEY,
+            course_code TEXT NOT NULL,
+            course_name TEXT,
+            credits INTEGER,
+            department TEXT,
+            faculty_id INTEGER,
+            FOREIGN KEY (faculty_id) REFERENCES faculty (faculty_id)
+        )''')
+
+        # Rooms table
+        cursor.execute('''CREATE TABLE IF NOT EXISTS rooms (
+            room_id INTEGER PRIMARY KEY,
+            room_name TEXT NOT NULL,
+            capacity INTEGER,
+            room_type TEXT,
+            building TEXT
+        )''')
+
+        # Timetable table
+        cursor.execute('''CREATE TABLE IF NOT EXISTS timetable (
+            timetable_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id INTEGER,
+            faculty_id INTEGER,
+            room_id INTEGER,
+            day TEXT,
+            time_slot TEXT,
+            FOREIGN KEY (course_id) REFERENCES courses (course_id),
+            FOREIGN KEY (faculty_id) REFERENCES faculty (faculty_id),
+            FOREIGN KEY (room_id) REFERENCES rooms (room_id)
+        )''')
+
+        # Seed a brand-new database only; an emptied one stays empty
+        if self.schema_version(conn) == 0:
+            self.insert_sample_data(conn)
+
+    def insert_sample_data(self, conn):
+        """Insert sample data into the database"""
+        cursor = conn.cursor()
+
+        # Check if data already exists
+        cursor.execute("SELECT COUNT(*) FROM students")
+        if cursor.fetchone()[0] > 0:
+            return
+
+        # Sample students
+        students_data = [
+            (1, 'Alice Johnson', 'CSE', 3, 'alice@college.edu'),
+            (2, 'Bob Smith', 'CSE', 3, 'bob@college.edu'),
+            (3, 'Carol Davis', 'ECE', 2, 'carol@college.edu'),
+            (4, 'David Wilson', 'ECE', 2, 'david@college.edu'),
+            (5, 'Eva Brown', 'CSE', 4, 'eva@college.edu')
+        ]
+        cursor.executemany(
+            'INSERT OR IGNORE INTO students (student_id, name, department, semester, email) '
+            'VALUES (?, ?, ?, ?, ?)', students_data)
+
+        # Sample faculty
+        faculty_data = [
+            (1, 'Dr. Sharma', 'CSE', 'sharma@college.edu', '9876543210'),
+            (2, 'Dr. Verma', 'CSE', 'verma@college.edu', '9876543211'),
+            (3, 'Dr. Gupta', 'ECE', 'gupta@college.edu', '9876543212'),
+            (4, 'Dr. Singh', 'ECE', 'singh@college.edu', '9876543213')
+        ]
+        cursor.executemany(
+            'INSERT OR IGNORE INTO faculty (faculty_id, name, department, email, phone) '
+            'VALUES (?, ?, ?, ?, ?)', faculty_data)
+
+        # Sample courses
+        courses_data = [
+            (1, 'CSE101', 'Introduction to Programming', 3, 'CSE', 1),
+            (2, 'CSE102', 'Data Structures', 4, 'CSE', 1),
+            (3, 'CSE201', 'Algorithms', 4, 'CSE', 2),
+            (4, 'ECE101', 'Digital Electronics', 3, 'ECE', 3),
+            (5, 'ECE102', 'Signals & Systems', 4, 'ECE', 4),
+            (6, 'CSE301', 'Database Systems', 4, 'CSE', 2)
+        ]
+        cursor.executemany(
+            'INSERT OR IGNORE INTO courses (course_id, course_code, course_name, credits, department, '
+            'faculty_id) VALUES (?, ?, ?, ?, ?, ?)', courses_data)
+
+        # Sample rooms
+        rooms_data = [
+            (1, 'C-101', 60, 'Classroom', 'Main Building'),
+            (2, 'C-102', 45, 'Classroom', 'Main Building'),
+            (3, 'Lab-201', 30, 'Lab', 'Tech Building'),
+            (4, 'Lab-202', 25, 'Lab', 'Tech Building'),
+            (5, 'C-103', 50, 'Classroom', 'Main Building')
+        ]
+        cursor.executemany(
+            'INSERT OR IGNORE INTO rooms (room_id, room_name, capacity, room_type, building) '
+            'VALUES (?, ?, ?, ?, ?)', rooms_data)
+
+    def execute_query(self, query, params=(), cache=True):
+        """Execute query on the pooled connection, answering repeated reads from the cache"""
+        if self.metrics is None:
+            return self.run_query(query, params, cache)
+        start = time.perf_counter()
+        rows = self.run_query(query, params, cache)
+        self.record_timing(query, params, time.perf_counter() - start, len(rows))
+        return rows
+
+    def run_query(self, query, params=(), cache=True):
+        kind, tables = query_tables(query)
+        with self.transaction() as conn:
+            if (kind != 'read' or not cache or self.cache is None or not tables
+                    or tables & self._local.dirty):
+                rows = conn.execute(query, params).fetchall()
+                self.tables_written(kind, tables)
+                return rows
+
+            self.check_external_writes(conn)
+            key = (query, tuple(params))
+            rows = self.cache.get(key)
+            if rows is None:
+                epoch = self.cache.epoch
+                rows = tuple(conn.execute(query, params).fetchall())
+                self.cache.put(key, rows, tables, epoch)
+            return list(rows)
+
+    def execute_insert(self, query, params=()):
+        """Execute an INSERT and return the rowid SQLite assigned to it"""
+        start = time.perf_counter()
+        with self.transaction() as conn:
+            row_id = conn.execute(query, params).lastrowid
+            self.tables_written(*query_tables(query))
+        if self.metrics is not None:
+            self.record_timing(query, params, time.perf_counter() - start, 1)
+        return row_id
+
+    def execute_many(self, query, rows):
+        """Execute one statement for many parameter rows in a single transaction; returns the rows changed"""
+        start = time.perf_counter()
+        with self.transaction() as conn:
+            count = conn.executemany(query, rows).rowcount
+            self.tables_written(*query_tables(query))
+        if self.metrics is not None:
+            self.record_timing(query, None, time.perf_counter() - start, max(count, 0))
+        return count
+
+    def tables_written(self, kind, tables):
+        """Drop the cached results a write (or schema change) may have made stale"""
+        if self.cache is None:
+            return
+        if kind == 'write':
+            tables = set(tables)
+            if tables & set(self.VERSIONED_TABLES):
+                # The version triggers write table_versions too
+                tables.add('table_versions')
+            self._local.dirty |= tables
+            self.cache.invalidate(tables)
+        elif kind == 'schema':
+            self.cache.clear()
+
+    def check_external_writes(self, conn):
+        """Catch commits made by other connections, including other processes"""
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._local.data_version:
+            self._local.data_version = data_version
+            self.cache.sync_versions(self.table_versions(conn))
+
+    def cache_stats(self):
+        """Hit/miss/eviction counters of the query cache"""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def clear_cache(self):
+        """Forget every cached result, so the next reads go to the database (e.g. to time them cold)"""
+        if self.cache is not None:
+            self.cache.clear()
+        self._stats = None
+        self._conflicts = None
+        self._time_slots = None
+
+    # Instrumentation
+
+    def enable_metrics(self, slow_threshold=0.1):
+        """Start recording query latencies; statements slower than slow_threshold seconds are logged"""
+        if self.metrics is None:
+            self.metrics = campus_metrics.Metrics(slow_threshold)
+        else:
+            self.metrics.slow_threshold = slow_threshold
+        return self.metrics
+
+    def disable_metrics(self):
+        self.metrics = None
+
+    def record_timing(self, query, params, seconds, rows):
+        """Add a statement's time to its histogram; params is None for executemany batches"""
+        metrics = self.metrics
+        if metrics is None:
+            return
+        metrics.record_query(query, seconds, rows)
+        if seconds >= metrics.slow_threshold:
+            plan = self.explain(query, params) if params is not None else []
+            metrics.record_slow(query, params, seconds, rows, plan)
+
+    def explain(self, query, params=()):
+        """SQLite's EXPLAIN QUERY PLAN for a statement, one line per plan step"""
+        if query_tables(query)[0] not in ('read', 'write'):
+            return []
+        try:
+            with self.transaction() as conn:
+                return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+        except sqlite3.Error as e:
+            return [f"unavailable: {str(e)}"]
+
+    def span(self, name):
+        """Context manager timing a block under name, or doing nothing when metrics are off"""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.span(name)
+
+    def metrics_snapshot(self):
+        if self.metrics is None:
+            return {}
+        return self.metrics.snapshot({'cache': self.cache_stats()})
+
+    def write_metrics(self, path):
+        """Write the metrics as JSON, or Prometheus text if path ends in .prom"""
+        if self.metrics is not None:
+            self.metrics.write(path, {'cache': self.cache_stats()})
+
+    def get_all_students(self):
+        return self.execute_query("SELECT * FROM students")
+
+    def get_all_faculty(self):
+        return self.execute_query("SELECT * FROM faculty")
+
+    def get_all_courses(self):
+        return self.execute_query("SELECT * FROM courses")
+
+    def get_all_rooms(self):
+        return self.execute_query("SELECT * FROM rooms")
+
+    def get_students_by_department(self, department):
+        return self.execute_query("SELECT * FROM students WHERE department = ?", (department,))
+
+    def get_courses_by_department(self, department):
+        return self.execute_query("SELECT * FROM courses WHERE department = ?", (department,))
+
+    def get_courses_by_faculty(self, faculty_id):
+        return self.execute_query("SELECT * FROM courses WHERE faculty_id = ?", (faculty_id,))
+
+    def get_room_schedule(self, room_id):
+        return self.execute_query(f'''SELECT t.* FROM timetable t JOIN time_slots s ON t.slot_id = s.slot_id
+                                   WHERE t.room_id = ? AND t.version_id = {self.ACTIVE_VERSION}
+                                   ORDER BY t.day, s.start_minute''', (room_id,))
+
+    def get_faculty_schedule(self, faculty_id):
+        return self.execute_query(f'''SELECT t.* FROM timetable t JOIN time_slots s ON t.slot_id = s.slot_id
+                                   WHERE t.faculty_id = ? AND t.version_id = {self.ACTIVE_VERSION}
+                                   ORDER BY t.day, s.start_minute''', (faculty_id,))
+
+    def get_timetable(self):
+        return self.execute_query(self.TIMETABLE_SELECT + " ORDER BY t.day, s.start_minute, t.timetable_id")
+
+    def find_sessions(self, days=None, start=None, end=None):
+        """Timetable rows (as get_timetable returns them) on some days overlapping start-end.
+
+        days are day numbers or names, start and end minutes of the day or 'HH:MM'
+        strings; leave any of them out to not restrict on it.
+        """
+        clauses, params = [], []
+        if days is not None:
+            days = sorted({campus_scheduler.day_number(day) for day in days})
+            clauses.append(f"t.day IN ({', '.join('?' * len(days))})")
+            params += days
+        # Narrow the (small) time_slots table by range first, then probe the timetable's
+        # (day, slot_id) index with the matching slot ids
+        slot_clauses, slot_params = [], []
+        if start is not None:
+            slot_clauses.append("end_minute > ?")
+            slot_params.append(campus_scheduler.parse_time(start))
+        if end is not None:
+            slot_clauses.append("start_minute < ?")
+            slot_params.append(campus_scheduler.parse_time(end))
+        if slot_clauses:
+            clauses.append(f"t.slot_id IN (SELECT slot_id FROM time_slots WHERE {' AND '.join(slot_clauses)})")
+            params += slot_params
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.execute_query(f"{self.TIMETABLE_SELECT}{where} ORDER BY t.day, s.start_minute, t.timetable_id",
+                                  tuple(params))
+
+    def get_time_slots(self):
+        """(slot_id, label, start_minute, end_minute) of every time slot in time order"""
+        return self.execute_query("SELECT * FROM time_slots ORDER BY start_minute, end_minute, slot_id")
+
+    def add_time_slot(self, start, end, label=None):
+        """Add a time slot of any length, e.g. add_time_slot('12:00', '13:30'); returns its id,
+        or the existing slot's id if one already covers exactly those times"""
+        start, end = campus_scheduler.parse_time(start), campus_scheduler.parse_time(end)
+        if not 0 <= start < end <= 24 * 60:
+            raise ValueError("A time slot must end after it starts, within one day")
+        for slot_id, (_, slot_start, slot_end) in self.time_slot_map().items():
+            if (slot_start, slot_end) == (start, end):
+                return slot_id
+        label = label or campus_scheduler.minutes_label(start, end)
+        if label in {slot_label for slot_label, _, _ in self.time_slot_map().values()}:
+            raise ValueError(f"Time slot label {label!r} is already in use")
+        with self.transaction():
+            slot_id = self.execute_insert('''INSERT INTO time_slots (label, start_minute, end_minute)
+                                          VALUES (?, ?, ?)''', (label, start, end))
+            self.record_change('time_slots', 'insert', [slot_id])
+        return slot_id
+
+    def time_slot_map(self):
+        """{slot_id: (label, start_minute, end_minute)}, kept until time_slots changes"""
+        version = self.table_versions().get('time_slots')
+        cached = self._time_slots
+        if cached is None or cached[0] != version:
+            cached = self._time_slots = (version, {row[0]: tuple(row[1:]) for row in self.execute_query(
+                "SELECT slot_id, label, start_minute, end_minute FROM time_slots")})
+        return cached[1]
+
+    def slot_key(self, day, time_slot):
+        """(day number, slot_id) of a day number or name and a slot id or label"""
+        day = campus_scheduler.day_number(day)
+        slots = self.time_slot_map()
+        if time_slot in slots:
+            return day, time_slot
+        for slot_id, (label, _, _) in slots.items():
+            if label == time_slot:
+                return day, slot_id
+        raise ValueError(f"Unknown time slot: {time_slot}")
+
+    def grid_slots(self, day, slot_id):
+        """Scheduler grid slots a session overlaps; none for weekends or off-grid hours"""
+        if day >= len(campus_scheduler.DAYS):
+            return []
+        _, start, end = self.time_slot_map()[slot_id]
+        return [campus_scheduler.grid_slot(day, offset)
+                for offset in campus_scheduler.grid_offsets(start, end)]
+
+    def grid_slot_of(self, day, slot_id):
+        """The grid slot a session fills exactly, or None if it is off the grid"""
+        _, start, end = self.time_slot_map()[slot_id]
+        if day < len(campus_scheduler.DAYS) and (start, end) in campus_scheduler.GRID_MINUTES:
+            return campus_scheduler.grid_slot(day, campus_scheduler.GRID_MINUTES.index((start, end)))
+        return None
+
+    def overlapping_bookings(self, day, slot_id):
+        """(timetable_id, room_id, faculty_id) of sessions overlapping a day and time slot"""
+        _, start, end = self.time_slot_map()[slot_id]
+        return self.execute_query(f'''SELECT t.timetable_id, t.room_id, t.faculty_id
+                                  FROM timetable t JOIN time_slots s ON t.slot_id = s.slot_id
+                                  WHERE t.version_id = {self.ACTIVE_VERSION}
+                                  AND t.day = ? AND s.start_minute < ? AND s.end_minute > ?''',
+                                  (day, end, start))
+
+    def search_condition(self, table, search=None, filters=None):
+        """WHERE clauses and parameters for a text search plus column filters on an entity table"""
+        clauses, params = [], []
+        terms = re.findall(r"\w+", search or "")
+        if terms:
+            id_column = self.ID_COLUMNS[table]
+            fts_table, columns = self.SEARCH_SOURCES[table]
+            if self.full_text:
+                # Every word must match, as a prefix, in one of the indexed columns
+                clauses.append(f"{id_column} IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)")
+                params.append(' '.join(f'"{term}"*' for term in terms))
+            else:
+                for term in terms:
+                    clauses.append('(' + ' OR '.join(f"{column} LIKE ?" for column in columns) + ')')
+                    params += [f"%{term}%"] * len(columns)
+        for column, value in (filters or {}).items():
+            if column not in self.FILTER_COLUMNS.get(table, ()):
+                raise ValueError(f"Cannot filter {table} on {column}")
+            if value not in (None, ''):
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return clauses, params
+
+    def get_filter_values(self, table, column):
+        """Distinct values of a filter column, for the filter drop-downs"""
+        if column not in self.FILTER_COLUMNS.get(table, ()):
+            raise ValueError(f"Cannot filter {table} on {column}")
+        return [row[0] for row in self.execute_query(
+            f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY {column}")]
+
+    def count_rows(self, table, search=None, filters=None):
+        select = self.PAGE_SOURCES[table][0]
+        clauses, params = self.search_condition(table, search, filters)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.execute_query(f"SELECT COUNT(*) FROM ({select}{where})", tuple(params))[0][0]
+
+    def get_page(self, table, limit, after=None, before=None, offset=0, search=None, filters=None,
+                 cache=True):
+        """One page of rows in key order, optionally narrowed by a search and filters.
+
+        Pass the key of the row to continue after (or before) for keyset paging;
+        offset is only for jumping to an arbitrary position. One-off scans such as
+        exports should pass cache=False.
+        """
+        select, key_columns, _ = self.PAGE_SOURCES[table]
+        order = ', '.join(key_columns)
+        placeholders = ', '.join('?' * len(key_columns))
+        clauses, params = self.search_condition(table, search, filters)
+        if after is not None:
+            clauses.append(f"({order}) > ({placeholders})")
+            params += list(after)
+        elif before is not None:
+            clauses.append(f"({order}) < ({placeholders})")
+            params += list(before)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        if before is not None:
+            descending = ', '.join(f"{column} DESC" for column in key_columns)
+            rows = self.execute_query(f"{select}{where} ORDER BY {descending} LIMIT ?",
+                                      tuple(params) + (limit,), cache)
+            return rows[::-1]
+        if after is not None:
+            return self.execute_query(f"{select}{where} ORDER BY {order} LIMIT ?",
+                                      tuple(params) + (limit,), cache)
+        return self.execute_query(f"{select}{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                                  tuple(params) + (limit, offset), cache)
+
+    def page_key(self, table, row):
+        """The keyset pagination key of a row returned by get_page"""
+        return tuple(row[i] for i in self.PAGE_SOURCES[table][2])
+
+    def get_rows(self, table, ids):
+        """The listing rows (as get_page returns them) with the given primary keys"""
+        select, key_columns, key_indexes = self.PAGE_SOURCES[table]
+        id_column = key_columns[key_indexes.index(0)]
+        ids = list(ids)
+        rows = []
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows += self.execute_query(
+                f"{select} WHERE {id_column} IN ({', '.join('?' * len(chunk))})", tuple(chunk))
+        return rows
+
+    def iter_rows(self, table, batch_size=1000):
+        """Stream every listing row of a table in key order from one consistent read"""
+        select, key_columns, _ = self.PAGE_SOURCES[table]
+        return self.iter_query(f"{select} ORDER BY {', '.join(key_columns)}", batch_size=batch_size)
+
+    def iter_query(self, query, params=(), batch_size=1000):
+        """Yield the rows of a read query batch by batch, so memory stays flat for any size.
+
+        Bypasses the query cache so a full export does not evict everything else.
+        """
+        cursor = self.get_connection().execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def get_stats(self):
+        """Dashboard statistics, recomputed only when a table's change counter has moved"""
+        with self.transaction() as conn:
+            versions = self.table_versions(conn)
+            cached = self._stats
+            if cached is not None and cached[0] == versions:
+                return cached[1]
+
+            with self.span('get_stats.query'):
+                (students, faculty, courses, rooms, sessions, room_slots, faculty_slots,
+                 student_heads, faculty_heads) = conn.execute(self.STATS_QUERY).fetchone()
+
+        student_heads = json.loads(student_heads or '{}')
+        faculty_heads = json.loads(faculty_heads or '{}')
+        capacity = rooms * campus_scheduler.SLOT_COUNT
+        stats = {
+            'students': students,
+            'faculty': faculty,
+            'courses': courses,
+            'rooms': rooms,
+            'sessions': sessions,
+            'departments': {department: {'students': student_heads.get(department, 0),
+                                         'faculty': faculty_heads.get(department, 0)}
+                            for department in sorted(set(student_heads) | set(faculty_heads))},
+            'room_utilisation': 100.0 * room_slots / capacity if capacity else 0.0,
+            'conflicts': (sessions - room_slots) + (sessions - faculty_slots),
+        }
+        self._stats = (versions, stats)
+        return stats
+
+    def add_student(self, name, department, semester, email):
+        with self.transaction():
+            student_id = self.execute_insert('''INSERT INTO students (name, department, semester, email)
+                                             VALUES (?, ?, ?, ?)''', (name, department, semester, email))
+            self.record_change('students', 'insert', [student_id])
+        return student_id
+
+    def add_faculty(self, name, department, email, phone):
+        with self.transaction():
+            faculty_id = self.execute_insert('''INSERT INTO faculty (name, department, email, phone)
+                                             VALUES (?, ?, ?, ?)''', (name, department, email, phone))
+            self.record_change('faculty', 'insert', [faculty_id])
+        if self._occupancy is not None:
+            self._occupancy.faculty.register(faculty_id)
+        return faculty_id
+
+    def add_course(self, course_code, course_name, credits, department, faculty_id,
+                   room_type='Classroom'):
+        with self.transaction():
+            try:
+                course_id = self.execute_insert('''INSERT INTO courses
+                                                (course_code, course_name, credits, department, faculty_id, room_type)
+                                                VALUES (?, ?, ?, ?, ?, ?)''',
+                                                (course_code, course_name, credits, department, faculty_id, room_type))
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Unknown faculty_id {faculty_id}")
+            self.record_change('courses', 'insert', [course_id])
+            if self.auto_repair and self.has_timetable():
+                self.repair_timetable([course_id])
+        return course_id
+
+    def add_room(self, room_name, capacity, room_type, building):
+        with self.transaction():
+            room_id = self.execute_insert('''INSERT INTO rooms (room_name, capacity, room_type, building)
+                                          VALUES (?, ?, ?, ?)''', (room_name, capacity, room_type, building))
+            self.record_change('rooms', 'insert', [room_id])
+        if self._occupancy is not None:
+            self._occupancy.add_room((room_id, room_name, capacity, room_type))
+        return room_id
+
+    def reserve_ids(self, table_name, count):
+        """Reserve a contiguous block of ids, held until the enclosing transaction ends"""
+        if self._local.depth == 0:
+            raise RuntimeError("reserve_ids must be called inside transaction()")
+        conn = self.get_connection()
+        if not conn.in_transaction:
+            # Take the write lock now so no other writer can claim the same block
+            conn.execute("BEGIN IMMEDIATE")
+
+        id_column = self.ID_COLUMNS[table_name]
+        max_id = conn.execute(f"SELECT MAX({id_column}) FROM {table_name}").fetchone()[0]
+        start = max((max_id or 0) + 1, self._local.reserved.get(table_name, 0))
+        self._local.reserved[table_name] = start + count
+        return range(start, start + count)
+
+    def bulk_insert(self, table_name, rows, columns):
+        """Insert rows of the given columns (without the id column) under one reserved id block"""
+        rows = [tuple(row) for row in rows]
+        if not rows:
+            return range(0)
+        column_list = ', '.join((self.ID_COLUMNS[table_name],) + tuple(columns))
+        placeholders = ', '.join('?' * (len(columns) + 1))
+        with self.transaction():
+            ids = self.reserve_ids(table_name, len(rows))
+            self.execute_many(f'INSERT INTO {table_name} ({column_list}) VALUES ({placeholders})',
+                              [(new_id,) + row for new_id, row in zip(ids, rows)])
+            self.record_change(table_name, 'insert', ids)
+        if table_name in ('rooms', 'faculty'):
+            self._occupancy = None
+        return ids
+
+    def delete_student(self, student_id):
+        self.delete_many('students', [student_id])
+
+    def delete_faculty(self, faculty_id):
+        self.delete_many('faculty', [faculty_id])
+
+    def delete_course(self, course_id):
+        self.delete_many('courses', [course_id])
+
+    def delete_room(self, room_id):
+        self.delete_many('rooms', [room_id])
+
+    def delete_many(self, table, ids):
+        """Delete many rows of a table in one transaction; returns how many existed.
+
+        The foreign keys' ON DELETE rules take the enrollments and timetable rows of
+        deleted students, courses, faculty and rooms with them, and leave the courses
+        of deleted faculty without a teacher. Those dependent rows are read first so
+        their change events go out with the delete. Runs in chunks of 500 ids.
+        """
+        if table not in self.ID_COLUMNS:
+            raise ValueError(f"Unknown table: {table}")
+        id_column = self.ID_COLUMNS[table]
+        ids = sorted({int(row_id) for row_id in ids})
+        deleted, course_ids = [], set()
+        with self.transaction():
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                condition = f"{id_column} IN ({', '.join('?' * len(chunk))})"
+                if table in ('students', 'courses'):
+                    pairs = self.execute_query(
+                        f"SELECT student_id, course_id FROM enrollments WHERE {condition}", chunk)
+                    if pairs:
+                        self.record_change('enrollments', 'delete', pairs)
+                existing = [row[0] for row in self.execute_query(
+                    f"SELECT {id_column} FROM {table} WHERE {condition}", chunk)]
+                if table != 'students':
+                    # Timetable rows go through drop_timetable_entries to keep the occupancy in step
+                    course_ids.update(self.drop_timetable_entries(condition, chunk))
+                if table == 'faculty':
+                    orphaned = [row[0] for row in self.execute_query(
+                        f"SELECT course_id FROM courses WHERE {condition}", chunk)]
+                    if orphaned:
+                        self.record_change('courses', 'update', orphaned)
+                        course_ids.update(orphaned)
+                if table != 'timetable':
+                    self.execute_query(f"DELETE FROM {table} WHERE {condition}", chunk)
+                    if existing:
+                        self.record_change(table, 'delete', existing)
+                deleted += existing
+            if self._occupancy is not None:
+                for row_id in deleted:
+                    if table == 'faculty':
+                        self._occupancy.faculty.unregister(row_id)
+                    elif table == 'rooms':
+                        self._occupancy.remove_room(row_id)
+            if table in ('faculty', 'rooms') and self.auto_repair:
+                # Reports the orphaned courses as unscheduled until they get a new teacher
+                self.repair_timetable(course_ids)
+        return len(deleted)
+
+    # Enrollments
+
+    def enroll(self, pairs):
+        """Enroll many (student_id, course_id) pairs at once; returns how many were new"""
+        pairs = [(int(student_id), int(course_id)) for student_id, course_id in pairs]
+        if not pairs:
+            return 0
+        with self.transaction():
+            try:
+                added = self.execute_many(
+                    "INSERT OR IGNORE INTO enrollments (student_id, course_id) VALUES (?, ?)", pairs)
+            except sqlite3.IntegrityError:
+                raise ValueError("Enrollments refer to a student or course that does not exist")
+            if added:
+                self.record_change('enrollments', 'insert', pairs)
+        return added
+
+    def unenroll(self, pairs):
+        """Remove many (student_id, course_id) pairs at once; returns how many existed"""
+        pairs = [(int(student_id), int(course_id)) for student_id, course_id in pairs]
+        if not pairs:
+            return 0
+        with self.transaction():
+            removed = self.execute_many(
+                "DELETE FROM enrollments WHERE student_id = ? AND course_id = ?", pairs)
+            if removed:
+                self.record_change('enrollments', 'delete', pairs)
+        return removed
+
+    def get_course_students(self, course_id):
+        return [row[0] for row in self.execute_query(
+            "SELECT student_id FROM enrollments WHERE course_id = ? ORDER BY student_id", (course_id,))]
+
+    def get_student_courses(self, student_id):
+        return [row[0] for row in self.execute_query(
+            "SELECT course_id FROM enrollments WHERE student_id = ? ORDER BY course_id", (student_id,))]
+
+    def get_course_sizes(self):
+        """Number of students enrolled on each course that has any"""
+        return dict(self.execute_query(
+            "SELECT course_id, COUNT(*) FROM enrollments GROUP BY course_id"))
+
+    def course_conflicts(self):
+        """Course-conflict graph: {course_id: {other course_id: students taking both}}.
+
+        Built in one pass over the enrollments in student order, counting the course
+        pairs of each student, and kept until the enrollments change.
+        """
+        version = self.table_versions().get('enrollments')
+        cached = self._conflicts
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        shared = Counter()
+        current, courses = None, []
+        for student_id, course_id in self.iter_query(
+                "SELECT student_id, course_id FROM enrollments ORDER BY student_id, course_id",
+                batch_size=10000):
+            if student_id != current:
+                if len(courses) > 1:
+                    shared.update(combinations(courses, 2))
+                current, courses = student_id, []
+            courses.append(course_id)
+        if len(courses) > 1:
+            shared.update(combinations(courses, 2))
+
+        graph = {}
+        for (a, b), count in shared.items():
+            graph.setdefault(a, {})[b] = count
+            graph.setdefault(b, {})[a] = count
+        self._conflicts = (version, graph)
+        return graph
+
+    def student_clash_report(self):
+        """Students timetabled into two classes at once.
+
+        Returns (student_id, course_id, other course_id, day, time_slot) rows. Clashing
+        course pairs come from the conflict graph and the timetable; only the
+        enrollments of those courses are then read, in one query per 500 courses.
+        """
+        graph = self.course_conflicts()
+        course_slots = {}
+        for course_id, day, slot_id in self.execute_query(
+                f"SELECT course_id, day, slot_id FROM timetable WHERE version_id = {self.ACTIVE_VERSION}"):
+            for slot in self.grid_slots(day, slot_id):
+                course_slots[course_id] = course_slots.get(course_id, 0) | 1 << slot
+
+        clashing = []
+        for a, neighbours in graph.items():
+            for b in neighbours:
+                if a < b and course_slots.get(a, 0) & course_slots.get(b, 0):
+                    clashing.append((a, b, course_slots[a] & course_slots[b]))
+        if not clashing:
+            return []
+
+        involved = sorted({course for a, b, _ in clashing for course in (a, b)})
+        students = {}
+        for start in range(0, len(involved), 500):
+            chunk = involved[start:start + 500]
+            for course_id, student_id in self.iter_query(
+                    f'''SELECT course_id, student_id FROM enrollments
+                    WHERE course_id IN ({', '.join('?' * len(chunk))})''', chunk):
+                students.setdefault(course_id, set()).add(student_id)
+
+        report = []
+        for a, b, slots in clashing:
+            both = sorted(students.get(a, set()) & students.get(b, set()))
+            for slot in campus_scheduler.iter_bits(slots):
+                day, time_slot = campus_scheduler.slot_label(slot)
+                report += [(student_id, a, b, day, time_slot) for student_id in both]
+        report.sort()
+        return report
+
+    @property
+    def occupancy(self):
+        """Room/faculty occupancy of the timetable, built once and then kept up to date"""
+        if self._occupancy is None:
+            self._occupancy = campus_scheduler.Occupancy.from_timetable(
+                [(room_id, faculty_id, slot) for room_id, faculty_id, day, slot_id in self.execute_query(
+                    f"SELECT room_id, faculty_id, day, slot_id FROM timetable WHERE version_id = {self.ACTIVE_VERSION}")
+                 for slot in self.grid_slots(day, slot_id)],
+                self.get_all_rooms(),
+                [row[0] for row in self.execute_query("SELECT faculty_id FROM faculty")])
+        return self._occupancy
+
+    def find_free_rooms(self, day, time_slot, room_type=None, min_capacity=0):
+        """Ids of rooms free at a day/time slot, smallest sufficient room first"""
+        day, slot_id = self.slot_key(day, time_slot)
+        occupancy = self.occupancy
+        slot = self.grid_slot_of(day, slot_id)
+        if slot is not None:
+            return occupancy.free_rooms(slot, room_type, min_capacity)
+        busy = {row[1] for row in self.overlapping_bookings(day, slot_id)}
+        rooms = occupancy.rooms.ids_of(occupancy.rooms_mask(room_type, min_capacity))
+        return sorted((room_id for room_id in rooms if room_id not in busy),
+                      key=lambda room_id: (occupancy.room_info[room_id][0], room_id))
+
+    def find_free_faculty(self, day, time_slot):
+        """Ids of faculty members with nothing scheduled at a day/time slot"""
+        day, slot_id = self.slot_key(day, time_slot)
+        occupancy = self.occupancy
+        slot = self.grid_slot_of(day, slot_id)
+        if slot is not None:
+            return occupancy.free_faculty(slot)
+        busy = {row[2] for row in self.overlapping_bookings(day, slot_id)}
+        return [faculty_id for faculty_id in occupancy.faculty.ids_of(occupancy.faculty.all)
+                if faculty_id not in busy]
+
+    def add_timetable_entry(self, course_id, room_id, day, time_slot):
+        """Book one session of a course, refusing room or faculty double bookings.
+
+        day is a day number (0 = Monday) or name, time_slot a time_slots id or label;
+        sessions clash if their times overlap, whatever their slots.
+        """
+        day, slot_id = self.slot_key(day, time_slot)
+        result = self.execute_query("SELECT faculty_id FROM courses WHERE course_id = ?", (course_id,))
+        if not result:
+            raise ValueError(f"Unknown course {course_id}")
+        faculty_id = result[0][0]
+        label = f"{campus_scheduler.WEEKDAYS[day]} {self.time_slot_map()[slot_id][0]}"
+
+        with self.transaction():
+            for _, booked_room, booked_faculty in self.overlapping_bookings(day, slot_id):
+                if booked_room == room_id:
+                    raise ValueError(f"Room {room_id} is already booked on {label}")
+                if faculty_id is not None and booked_faculty == faculty_id:
+                    raise ValueError(f"Faculty {faculty_id} is already teaching on {label}")
+            timetable_id = self.execute_insert('''INSERT INTO timetable
+                                               (course_id, faculty_id, room_id, day, slot_id, version_id)
+                                               VALUES (?, ?, ?, ?, ?, ?)''',
+                                               (course_id, faculty_id, room_id, day, slot_id,
+                                                self.ensure_timetable_version()))
+            self.record_change('timetable', 'insert', [timetable_id])
+        if self._occupancy is not None:
+            for slot in self.grid_slots(day, slot_id):
+                self._occupancy.book(slot, room_id, faculty_id)
+        return timetable_id
+
+    def delete_timetable_entry(self, timetable_id):
+        self.drop_timetable_entries("timetable_id = ?", (timetable_id,))
+
+    def drop_timetable_entries(self, condition, params=()):
+        """Delete the timetable rows matching a WHERE condition, in every version.
+
+        Returns the course ids of the rows deleted from the active version.
+        """
+        with self.transaction():
+            active = self.active_timetable_version()
+            rows = self.execute_query(f'''SELECT course_id, room_id, faculty_id, day, slot_id, timetable_id,
+                                        version_id FROM timetable WHERE {condition}''', params)
+            self.execute_query(f"DELETE FROM timetable WHERE {condition}", params)
+            if rows:
+                self.record_change('timetable', 'delete', [row[5] for row in rows])
+        rows = [row for row in rows if row[6] == active]
+        if self._occupancy is not None:
+            for _, room_id, faculty_id, day, slot_id, _, _ in rows:
+                for slot in self.grid_slots(day, slot_id):
+                    self._occupancy.release(slot, room_id, faculty_id)
+        return sorted({row[0] for row in rows})
+
+    def has_timetable(self):
+        return bool(self.execute_query(
+            f"SELECT 1 FROM timetable WHERE version_id = {self.ACTIVE_VERSION} LIMIT 1"))
+
+    def get_cohort_sizes(self, departments=None):
+        """Number of students per (department, year) cohort"""
+        condition, params = "", ()
+        if departments is not None:
+            condition = f"WHERE department IN ({', '.join('?' * len(departments))})"
+            params = tuple(departments)
+        rows = self.execute_query(f'''SELECT department, (semester + 1) / 2, COUNT(*)
+                                    FROM students {condition}
+                                    GROUP BY department, (semester + 1) / 2''', params)
+        return {(department, year): count for department, year, count in rows}
+
+    def repair_timetable(self, course_ids):
+        """Place the missing sessions of some courses without moving any other entry"""
+        course_ids = sorted(set(course_ids))
+        if not course_ids:
+            return 0
+
+        with self.transaction():
+            courses = self.execute_query(
+                f"SELECT * FROM courses WHERE course_id IN ({', '.join('?' * len(course_ids))})",
+                course_ids)
+            departments = sorted({course[4] for course in courses if course[4] is not None})
+            conflicts = self.course_conflicts()
+            neighbours = sorted({other for course_id in course_ids
+                                 for other in conflicts.get(course_id, ())})
+
+            # Cohort and course busy masks only for the departments being touched,
+            # plus the courses sharing students with the ones being placed
+            booked = self.execute_query(f'''SELECT t.timetable_id, t.course_id, c.course_code,
+                                          c.department, t.day, t.slot_id
+                                          FROM timetable t JOIN courses c ON t.course_id = c.course_id
+                                          WHERE t.version_id = {self.ACTIVE_VERSION}
+                                          AND (c.department IN ({', '.join('?' * len(departments))})
+                                               OR t.course_id IN ({', '.join('?' * len(neighbours))}))''',
+                                        departments + neighbours)
+            cohort_busy, course_busy, existing = {}, {}, {}
+            for timetable_id, course_id, course_code, department, day, slot_id in booked:
+                bit = 0
+                for slot in self.grid_slots(day, slot_id):
+                    bit |= 1 << slot
+                cohort = (department, campus_scheduler.course_level(course_code))
+                cohort_busy[cohort] = cohort_busy.get(cohort, 0) | bit
+                course_busy[course_id] = course_busy.get(course_id, 0) | bit
+                existing.setdefault(course_id, []).append(timetable_id)
+
+            occupancy = self.occupancy
+            solver = campus_scheduler.TimetableSolver(
+                [], [], self.get_cohort_sizes(departments), occupancy=occupancy,
+                cohort_busy=cohort_busy, course_busy=course_busy, conflicts=conflicts,
+                course_sizes=self.get_course_sizes())
+            unscheduled = []
+            for course in courses:
+                course_id, faculty_id = course[0], course[5]
+                wanted = max(course[3] or 1, 1)
+                have = sorted(existing.get(course_id, []))
+                if faculty_id is None:
+                    unscheduled.append((course_id, "No faculty assigned"))
+                elif faculty_id not in occupancy.faculty.bit:
+                    unscheduled.append((course_id, "Faculty no longer exists"))
+                elif len(have) < wanted:
+                    solver.add_course(course, wanted - len(have))
+                elif len(have) > wanted:
+                    for timetable_id in have[wanted:]:
+                        self.delete_timetable_entry(timetable_id)
+
+            timetable_data = solver.solve(allow_ejection=False)
+            version_id = self.active_timetable_version()
+            self.bulk_insert('timetable', [row + (version_id,) for row in timetable_data],
+                             self.TIMETABLE_COLUMNS + ('version_id',))
+
+        self.unscheduled = unscheduled + solver.unscheduled
+        return len(timetable_data)
+
+    def generate_timetable(self, progress=None):
+        """Generate a clash-free timetable with one session per course credit"""
+        with self.span('generate_timetable.load'):
+            solver = campus_scheduler.TimetableSolver(
+                self.get_all_courses(), self.get_all_rooms(), self.get_cohort_sizes(),
+                conflicts=self.course_conflicts(), course_sizes=self.get_course_sizes())
+        with self.span('generate_timetable.solve'):
+            timetable_data = solver.solve(progress=progress)
+        self.unscheduled = solver.unscheduled
+        with self.span('generate_timetable.write'):
+            return self.replace_timetable(timetable_data, 'generated')
+
+    def optimise_timetable(self, starts=None, workers=None, seed=0, time_budget=10.0,
+                           progress=None):
+        """Run several seeded searches in parallel and keep the best-scoring timetable"""
+        with self.span('optimise_timetable.load'):
+            inputs = (self.get_all_courses(), self.get_all_rooms(), self.get_cohort_sizes())
+            conflicts, course_sizes = self.course_conflicts(), self.get_course_sizes()
+        with self.span('optimise_timetable.search'):
+            result = campus_scheduler.optimise(
+                *inputs, starts=starts, workers=workers, seed=seed, time_budget=time_budget,
+                progress=progress, conflicts=conflicts, course_sizes=course_sizes)
+        self.unscheduled = result.unscheduled
+        self.last_score = result.breakdown
+        with self.span('optimise_timetable.write'):
+            return self.replace_timetable(result.entries, 'optimised', result.breakdown['total'])
+
+    def replace_timetable(self, timetable_data, source='generated', score=None):
+        """Write the rows as a new timetable version and make it the active one.
+
+        The previous versions stay, up to keep_versions of them. Returns the row count.
+        """
+        with self.transaction():
+            version_id = self.execute_insert('''INSERT INTO timetable_versions
+                                             (created_at, source, unscheduled, score)
+                                             VALUES (datetime('now'), ?, ?, ?)''',
+                                             (source, len(self.unscheduled), score))
+            self.record_change('timetable_versions', 'insert', [version_id])
+            self.execute_many('''INSERT INTO timetable
+                              (course_id, faculty_id, room_id, day, slot_id, version_id)
+                              VALUES (?, ?, ?, ?, ?, ?)''',
+                              [tuple(row) + (version_id,) for row in timetable_data])
+            self.switch_timetable_version(version_id)
+            self.prune_timetable_versions()
+        return len(timetable_data)
+
+    # Timetable versions
+
+    def active_timetable_version(self):
+        """The active version's id, or None before the first timetable is made"""
+        rows = self.execute_query("SELECT version_id FROM active_timetable")
+        return rows[0][0] if rows else None
+
+    def ensure_timetable_version(self):
+        """The active version's id, starting an empty 'manual' version if there is none yet"""
+        version_id = self.active_timetable_version()
+        if version_id is None:
+            with self.transaction():
+                version_id = self.execute_insert('''INSERT INTO timetable_versions (created_at, source)
+                                                 VALUES (datetime('now'), 'manual')''')
+                self.record_change('timetable_versions', 'insert', [version_id])
+                self.switch_timetable_version(version_id)
+        return version_id
+
+    def get_timetable_versions(self):
+        """(version_id, created_at, source, sessions, unscheduled, score, active) of every kept version"""
+        return self.execute_query(f'''SELECT v.version_id, v.created_at, v.source,
+                                  (SELECT COUNT(*) FROM timetable t WHERE t.version_id = v.version_id),
+                                  v.unscheduled, v.score, v.version_id IS {self.ACTIVE_VERSION}
+                                  FROM timetable_versions v ORDER BY v.version_id''')
+
+    def activate_timetable_version(self, version_id, repair=False):
+        """Make a kept version the timetable everything reads; a single-row update.
+
+        Deleting a course, room or faculty member removes its sessions from every
+        kept version. With repair=True the version is copied into a new one and the
+        courses it is short of are placed again there, leaving the kept version as
+        it was; returns the id of the version made active.
+        """
+        with self.transaction():
+            if not self.execute_query("SELECT 1 FROM timetable_versions WHERE version_id = ?", (version_id,)):
+                raise ValueError(f"Unknown timetable version {version_id}")
+            self.unscheduled = []
+            if repair:
+                version_id = self.copy_timetable_version(version_id, 'restored')
+            self.switch_timetable_version(version_id)
+            if repair:
+                self.repair_timetable(self.courses_short_of_sessions())
+                self.prune_timetable_versions()
+        return version_id
+
+    def switch_timetable_version(self, version_id):
+        """Point active_timetable at a version, without checking or repairing it"""
+        self.execute_query('''INSERT INTO active_timetable (singleton, version_id) VALUES (1, ?)
+                           ON CONFLICT (singleton) DO UPDATE SET version_id = excluded.version_id''',
+                           (version_id,))
+        self.record_change('timetable', 'reset')
+        self._occupancy = None
+
+    def courses_short_of_sessions(self):
+        """Courses with fewer sessions in the active timetable than credits"""
+        return [row[0] for row in self.execute_query(f'''SELECT c.course_id FROM courses c
+                                                     LEFT JOIN timetable t ON t.course_id = c.course_id
+                                                     AND t.version_id = {self.ACTIVE_VERSION}
+                                                     GROUP BY c.course_id
+                                                     HAVING COUNT(t.timetable_id) < MAX(COALESCE(c.credits, 1), 1)''')]
+
+    def snapshot_timetable(self):
+        """Copy the active timetable into a new, inactive version, e.g. before editing by hand"""
+        active = self.active_timetable_version()
+        if active is None:
+            raise ValueError("There is no timetable to snapshot yet")
+        with self.transaction():
+            version_id = self.copy_timetable_version(active, 'snapshot')
+            self.prune_timetable_versions()
+        return version_id
+
+    def copy_timetable_version(self, version_id, source):
+        """Copy a version's sessions into a new, inactive version and return its id"""
+        with self.transaction():
+            copy_id = self.execute_insert('''INSERT INTO timetable_versions
+                                          (created_at, source, unscheduled, score)
+                                          SELECT datetime('now'), ?, unscheduled, score
+                                          FROM timetable_versions WHERE version_id = ?''',
+                                          (source, version_id))
+            self.execute_query('''INSERT INTO timetable
+                               (course_id, faculty_id, room_id, day, slot_id, version_id)
+                               SELECT course_id, faculty_id, room_id, day, slot_id, ?
+                               FROM timetable WHERE version_id = ?''', (copy_id, version_id))
+            self.record_change('timetable_versions', 'insert', [copy_id])
+        return copy_id
+
+    def prune_timetable_versions(self, keep=None):
+        """Delete all but the newest keep (default keep_versions) inactive versions; returns their ids"""
+        keep = self.keep_versions if keep is None else keep
+        if keep is None:
+            return []
+        with self.transaction():
+            doomed = [row[0] for row in self.execute_query(f'''SELECT version_id FROM timetable_versions
+                                                          WHERE version_id IS NOT {self.ACTIVE_VERSION}
+                                                          ORDER BY version_id DESC LIMIT -1 OFFSET ?''',
+                                                          (keep,))]
+            if doomed:
+                # Their sessions go by ON DELETE CASCADE
+                self.execute_query(f'''DELETE FROM timetable_versions
+                                   WHERE version_id IN ({', '.join('?' * len(doomed))})''', doomed)
+                self.record_change('timetable_versions', 'delete', doomed)
+        return doomed
+
+    def diff_timetable_versions(self, old_version, new_version=None):
+        """Sessions moved, added and removed going from one version to another (default the active one).
+
+        Each version's (course, faculty, room, day, slot) rows are set-subtracted
+        from the other's in SQL, each read through idx_timetable_version_slot, so
+        sessions common to both are never read out. A course's sessions left on each side are
+        paired up in time order as moves; the rest were added or removed.
+        Returns {'moved': [(course_id, old (faculty_id, room_id, day, slot_id), new (...))],
+        'added': [(course_id, faculty_id, room_id, day, slot_id)], 'removed': [...]}.
+        """
+        if new_version is None:
+            new_version = self.active_timetable_version()
+            if new_version is None:
+                raise ValueError("There is no active timetable to compare with")
+        known = {row[0] for row in self.execute_query(
+            "SELECT version_id FROM timetable_versions WHERE version_id IN (?, ?)", (old_version, new_version))}
+        for version_id in (old_version, new_version):
+            if version_id not in known:
+                raise ValueError(f"Unknown timetable version {version_id}")
+
+        columns = "course_id, faculty_id, room_id, day, slot_id"
+        numbered = "ROW_NUMBER() OVER (PARTITION BY course_id ORDER BY day, slot_id, room_id)"
+        rows = self.execute_query(f'''
+            WITH gone AS (SELECT {columns} FROM timetable WHERE version_id = ?
+                          EXCEPT SELECT {columns} FROM timetable WHERE version_id = ?),
+                 came AS (SELECT {columns} FROM timetable WHERE version_id = ?
+                          EXCEPT SELECT {columns} FROM timetable WHERE version_id = ?),
+                 g AS (SELECT *, {numbered} AS n FROM gone),
+                 c AS (SELECT *, {numbered} AS n FROM came)
+            SELECT g.course_id, g.faculty_id, g.room_id, g.day, g.slot_id,
+                   c.course_id, c.faculty_id, c.room_id, c.day, c.slot_id
+            FROM g LEFT JOIN c ON g.course_id = c.course_id AND g.n = c.n
+            UNION ALL
+            SELECT NULL, NULL, NULL, NULL, NULL,
+                   c.course_id, c.faculty_id, c.room_id, c.day, c.slot_id
+            FROM c WHERE NOT EXISTS (SELECT 1 FROM g WHERE g.course_id = c.course_id AND g.n = c.n)''',
+            (old_version, new_version, new_version, old_version), cache=False)
+
+        diff = {'moved': [], 'added': [], 'removed': []}
+        for row in rows:
+            if row[0] is None:
+                diff['added'].append(row[5:])
+            elif row[5] is None:
+                diff['removed'].append(row[:5])
+            else:
+                diff['moved'].append((row[0], row[1:5], row[6:]))
+        for rows in diff.values():
+            rows.sort()
+        return diff
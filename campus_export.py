@@ -0,0 +1,263 @@
+"""Streaming export of the entity tables and the timetable to CSV, JSON Lines or iCalendar"""
+import csv
+import datetime
+import json
+import os
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import campus_scheduler
+from campus_import import FORMATS, detect_format
+
+
+# Column headers of each exportable listing, in the order DatabaseManager.iter_rows yields them
+EXPORT_COLUMNS = {
+    'students': ('student_id', 'name', 'department', 'semester', 'email'),
+    'faculty': ('faculty_id', 'name', 'department', 'email', 'phone'),
+    'courses': ('course_id', 'course_code', 'course_name', 'credits', 'department',
+                'faculty_id', 'room_type'),
+    'rooms': ('room_id', 'room_name', 'capacity', 'room_type', 'building'),
+    'timetable': ('timetable_id', 'course_code', 'course_name', 'faculty', 'room',
+                  'day', 'time_slot', 'day_number', 'start_minute', 'end_minute'),
+}
+
+# Tables whose changes show up in each export
+EXPORT_SOURCES = {
+    'students': ('students',),
+    'faculty': ('faculty',),
+    'courses': ('courses',),
+    'rooms': ('rooms',),
+    'timetable': ('timetable', 'time_slots', 'courses', 'faculty', 'rooms'),
+}
+
+# Remembers the table versions each export was written from, per output directory
+MANIFEST_NAME = '.campus-export.json'
+
+CALENDAR_KINDS = ('room', 'faculty', 'cohort')
+DEFAULT_WEEKS = 15
+
+FEED_SELECT = '''SELECT t.timetable_id, c.course_code, c.course_name, f.name,
+                 r.room_name, r.building, t.day, s.start_minute, s.end_minute
+                 FROM active_timetable a
+                 JOIN timetable t ON t.version_id = a.version_id
+                 JOIN time_slots s ON t.slot_id = s.slot_id
+                 JOIN courses c ON t.course_id = c.course_id
+                 JOIN faculty f ON t.faculty_id = f.faculty_id
+                 JOIN rooms r ON t.room_id = r.room_id'''
+
+FEED_CONDITIONS = {
+    'room': "t.room_id = ?",
+    'faculty': "t.faculty_id = ?",
+    'cohort': "c.department = ?",
+}
+
+
+def write_rows(f, columns, rows, fmt):
+    """Write rows to an open text file one at a time; returns how many were written"""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            f.write(json.dumps(dict(zip(columns, row))) + '\n')
+            count += 1
+    return count
+
+
+def load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def source_versions(db_manager, tables):
+    versions = db_manager.table_versions()
+    return {table: versions.get(table) for table in tables}
+
+
+def up_to_date(directory, key, stamp, paths):
+    """Whether the outputs exist and were written from the same table versions and options"""
+    return (load_manifest(directory).get(key) == stamp
+            and all(os.path.exists(path) for path in paths))
+
+
+def record_export(directory, key, stamp):
+    manifest = load_manifest(directory)
+    manifest[key] = stamp
+    save_manifest(directory, manifest)
+
+
+def export_file(db_manager, table, path, fmt=None, skip_unchanged=False):
+    """Stream a table to a CSV or JSON Lines file without loading it into memory.
+
+    Returns the number of rows written, or None if skip_unchanged found the file
+    already current.
+    """
+    if table not in EXPORT_COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    key = os.path.basename(path)
+    stamp = {'versions': source_versions(db_manager, EXPORT_SOURCES[table]),
+             'table': table, 'format': fmt}
+    if skip_unchanged and up_to_date(directory, key, stamp, [path]):
+        return None
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        count = write_rows(f, EXPORT_COLUMNS[table], db_manager.iter_rows(table), fmt)
+    if skip_unchanged:
+        record_export(directory, key, stamp)
+    return count
+
+
+# iCalendar
+
+def ical_text(value):
+    return (str(value or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def ical_line(f, line):
+    """Write a content line, folded at 75 octets as RFC 5545 requires"""
+    data = line.encode('utf-8')
+    while len(data) > 75:
+        cut = 75
+        # Do not split a multi-byte character
+        while data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        f.write(data[:cut] + b'\r\n ')
+        data = data[cut:]
+    f.write(data + b'\r\n')
+
+
+def term_monday(term_start=None):
+    """Monday of the week the term starts in (this week by default)"""
+    day = term_start or datetime.date.today()
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def write_calendar(path, name, rows, monday, weeks):
+    """Write one feed of weekly recurring events; returns the number of events"""
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    count = 0
+    with open(path + '.tmp', 'wb') as f:
+        for line in ('BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Campus Management System//EN',
+                     'CALSCALE:GREGORIAN', f'X-WR-CALNAME:{ical_text(name)}'):
+            ical_line(f, line)
+        for timetable_id, code, course_name, faculty, room, building, day, start, end in rows:
+            date = monday + datetime.timedelta(days=day)
+            (start_hour, start_minute), (end_hour, end_minute) = divmod(start, 60), divmod(end, 60)
+            for line in ('BEGIN:VEVENT',
+                         f'UID:timetable-{timetable_id}@campus',
+                         f'DTSTAMP:{stamp}',
+                         f'DTSTART:{date:%Y%m%d}T{start_hour:02d}{start_minute:02d}00',
+                         f'DTEND:{date:%Y%m%d}T{end_hour:02d}{end_minute:02d}00',
+                         f'RRULE:FREQ=WEEKLY;COUNT={weeks}',
+                         f'SUMMARY:{ical_text(f"{code} {course_name}")}',
+                         f'LOCATION:{ical_text(f"{room}, {building}" if building else room)}',
+                         f'DESCRIPTION:{ical_text(f"Taught by {faculty}")}',
+                         'END:VEVENT'):
+                ical_line(f, line)
+            count += 1
+        ical_line(f, 'END:VCALENDAR')
+    os.replace(path + '.tmp', path)
+    return count
+
+
+def feed_name(*parts):
+    return re.sub(r'[^\w.-]+', '_', '-'.join(str(part) for part in parts)).strip('_')
+
+
+def calendar_feeds(db_manager, kind):
+    """(file name, calendar title, query parameter, cohort year or None) of every feed of a kind"""
+    if kind == 'room':
+        return [(feed_name('room', room_id, name), f"Room {name}", room_id, None)
+                for room_id, name in db_manager.execute_query(
+                    "SELECT room_id, room_name FROM rooms ORDER BY room_id")]
+    if kind == 'faculty':
+        return [(feed_name('faculty', faculty_id, name), name, faculty_id, None)
+                for faculty_id, name in db_manager.execute_query(
+                    "SELECT faculty_id, name FROM faculty ORDER BY faculty_id")]
+    if kind == 'cohort':
+        return [(feed_name('cohort', department, f"year{year}"), f"{department} year {year}",
+                 department, year)
+                for department, year in sorted(db_manager.get_cohort_sizes())
+                if department]
+    raise ValueError(f"Unknown calendar kind: {kind}")
+
+
+def export_calendars(db_manager, kind, directory, term_start=None, weeks=DEFAULT_WEEKS,
+                     workers=None, skip_unchanged=True):
+    """Write one .ics feed per room, faculty member or student cohort, several at a time.
+
+    Returns {file name: event count}, or None when the feeds are already current.
+    """
+    if kind not in CALENDAR_KINDS:
+        raise ValueError(f"Unknown calendar kind: {kind}")
+    os.makedirs(directory, exist_ok=True)
+    monday = term_monday(term_start)
+    tables = ('timetable', 'time_slots', 'courses', 'faculty', 'rooms') + (('students',) if kind == 'cohort' else ())
+    feeds = calendar_feeds(db_manager, kind)
+    paths = [os.path.join(directory, name + '.ics') for name, _, _, _ in feeds]
+    key = f"calendars:{kind}"
+    stamp = {'versions': source_versions(db_manager, tables),
+             'term_start': monday.isoformat(), 'weeks': weeks}
+    if skip_unchanged and up_to_date(directory, key, stamp, paths):
+        return None
+
+    query = f"{FEED_SELECT} WHERE {FEED_CONDITIONS[kind]} ORDER BY t.day, s.start_minute, t.timetable_id"
+
+    def write_feed(feed):
+        name, title, param, year = feed
+        # Each worker thread reads through its own pooled connection
+        rows = db_manager.iter_query(query, (param,))
+        if year is not None:
+            rows = (row for row in rows if campus_scheduler.course_level(row[1]) == year)
+        return name + '.ics', write_calendar(os.path.join(directory, name + '.ics'),
+                                             title, rows, monday, weeks)
+
+    pending = queue.SimpleQueue()
+    for feed in feeds:
+        pending.put(feed)
+
+    def write_feeds():
+        # Each worker drains the queue, then closes the connection it opened so
+        # repeated exports do not leave one behind per thread
+        counts = {}
+        try:
+            while True:
+                try:
+                    feed = pending.get_nowait()
+                except queue.Empty:
+                    return counts
+                name, count = write_feed(feed)
+                counts[name] = count
+        finally:
+            db_manager.close_thread_connection()
+
+    workers = min(workers or min(8, (os.cpu_count() or 1) + 4), max(len(feeds), 1))
+    written = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for done in [pool.submit(write_feeds) for _ in range(workers)]:
+            written.update(done.result())
+    counts = {name + '.ics': written[name + '.ics'] for name, _, _, _ in feeds}
+    if skip_unchanged:
+        record_export(directory, key, stamp)
+    return counts
@@ -0,0 +1,161 @@
+"""Streaming bulk import of students, faculty, courses and rooms from CSV or JSON Lines"""
+import csv
+import json
+import os
+from itertools import islice
+
+
+# Importable columns of each entity table, in table order (the id column is assigned on insert)
+ENTITY_FIELDS = {
+    'students': ('name', 'department', 'semester', 'email'),
+    'faculty': ('name', 'department', 'email', 'phone'),
+    'courses': ('course_code', 'course_name', 'credits', 'department', 'faculty_id', 'room_type'),
+    'rooms': ('room_name', 'capacity', 'room_type', 'building'),
+}
+
+REQUIRED_FIELDS = {
+    'students': ('name',),
+    'faculty': ('name',),
+    'courses': ('course_code', 'faculty_id'),
+    'rooms': ('room_name',),
+}
+
+DEFAULTS = {'room_type': 'Classroom'}
+
+INTEGER_FIELDS = {'semester', 'credits', 'faculty_id', 'capacity'}
+
+FORMATS = ('csv', 'jsonl')
+
+
+class ImportResult:
+    """Running totals of an import, handed to the progress callback after every chunk"""
+
+    # Rejected rows kept in memory for reporting; the rest are only counted (or written to reject_file)
+    MAX_REJECTS_KEPT = 1000
+
+    def __init__(self, entity, path):
+        self.entity = entity
+        self.path = path
+        self.processed = 0
+        self.imported = 0
+        self.rejected_count = 0
+        self.rejected = []
+        self.ids = []
+
+    def reject(self, line_no, reason):
+        self.rejected_count += 1
+        if len(self.rejected) < self.MAX_REJECTS_KEPT:
+            self.rejected.append((line_no, reason))
+
+    def summary(self):
+        return (f"{self.entity}: {self.imported} imported, "
+                f"{self.rejected_count} rejected of {self.processed} rows")
+
+
+def detect_format(path):
+    """Guess the file format from its extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    return 'csv'
+
+
+def read_records(path, fmt=None):
+    """Yield (line_no, record dict) pairs from a CSV or JSON Lines file, one at a time"""
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_no, ValueError(f"Invalid JSON: {e}")
+                    continue
+                yield line_no, record
+
+
+def validate_record(entity, record, faculty_ids=None):
+    """Convert a raw record into an insertable row tuple, raising ValueError if it is invalid"""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Record is not an object")
+
+    row = []
+    for field in ENTITY_FIELDS[entity]:
+        value = record.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in ('', None):
+            if field in REQUIRED_FIELDS[entity]:
+                raise ValueError(f"Missing {field}")
+            value = DEFAULTS.get(field)
+        elif field in INTEGER_FIELDS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{field} must be an integer, got {value!r}")
+        row.append(value)
+
+    if entity == 'courses' and faculty_ids is not None and row[4] not in faculty_ids:
+        raise ValueError(f"Unknown faculty_id {row[4]}")
+    return tuple(row)
+
+
+def import_file(db_manager, entity, path, fmt=None, chunk_size=5000,
+                progress=None, reject_file=None):
+    """Stream a file into an entity table in chunks, all inside a single transaction"""
+    if entity not in ENTITY_FIELDS:
+        raise ValueError(f"Unknown entity: {entity}")
+
+    result = ImportResult(entity, path)
+    records = read_records(path, fmt)
+    rejects_out = open(reject_file, 'w', encoding='utf-8') if reject_file else None
+    try:
+        with db_manager.transaction():
+            faculty_ids = None
+            if entity == 'courses':
+                faculty_ids = {row[0] for row in
+                               db_manager.execute_query("SELECT faculty_id FROM faculty")}
+
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+
+                rows = []
+                for line_no, record in chunk:
+                    result.processed += 1
+                    try:
+                        rows.append(validate_record(entity, record, faculty_ids))
+                    except ValueError as e:
+                        result.reject(line_no, str(e))
+                        if rejects_out:
+                            rejects_out.write(json.dumps(
+                                {'line': line_no, 'error': str(e),
+                                 'record': record if isinstance(record, dict) else None}) + '\n')
+
+                ids = db_manager.bulk_insert(entity, rows, ENTITY_FIELDS[entity])
+                result.imported += len(rows)
+                if len(ids):
+                    # Keep id ranges as (start, stop) pairs, merging contiguous blocks
+                    if result.ids and result.ids[-1][1] == ids.start:
+                        result.ids[-1] = (result.ids[-1][0], ids.stop)
+                    else:
+                        result.ids.append((ids.start, ids.stop))
+                if progress:
+                    progress(result)
+    finally:
+        if rejects_out:
+            rejects_out.close()
+    return result
@@ -0,0 +1,174 @@
+"""Opt-in latency histograms, timing spans and a slow-query log, exportable as JSON or Prometheus text"""
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# Distinct query shapes tracked before the rest are pooled under one label
+MAX_SHAPES = 500
+SLOW_LOG_SIZE = 100
+
+IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+
+
+def query_shape(query):
+    """Normalise a statement so calls differing only in whitespace or IN-list length group together"""
+    return IN_LIST.sub("IN (?, ...)", ' '.join(query.split()))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+
+    def snapshot(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(BUCKETS + ('+Inf',), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'count': self.count, 'sum': self.total, 'buckets': buckets}
+
+
+class QueryStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.rows = 0
+
+
+class Metrics:
+    """Collected measurements; every recording method is safe to call from any thread"""
+
+    def __init__(self, slow_threshold=0.1):
+        self.slow_threshold = slow_threshold
+        self.queries = {}
+        self.spans = {}
+        self.connections = Histogram()
+        self.slow_queries = deque(maxlen=SLOW_LOG_SIZE)
+        self.slow_count = 0
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def record_query(self, query, seconds, rows):
+        shape = query_shape(query)
+        with self.lock:
+            stats = self.queries.get(shape)
+            if stats is None:
+                if len(self.queries) >= MAX_SHAPES:
+                    shape = 'other'
+                    stats = self.queries.get(shape)
+                if stats is None:
+                    stats = self.queries[shape] = QueryStats()
+            stats.latency.observe(seconds)
+            stats.rows += rows
+
+    def record_slow(self, query, params, seconds, rows, plan):
+        entry = {'time': time.time(), 'query': query_shape(query),
+                 'params': [repr(p) for p in params or ()],
+                 'seconds': seconds, 'rows': rows, 'plan': plan}
+        with self.lock:
+            self.slow_queries.append(entry)
+            self.slow_count += 1
+
+    def record_connection(self, seconds):
+        with self.lock:
+            self.connections.observe(seconds)
+
+    def observe_span(self, name, seconds):
+        with self.lock:
+            histogram = self.spans.get(name)
+            if histogram is None:
+                histogram = self.spans[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_span(name, time.perf_counter() - start)
+
+    def snapshot(self, extra=None):
+        """Everything recorded so far as plain data"""
+        with self.lock:
+            data = {
+                'started': self.started,
+                'taken': time.time(),
+                'slow_threshold': self.slow_threshold,
+                'queries': {shape: dict(stats.latency.snapshot(), rows=stats.rows)
+                            for shape, stats in self.queries.items()},
+                'spans': {name: histogram.snapshot() for name, histogram in self.spans.items()},
+                'connections': self.connections.snapshot(),
+                'slow_queries_total': self.slow_count,
+                'slow_queries': list(self.slow_queries),
+            }
+        if extra:
+            data.update(extra)
+        return data
+
+    def to_json(self, extra=None):
+        return json.dumps(self.snapshot(extra), indent=2)
+
+    def to_prometheus(self, extra=None):
+        """The snapshot in the Prometheus text exposition format"""
+        data = self.snapshot(extra)
+        lines = []
+
+        def histogram(name, help_text, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, values in series:
+                for bound, count in values['buckets'].items():
+                    lines.append(f"{name}_bucket{{{labels}{',' if labels else ''}le=\"{bound}\"}} {count}")
+                suffix = f"{{{labels}}}" if labels else ""
+                lines.append(f"{name}_sum{suffix} {values['sum']}")
+                lines.append(f"{name}_count{suffix} {values['count']}")
+
+        histogram('campus_query_seconds', "SQL statement latency by query shape",
+                  [(f'query="{label_value(shape)}"', values) for shape, values in data['queries'].items()])
+        lines.append("# HELP campus_query_rows_total Rows returned by query shape")
+        lines.append("# TYPE campus_query_rows_total counter")
+        for shape, values in data['queries'].items():
+            lines.append(f'campus_query_rows_total{{query="{label_value(shape)}"}} {values["rows"]}')
+        histogram('campus_span_seconds', "Duration of instrumented operations",
+                  [(f'span="{label_value(name)}"', values) for name, values in data['spans'].items()])
+        histogram('campus_connection_open_seconds', "Time to open and configure a connection",
+                  [('', data['connections'])])
+        lines.append("# HELP campus_slow_queries_total Statements slower than the threshold")
+        lines.append("# TYPE campus_slow_queries_total counter")
+        lines.append(f"campus_slow_queries_total {data['slow_queries_total']}")
+        for name, value in (data.get('cache') or {}).items():
+            if name in ('entries', 'bytes'):
+                lines.append(f"# TYPE campus_cache_{name} gauge")
+                lines.append(f"campus_cache_{name} {value}")
+            else:
+                lines.append(f"# TYPE campus_cache_{name}_total counter")
+                lines.append(f"campus_cache_{name}_total {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path, extra=None):
+        """Write a .prom file (Prometheus text) or anything else as JSON, atomically"""
+        text = self.to_prometheus(extra) if path.endswith('.prom') else self.to_json(extra)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(path + '.tmp', path)
+
+
+def label_value(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
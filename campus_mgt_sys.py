@@ -1,257 +1,411 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import sqlite3
-import random
-import json
-
-
-class DatabaseManager:
-    def __init__(self):
-        self.db_name = "campus_management.db"
-        self.init_database()
-
-    def init_database(self):
-        """Initialize database with required tables"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-
-        # Students table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS students (
-            student_id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            department TEXT,
-            semester INTEGER,
-            email TEXT
-        )''')
-
-        # Faculty table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS faculty (
-            faculty_id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            department TEXT,
-            email TEXT,
-            phone TEXT
-        )''')
-
-        # Courses table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS courses (
-            course_id INTEGER PRIMARY KEY,
-            course_code TEXT NOT NULL,
-            course_name TEXT,
-            credits INTEGER,
-            department TEXT,
-            faculty_id INTEGER,
-            FOREIGN KEY (faculty_id) REFERENCES faculty (faculty_id)
-        )''')
-
-        # Rooms table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS rooms (
-            room_id INTEGER PRIMARY KEY,
-            room_name TEXT NOT NULL,
-            capacity INTEGER,
-            room_type TEXT,
-            building TEXT
-        )''')
-
-        # Timetable table
-        cursor.execute('''CREATE TABLE IF NOT EXISTS timetable (
-            timetable_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            course_id INTEGER,
-            faculty_id INTEGER,
-            room_id INTEGER,
-            day TEXT,
-            time_slot TEXT,
-            FOREIGN KEY (course_id) REFERENCES courses (course_id),
-            FOREIGN KEY (faculty_id) REFERENCES faculty (faculty_id),
-            FOREIGN KEY (room_id) REFERENCES rooms (room_id)
-        )''')
-
-        # Insert sample data if tables are empty
-        self.insert_sample_data(conn)
-        conn.commit()
-        conn.close()
-
-    def insert_sample_data(self, conn):
-        """Insert sample data into the database"""
-        cursor = conn.cursor()
-
-        # Check if data already exists
-        cursor.execute("SELECT COUNT(*) FROM students")
-        if cursor.fetchone()[0] > 0:
-            return
+from tkinter import ttk, messagebox, simpledialog, filedialog
+import bisect
+import queue
+import threading
 
-        # Sample students
-        students_data = [
-            (1, 'Alice Johnson', 'CSE', 3, 'alice@college.edu'),
-            (2, 'Bob Smith', 'CSE', 3, 'bob@college.edu'),
-            (3, 'Carol Davis', 'ECE', 2, 'carol@college.edu'),
-            (4, 'David Wilson', 'ECE', 2, 'david@college.edu'),
-            (5, 'Eva Brown', 'CSE', 4, 'eva@college.edu')
-        ]
-        cursor.executemany(
-            'INSERT OR IGNORE INTO students VALUES (?, ?, ?, ?, ?)', students_data)
-
-        # Sample faculty
-        faculty_data = [
-            (1, 'Dr. Sharma', 'CSE', 'sharma@college.edu', '9876543210'),
-            (2, 'Dr. Verma', 'CSE', 'verma@college.edu', '9876543211'),
-            (3, 'Dr. Gupta', 'ECE', 'gupta@college.edu', '9876543212'),
-            (4, 'Dr. Singh', 'ECE', 'singh@college.edu', '9876543213')
-        ]
-        cursor.executemany(
-            'INSERT OR IGNORE INTO faculty VALUES (?, ?, ?, ?, ?)', faculty_data)
-
-        # Sample courses
-        courses_data = [
-            (1, 'CSE101', 'Introduction to Programming', 3, 'CSE', 1),
-            (2, 'CSE102', 'Data Structures', 4, 'CSE', 1),
-            (3, 'CSE201', 'Algorithms', 4, 'CSE', 2),
-            (4, 'ECE101', 'Digital Electronics', 3, 'ECE', 3),
-            (5, 'ECE102', 'Signals & Systems', 4, 'ECE', 4),
-            (6, 'CSE301', 'Database Systems', 4, 'CSE', 2)
-        ]
-        cursor.executemany(
-            'INSERT OR IGNORE INTO courses VALUES (?, ?, ?, ?, ?, ?)', courses_data)
-
-        # Sample rooms
-        rooms_data = [
-            (1, 'C-101', 60, 'Classroom', 'Main Building'),
-            (2, 'C-102', 45, 'Classroom', 'Main Building'),
-            (3, 'Lab-201', 30, 'Lab', 'Tech Building'),
-            (4, 'Lab-202', 25, 'Lab', 'Tech Building'),
-            (5, 'C-103', 50, 'Classroom', 'Main Building')
-        ]
-        cursor.executemany(
-            'INSERT OR IGNORE INTO rooms VALUES (?, ?, ?, ?, ?)', rooms_data)
-
-    def execute_query(self, query, params=()):
-        """Execute query on database"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        result = cursor.fetchall()
-        conn.commit()
-        conn.close()
-        return result
-
-    def get_all_students(self):
-        return self.execute_query("SELECT * FROM students")
-
-    def get_all_faculty(self):
-        return self.execute_query("SELECT * FROM faculty")
-
-    def get_all_courses(self):
-        return self.execute_query("SELECT * FROM courses")
-
-    def get_all_rooms(self):
-        return self.execute_query("SELECT * FROM rooms")
-
-    def get_timetable(self):
-        return self.execute_query('''SELECT t.timetable_id, c.course_code, c.course_name, 
-                                   f.name, r.room_name, t.day, t.time_slot
-                                   FROM timetable t
-                                   JOIN courses c ON t.course_id = c.course_id
-                                   JOIN faculty f ON t.faculty_id = f.faculty_id
-                                   JOIN rooms r ON t.room_id = r.room_id
-                                   ORDER BY t.day, t.time_slot''')
-
-    def add_student(self, name, department, semester, email):
-        student_id = self.get_next_id("students", "student_id")
-        self.execute_query('INSERT INTO students VALUES (?, ?, ?, ?, ?)',
-                           (student_id, name, department, semester, email))
-        return student_id
-
-    def add_faculty(self, name, department, email, phone):
-        faculty_id = self.get_next_id("faculty", "faculty_id")
-        self.execute_query('INSERT INTO faculty VALUES (?, ?, ?, ?, ?)',
-                           (faculty_id, name, department, email, phone))
-        return faculty_id
-
-    def add_course(self, course_code, course_name, credits, department, faculty_id):
-        course_id = self.get_next_id("courses", "course_id")
-        self.execute_query('INSERT INTO courses VALUES (?, ?, ?, ?, ?, ?)',
-                           (course_id, course_code, course_name, credits, department, faculty_id))
-        return course_id
-
-    def add_room(self, room_name, capacity, room_type, building):
-        room_id = self.get_next_id("rooms", "room_id")
-        self.execute_query('INSERT INTO rooms VALUES (?, ?, ?, ?, ?)',
-                           (room_id, room_name, capacity, room_type, building))
-        return room_id
-
-    def get_next_id(self, table_name, id_column):
-        """Get next available ID for a table"""
-        result = self.execute_query(
-            f"SELECT MAX({id_column}) FROM {table_name}")
-        max_id = result[0][0] if result[0][0] is not None else 0
-        return max_id + 1
-
-    def delete_student(self, student_id):
-        self.execute_query(
-            "DELETE FROM students WHERE student_id = ?", (student_id,))
-
-    def delete_faculty(self, faculty_id):
-        self.execute_query(
-            "DELETE FROM faculty WHERE faculty_id = ?", (faculty_id,))
-
-    def delete_course(self, course_id):
-        self.execute_query(
-            "DELETE FROM courses WHERE course_id = ?", (course_id,))
-
-    def delete_room(self, room_id):
-        self.execute_query("DELETE FROM rooms WHERE room_id = ?", (room_id,))
+import campus_export
+import campus_import
+from campus_db import DatabaseManager
 
-    def generate_timetable(self):
-        """Generate a simple random timetable"""
-        # Clear existing timetable
-        self.execute_query("DELETE FROM timetable")
 
-        courses = self.get_all_courses()
-        faculty = self.get_all_faculty()
-        rooms = self.get_all_rooms()
+class TaskCancelled(Exception):
+    """Raised inside a background task once the user has cancelled it"""
+
 
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        time_slots = ['9:00-10:00', '10:00-11:00',
-                      '11:00-12:00', '2:00-3:00', '3:00-4:00']
+class BackgroundTask:
+    """Handle a background job uses to report progress and notice cancellation"""
 
-        timetable_data = []
+    def __init__(self, runner, name):
+        self.runner = runner
+        self.name = name
+        self._cancelled = threading.Event()
 
-        for course in courses:
-            course_id, course_code, course_name, credits, department, faculty_id = course
+    def cancel(self):
+        self._cancelled.set()
 
-            # Assign random day and time slot
-            day = random.choice(days)
-            time_slot = random.choice(time_slots)
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
 
-            # Assign random room
-            room = random.choice(rooms)
-            room_id = room[0]
+    def progress(self, fraction=None, message=None):
+        """Report progress from the worker thread; raises TaskCancelled after cancel()"""
+        if self.cancelled:
+            raise TaskCancelled(f"{self.name} cancelled")
+        self.runner.post(self.runner.on_progress, self, fraction, message)
 
-            timetable_data.append(
-                (course_id, faculty_id, room_id, day, time_slot))
 
-        # Insert into timetable
-        for entry in timetable_data:
-            self.execute_query('''INSERT INTO timetable 
-                               (course_id, faculty_id, room_id, day, time_slot) 
-                               VALUES (?, ?, ?, ?, ?)''', entry)
+class TaskRunner:
+    """Runs database and scheduling work on a worker thread, off the Tk mainloop.
 
-        return len(timetable_data)
+    Jobs run one at a time in submission order, so writes never interleave. Results,
+    errors and progress are queued and delivered on the Tk thread by polling with
+    root.after, since Tk must only be touched from the thread that created it.
+    """
+
+    POLL_MS = 50
+
+    def __init__(self, root, on_start=None, on_progress=None, on_finish=None):
+        self.root = root
+        self.on_start = on_start or (lambda task: None)
+        self.on_progress = on_progress or (lambda task, fraction, message: None)
+        self.on_finish = on_finish or (lambda task: None)
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = []
+        self.worker = threading.Thread(target=self.work, name="campus-worker", daemon=True)
+        self.worker.start()
+        self.root.after(self.POLL_MS, self.poll)
+
+    def submit(self, job, on_done=None, on_error=None, name="Task"):
+        """Queue job(task); on_done(result) or on_error(exception) then runs on the Tk thread"""
+        task = BackgroundTask(self, name)
+        self.pending.append(task)
+        self.jobs.put((task, job, on_done, on_error))
+        return task
+
+    def cancel_all(self):
+        for task in self.pending:
+            task.cancel()
+
+    @property
+    def busy(self):
+        return bool(self.pending)
+
+    def post(self, callback, *args):
+        """Schedule a callback to run on the Tk thread"""
+        self.results.put((callback, args))
+
+    def work(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                return
+            task, job, on_done, on_error = item
+            self.post(self.on_start, task)
+            try:
+                if task.cancelled:
+                    raise TaskCancelled(f"{task.name} cancelled")
+                result = job(task)
+            except Exception as e:
+                if on_error:
+                    self.post(on_error, e)
+            else:
+                if on_done:
+                    self.post(on_done, result)
+            finally:
+                self.post(self.finished, task)
+
+    def finished(self, task):
+        self.pending.remove(task)
+        self.on_finish(task)
+
+    def poll(self):
+        try:
+            while True:
+                callback, args = self.results.get_nowait()
+                callback(*args)
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_MS, self.poll)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.jobs.put(None)
+
+
+class VirtualTreeview:
+    """Shows a large table in a ttk.Treeview by paging rows in as the user scrolls.
+
+    Only the visible rows exist as Tk items. A buffer of nearby rows is kept in Python
+    and refilled with keyset queries on the worker thread; OFFSET is only used to jump
+    after a scrollbar drag. Database change events are applied to the buffer row by
+    row, and re-rendering only touches the items whose rows changed.
+    """
+
+    BUFFER_ROWS = 300
+    ROW_HEIGHT = 20
+
+    def __init__(self, app, tree, scrollbar, table, skip=0):
+        self.app = app
+        self.db_manager = app.db_manager
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.table = table
+        self.skip = skip
+        self.visible = int(tree.cget('height'))
+        self.total = 0
+        self.start = 0
+        self.buffer = []
+        self.buffer_start = 0
+        self.fetching = False
+        self.stale = False
+        self.version = None
+        # Values currently shown per item iid, to skip untouched rows on re-render
+        self.shown = {}
+        self.search = ''
+        self.filters = {}
+
+        scrollbar.configure(command=self.yview)
+        tree.configure(yscrollcommand=lambda *args: None)
+        tree.bind('<Configure>', self.on_resize)
+        tree.bind('<MouseWheel>', lambda e: self.scroll_to(self.start - e.delta // 40))
+        tree.bind('<Button-4>', lambda e: self.scroll_to(self.start - 3))
+        tree.bind('<Button-5>', lambda e: self.scroll_to(self.start + 3))
+        tree.bind('<Next>', lambda e: self.scroll_to(self.start + self.visible))
+        tree.bind('<Prior>', lambda e: self.scroll_to(self.start - self.visible))
+        tree.bind('<Down>', lambda e: self.on_arrow(1))
+        tree.bind('<Up>', lambda e: self.on_arrow(-1))
+
+    def iid(self, row):
+        return str(row[0])
+
+    def on_resize(self, event):
+        visible = max(1, (event.height - self.ROW_HEIGHT) // self.ROW_HEIGHT)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.start)
+
+    def on_arrow(self, step):
+        items = self.tree.get_children()
+        if items and self.tree.focus() == items[-1 if step > 0 else 0]:
+            self.scroll_to(self.start + step)
+            items = self.tree.get_children()
+            if items:
+                edge = items[-1 if step > 0 else 0]
+                self.tree.focus(edge)
+                self.tree.selection_set(edge)
+            return 'break'
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'/'pages')"""
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * self.total))
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (self.visible if args[2] == 'pages' else 1)
+            self.scroll_to(self.start + step)
+
+    def scroll_to(self, start):
+        self.start = max(0, min(start, self.total - self.visible))
+        if self.covered():
+            self.render()
+        else:
+            self.fetch()
+
+    def covered(self):
+        end = min(self.start + self.visible, self.total)
+        return self.buffer_start <= self.start and end <= self.buffer_start + len(self.buffer)
+
+    def set_query(self, search='', filters=None):
+        """Show only the rows matching a text search and column filters"""
+        self.search = search
+        self.filters = dict(filters or {})
+        self.start = 0
+        self.buffer, self.buffer_start = [], 0
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Reload the rows around the current position if the table changed since the last load"""
+        self.fetch(recount=True, force=force)
+
+    def fetch(self, recount=False, force=False):
+        if self.fetching:
+            self.stale = self.stale or recount
+            return
+        self.fetching = True
+        known_version = None if force else self.version
+
+        # Work out the cheapest query on the Tk thread, from the current buffer
+        low = max(0, self.start - max(self.BUFFER_ROWS, self.visible * 3) // 3)
+        buffer, buffer_start = self.buffer, self.buffer_start
+        table, limit = self.table, max(self.BUFFER_ROWS, self.visible * 3)
+        db = self.db_manager
+        query = {'search': self.search, 'filters': self.filters}
+
+        def load(task):
+            with db.span(f"gui.load.{table}"):
+                version = None
+                if recount:
+                    version = db.table_versions().get(table)
+                    if version is not None and version == known_version:
+                        return None
+                total = db.count_rows(table, **query) if recount else None
+                if recount or not buffer:
+                    rows = db.get_page(table, limit, offset=low, **query)
+                elif buffer_start < low <= buffer_start + len(buffer):
+                    # Scrolling forward: continue after a row we already hold
+                    kept = buffer[low - buffer_start:]
+                    after = db.page_key(table, buffer[-1])
+                    rows = kept + db.get_page(table, limit - len(kept), after=after, **query)
+                elif low < buffer_start <= low + limit:
+                    # Scrolling back: fetch the rows just before the buffer
+                    before = db.page_key(table, buffer[0])
+                    rows = db.get_page(table, buffer_start - low, before=before, **query)
+                    rows += buffer[:limit - len(rows)]
+                else:
+                    rows = db.get_page(table, limit, offset=low, **query)
+                return total, low, rows, version
+
+        self.app.run_task(load, on_done=self.loaded,
+                          error_message=f"Failed to load {self.table}",
+                          name=f"Loading {self.table}")
+
+    def loaded(self, result):
+        self.fetching = False
+        if result is not None:
+            total, low, rows, version = result
+            if total is not None:
+                self.total = total
+            if version is not None:
+                self.version = version
+            self.buffer, self.buffer_start = rows, low
+            self.start = max(0, min(self.start, self.total - self.visible))
+        if self.stale:
+            self.stale = False
+            self.refresh()
+        elif not self.covered():
+            self.fetch()
+        else:
+            with self.db_manager.span(f"gui.render.{self.table}"):
+                self.render()
+
+    def apply_change(self, op, keys, version=None):
+        """Fold a database change event into the buffer without reloading the window"""
+        if (op == 'reset' or len(keys) > self.BUFFER_ROWS or self.fetching
+                or self.search or any(self.filters.values())):
+            self.refresh(force=True)
+            return
+        if op == 'delete':
+            keys = set(keys)
+            kept = [row for row in self.buffer if row[0] not in keys]
+            if len(self.buffer) - len(kept) != len(keys):
+                # Some deleted rows lie outside the buffer, so positions are unknown
+                self.refresh(force=True)
+                return
+            self.buffer = kept
+            self.total -= len(keys)
+            self.version = version
+            self.scroll_to(self.start)
+            return
+
+        table, db = self.table, self.db_manager
+        self.fetching = True
+        self.app.run_task(lambda task: db.get_rows(table, keys),
+                          on_done=lambda rows: self.merge(op, rows, version),
+                          error_message=f"Failed to load {self.table}",
+                          name=f"Loading {self.table}")
+
+    def merge(self, op, rows, version):
+        """Place inserted or updated rows into the buffer by their sort key"""
+        self.fetching = False
+        db, table = self.db_manager, self.table
+        at_end = self.buffer_start + len(self.buffer) >= self.total
+        by_id = {row[0]: i for i, row in enumerate(self.buffer)}
+        for row in rows:
+            if row[0] in by_id:
+                self.buffer[by_id[row[0]]] = row
+                continue
+            if op != 'insert':
+                continue
+            self.total += 1
+            key = db.page_key(table, row)
+            if self.buffer and key < db.page_key(table, self.buffer[0]):
+                self.buffer_start += 1
+            elif not self.buffer or key < db.page_key(table, self.buffer[-1]) or at_end:
+                keys = [db.page_key(table, r) for r in self.buffer]
+                self.buffer.insert(bisect.bisect(keys, key), row)
+        by_id.clear()
+        if version is not None:
+            self.version = version
+        if self.stale:
+            self.stale = False
+            self.refresh()
+        else:
+            self.scroll_to(self.start)
+
+    def render(self):
+        """Bring the Tk items in line with the visible rows, touching only what differs"""
+        offset = self.start - self.buffer_start
+        rows = self.buffer[offset:offset + self.visible]
+        wanted = [(self.iid(row), tuple(row[self.skip:])) for row in rows]
+        wanted_ids = {iid for iid, _ in wanted}
+
+        gone = [iid for iid in self.tree.get_children() if iid not in wanted_ids]
+        if gone:
+            self.tree.delete(*gone)
+            for iid in gone:
+                self.shown.pop(iid, None)
+        for index, (iid, values) in enumerate(wanted):
+            if iid not in self.shown:
+                self.tree.insert('', index, iid=iid, values=values)
+            else:
+                if self.shown[iid] != values:
+                    self.tree.item(iid, values=values)
+                if self.tree.index(iid) != index:
+                    self.tree.move(iid, '', index)
+            self.shown[iid] = values
+
+        if self.total:
+            self.scrollbar.set(self.start / self.total,
+                               min(1.0, (self.start + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
 
 
 class CampusManagementApp:
-    def __init__(self, root):
+    # Pause after the last keystroke before a search runs
+    SEARCH_DELAY_MS = 250
+
+    def __init__(self, root, db_manager=None):
         self.root = root
         self.root.title("Campus Management System")
         self.root.geometry("1200x700")
 
-        self.db_manager = DatabaseManager()
+        self.db_manager = db_manager or DatabaseManager()
+        self.tasks = TaskRunner(root, on_start=self.task_started,
+                                on_progress=self.task_progress, on_finish=self.task_finished)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
         self.setup_gui()
+        self.views = {'students': self.students_view, 'faculty': self.faculty_view,
+                      'courses': self.courses_view, 'rooms': self.rooms_view,
+                      'timetable': self.timetable_view}
+        self.stats_queued = False
+        self.db_manager.subscribe(self.on_db_change)
         self.load_initial_data()
 
+    def close(self):
+        """Stop the worker thread and close the window"""
+        self.db_manager.unsubscribe(self.on_db_change)
+        self.tasks.shutdown()
+        self.root.destroy()
+
+    def on_db_change(self, table, op, keys, version):
+        """Database listener; changes are made on the worker thread, so hop to Tk"""
+        self.tasks.post(self.table_changed, table, op, keys, version)
+
+    def table_changed(self, table, op, keys, version):
+        """Apply a committed change to the affected list and refresh the counts once"""
+        view = self.views.get(table)
+        if view is not None:
+            view.apply_change(op, keys, version)
+        if not self.stats_queued:
+            self.stats_queued = True
+            self.root.after_idle(self.update_stats)
+
     def setup_gui(self):
         """Setup the main GUI interface"""
+        # Status bar showing background job progress
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side='bottom', fill='x', padx=10, pady=(0, 5))
+        self.status_label = ttk.Label(status_frame, text="Ready")
+        self.status_label.pack(side='left')
+        self.cancel_btn = ttk.Button(status_frame, text="Cancel",
+                                     command=self.tasks.cancel_all, state='disabled')
+        self.cancel_btn.pack(side='right', padx=5)
+        self.progress_bar = ttk.Progressbar(status_frame, length=200, maximum=1.0)
+        self.progress_bar.pack(side='right', padx=5)
+
         # Create notebook for tabs
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill='both', expand=True, padx=10, pady=10)
@@ -325,6 +479,21 @@ class CampusManagementApp:
         self.rooms_count_label.grid(
             row=1, column=1, padx=20, pady=10, sticky='w')
 
+        self.utilisation_label = ttk.Label(
+            stats_frame, text="Room utilisation: Loading...", font=('Arial', 12))
+        self.utilisation_label.grid(
+            row=2, column=0, padx=20, pady=10, sticky='w')
+
+        self.conflicts_label = ttk.Label(
+            stats_frame, text="Timetable clashes: Loading...", font=('Arial', 12))
+        self.conflicts_label.grid(
+            row=2, column=1, padx=20, pady=10, sticky='w')
+
+        self.departments_label = ttk.Label(
+            stats_frame, text="", font=('Arial', 10), justify='left')
+        self.departments_label.grid(
+            row=3, column=0, columnspan=2, padx=20, pady=10, sticky='w')
+
         # Control buttons
         button_frame = ttk.Frame(self.dashboard_frame)
         button_frame.pack(pady=30)
@@ -333,9 +502,13 @@ class CampusManagementApp:
                                   command=self.generate_timetable, width=20)
         generate_btn.grid(row=0, column=0, padx=10)
 
+        optimise_btn = ttk.Button(button_frame, text="Optimise Timetable",
+                                  command=self.optimise_timetable, width=20)
+        optimise_btn.grid(row=0, column=1, padx=10)
+
         refresh_btn = ttk.Button(button_frame, text="Refresh All Data",
                                  command=self.load_initial_data, width=20)
-        refresh_btn.grid(row=0, column=1, padx=10)
+        refresh_btn.grid(row=0, column=2, padx=10)
 
     def setup_students_tab(self):
         """Setup students management tab"""
@@ -350,6 +523,10 @@ class CampusManagementApp:
                    command=self.add_student).pack(side='left', padx=5)
         ttk.Button(student_btn_frame, text="Delete Student",
                    command=self.delete_student).pack(side='left', padx=5)
+        ttk.Button(student_btn_frame, text="Import...",
+                   command=lambda: self.import_data('students')).pack(side='left', padx=5)
+        ttk.Button(student_btn_frame, text="Export...",
+                   command=lambda: self.export_data('students')).pack(side='left', padx=5)
         ttk.Button(student_btn_frame, text="Refresh",
                    command=self.load_students_data).pack(side='left', padx=5)
 
@@ -361,9 +538,9 @@ class CampusManagementApp:
             self.students_tree.heading(col, text=col)
             self.students_tree.column(col, width=120)
 
-        scrollbar = ttk.Scrollbar(
-            main_frame, orient='vertical', command=self.students_tree.yview)
-        self.students_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(main_frame, orient='vertical')
+        self.students_view = VirtualTreeview(self, self.students_tree, scrollbar, 'students')
+        self.setup_search_bar(main_frame, self.students_view)
 
         self.students_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
@@ -381,6 +558,10 @@ class CampusManagementApp:
                    command=self.add_faculty).pack(side='left', padx=5)
         ttk.Button(faculty_btn_frame, text="Delete Faculty",
                    command=self.delete_faculty).pack(side='left', padx=5)
+        ttk.Button(faculty_btn_frame, text="Import...",
+                   command=lambda: self.import_data('faculty')).pack(side='left', padx=5)
+        ttk.Button(faculty_btn_frame, text="Export...",
+                   command=lambda: self.export_data('faculty')).pack(side='left', padx=5)
         ttk.Button(faculty_btn_frame, text="Refresh",
                    command=self.load_faculty_data).pack(side='left', padx=5)
 
@@ -392,9 +573,9 @@ class CampusManagementApp:
             self.faculty_tree.heading(col, text=col)
             self.faculty_tree.column(col, width=120)
 
-        scrollbar = ttk.Scrollbar(
-            main_frame, orient='vertical', command=self.faculty_tree.yview)
-        self.faculty_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(main_frame, orient='vertical')
+        self.faculty_view = VirtualTreeview(self, self.faculty_tree, scrollbar, 'faculty')
+        self.setup_search_bar(main_frame, self.faculty_view)
 
         self.faculty_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
@@ -412,20 +593,24 @@ class CampusManagementApp:
                    command=self.add_course).pack(side='left', padx=5)
         ttk.Button(course_btn_frame, text="Delete Course",
                    command=self.delete_course).pack(side='left', padx=5)
+        ttk.Button(course_btn_frame, text="Import...",
+                   command=lambda: self.import_data('courses')).pack(side='left', padx=5)
+        ttk.Button(course_btn_frame, text="Export...",
+                   command=lambda: self.export_data('courses')).pack(side='left', padx=5)
         ttk.Button(course_btn_frame, text="Refresh",
                    command=self.load_courses_data).pack(side='left', padx=5)
 
         # Courses treeview
-        columns = ('ID', 'Code', 'Name', 'Credits', 'Department', 'Faculty ID')
+        columns = ('ID', 'Code', 'Name', 'Credits', 'Department', 'Faculty ID', 'Room Type')
         self.courses_tree = ttk.Treeview(
             main_frame, columns=columns, show='headings', height=15)
         for col in columns:
             self.courses_tree.heading(col, text=col)
             self.courses_tree.column(col, width=100)
 
-        scrollbar = ttk.Scrollbar(
-            main_frame, orient='vertical', command=self.courses_tree.yview)
-        self.courses_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(main_frame, orient='vertical')
+        self.courses_view = VirtualTreeview(self, self.courses_tree, scrollbar, 'courses')
+        self.setup_search_bar(main_frame, self.courses_view)
 
         self.courses_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
@@ -443,6 +628,10 @@ class CampusManagementApp:
                    command=self.add_room).pack(side='left', padx=5)
         ttk.Button(room_btn_frame, text="Delete Room",
                    command=self.delete_room).pack(side='left', padx=5)
+        ttk.Button(room_btn_frame, text="Import...",
+                   command=lambda: self.import_data('rooms')).pack(side='left', padx=5)
+        ttk.Button(room_btn_frame, text="Export...",
+                   command=lambda: self.export_data('rooms')).pack(side='left', padx=5)
         ttk.Button(room_btn_frame, text="Refresh",
                    command=self.load_rooms_data).pack(side='left', padx=5)
 
@@ -454,13 +643,64 @@ class CampusManagementApp:
             self.rooms_tree.heading(col, text=col)
             self.rooms_tree.column(col, width=120)
 
-        scrollbar = ttk.Scrollbar(
-            main_frame, orient='vertical', command=self.rooms_tree.yview)
-        self.rooms_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(main_frame, orient='vertical')
+        self.rooms_view = VirtualTreeview(self, self.rooms_tree, scrollbar, 'rooms')
+        self.setup_search_bar(main_frame, self.rooms_view)
 
         self.rooms_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
 
+    def setup_search_bar(self, parent, view):
+        """Search box and filter drop-downs above an entity list"""
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill='x', pady=(0, 5))
+
+        ttk.Label(search_frame, text="Search:").pack(side='left', padx=5)
+        search_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=search_var, width=30).pack(side='left', padx=5)
+
+        filter_vars = {}
+        for column in self.db_manager.FILTER_COLUMNS[view.table]:
+            ttk.Label(search_frame, text=column.replace('_', ' ').title() + ":").pack(side='left', padx=5)
+            var = tk.StringVar()
+            combo = ttk.Combobox(search_frame, textvariable=var, width=15, state='readonly')
+            combo.configure(postcommand=lambda combo=combo, column=column:
+                            self.load_filter_values(combo, view.table, column))
+            combo.pack(side='left', padx=5)
+            self.load_filter_values(combo, view.table, column)
+            combo.bind('<<ComboboxSelected>>', lambda e: apply())
+            filter_vars[column] = var
+
+        pending = []
+
+        def apply():
+            view.set_query(search_var.get().strip(),
+                           {column: var.get() for column, var in filter_vars.items()})
+
+        def typed(*args):
+            # Wait for a pause in typing rather than querying on every key
+            if pending:
+                self.root.after_cancel(pending.pop())
+            pending.append(self.root.after(self.SEARCH_DELAY_MS, apply))
+
+        search_var.trace_add('write', typed)
+
+        def clear():
+            search_var.set('')
+            for var in filter_vars.values():
+                var.set('')
+            apply()
+
+        ttk.Button(search_frame, text="Clear", command=clear).pack(side='left', padx=5)
+
+    def load_filter_values(self, combo, table, column):
+        """Fill a filter drop-down with the column's current distinct values"""
+        def show(values):
+            combo.configure(values=[''] + values)
+
+        self.run_task(lambda task: self.db_manager.get_filter_values(table, column), on_done=show,
+                      error_message="Failed to load filter values", name="Loading filters")
+
     def setup_timetable_tab(self):
         """Setup timetable display tab"""
         main_frame = ttk.Frame(self.timetable_frame)
@@ -472,6 +712,12 @@ class CampusManagementApp:
 
         ttk.Button(control_frame, text="Refresh Timetable",
                    command=self.load_timetable).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Export...",
+                   command=lambda: self.export_data('timetable')).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Export Calendars...",
+                   command=self.export_calendars).pack(side='left', padx=5)
+        ttk.Button(control_frame, text="Versions...",
+                   command=self.show_timetable_versions).pack(side='left', padx=5)
 
         # Timetable treeview
         columns = ('Course Code', 'Course Name',
@@ -482,13 +728,37 @@ class CampusManagementApp:
             self.timetable_tree.heading(col, text=col)
             self.timetable_tree.column(col, width=150)
 
-        scrollbar = ttk.Scrollbar(
-            main_frame, orient='vertical', command=self.timetable_tree.yview)
-        self.timetable_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(main_frame, orient='vertical')
+        self.timetable_view = VirtualTreeview(self, self.timetable_tree, scrollbar, 'timetable', skip=1)
 
         self.timetable_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
 
+    def task_started(self, task):
+        self.status_label.config(text=f"{task.name}...")
+        self.cancel_btn.config(state='normal')
+
+    def task_progress(self, task, fraction, message):
+        if fraction is not None:
+            self.progress_bar.config(value=fraction)
+        if message:
+            self.status_label.config(text=f"{task.name}: {message}")
+
+    def task_finished(self, task):
+        if not self.tasks.busy:
+            self.status_label.config(text="Ready")
+            self.progress_bar.config(value=0)
+            self.cancel_btn.config(state='disabled')
+
+    def run_task(self, job, on_done=None, error_message="Operation failed", name="Working"):
+        """Run job(task) on the worker thread and on_done(result) back on the Tk thread"""
+        def failed(error):
+            if isinstance(error, TaskCancelled):
+                messagebox.showinfo("Cancelled", f"{name} was cancelled.")
+            else:
+                messagebox.showerror("Error", f"{error_message}: {str(error)}")
+        return self.tasks.submit(job, on_done=on_done, on_error=failed, name=name)
+
     def load_initial_data(self):
         """Load initial data into GUI"""
         self.update_stats()
@@ -500,61 +770,42 @@ class CampusManagementApp:
 
     def update_stats(self):
         """Update dashboard statistics"""
-        students_count = len(self.db_manager.get_all_students())
-        faculty_count = len(self.db_manager.get_all_faculty())
-        courses_count = len(self.db_manager.get_all_courses())
-        rooms_count = len(self.db_manager.get_all_rooms())
-
-        self.students_count_label.config(text=f"Students: {students_count}")
-        self.faculty_count_label.config(text=f"Faculty: {faculty_count}")
-        self.courses_count_label.config(text=f"Courses: {courses_count}")
-        self.rooms_count_label.config(text=f"Rooms: {rooms_count}")
+        self.stats_queued = False
+        def show(stats):
+            self.students_count_label.config(text=f"Students: {stats['students']}")
+            self.faculty_count_label.config(text=f"Faculty: {stats['faculty']}")
+            self.courses_count_label.config(text=f"Courses: {stats['courses']}")
+            self.rooms_count_label.config(text=f"Rooms: {stats['rooms']}")
+            self.utilisation_label.config(
+                text=f"Room utilisation: {stats['room_utilisation']:.1f}%")
+            self.conflicts_label.config(text=f"Timetable clashes: {stats['conflicts']}")
+            self.departments_label.config(text="\n".join(
+                f"{department or 'No department'}: {heads['students']} students, "
+                f"{heads['faculty']} faculty"
+                for department, heads in stats['departments'].items()))
+
+        self.run_task(lambda task: self.db_manager.get_stats(), on_done=show,
+                      error_message="Failed to load statistics", name="Loading statistics")
 
     def load_students_data(self):
         """Load students data into treeview"""
-        for item in self.students_tree.get_children():
-            self.students_tree.delete(item)
-
-        students = self.db_manager.get_all_students()
-        for s in students:
-            self.students_tree.insert('', 'end', values=s)
+        self.students_view.refresh()
 
     def load_faculty_data(self):
         """Load faculty data into treeview"""
-        for item in self.faculty_tree.get_children():
-            self.faculty_tree.delete(item)
-
-        faculty = self.db_manager.get_all_faculty()
-        for f in faculty:
-            self.faculty_tree.insert('', 'end', values=f)
+        self.faculty_view.refresh()
 
     def load_courses_data(self):
         """Load courses data into treeview"""
-        for item in self.courses_tree.get_children():
-            self.courses_tree.delete(item)
-
-        courses = self.db_manager.get_all_courses()
-        for c in courses:
-            self.courses_tree.insert('', 'end', values=c)
+        self.courses_view.refresh()
 
     def load_rooms_data(self):
         """Load rooms data into treeview"""
-        for item in self.rooms_tree.get_children():
-            self.rooms_tree.delete(item)
-
-        rooms = self.db_manager.get_all_rooms()
-        for r in rooms:
-            self.rooms_tree.insert('', 'end', values=r)
+        self.rooms_view.refresh()
 
     def load_timetable(self):
         """Load timetable data into treeview"""
-        for item in self.timetable_tree.get_children():
-            self.timetable_tree.delete(item)
-
-        timetable = self.db_manager.get_timetable()
-        for t in timetable:
-            self.timetable_tree.insert(
-                '', 'end', values=t[1:])  # Skip timetable_id
+        self.timetable_view.refresh()
 
     def add_student(self):
         """Add new student"""
@@ -580,39 +831,31 @@ class CampusManagementApp:
             entry.insert(0, default)
             entries[field] = entry
 
+        def saved(student_id):
+            dialog.destroy()
+            messagebox.showinfo("Success", "Student added successfully!")
+
         def save_student():
             try:
-                self.db_manager.add_student(
+                values = (
                     entries['name'].get(),
                     entries['department'].get(),
                     int(entries['semester'].get()),
                     entries['email'].get()
                 )
-                self.load_students_data()
-                self.update_stats()
-                dialog.destroy()
-                messagebox.showinfo("Success", "Student added successfully!")
             except Exception as e:
                 messagebox.showerror("Error", f"Invalid data: {str(e)}")
+                return
+            self.run_task(lambda task: self.db_manager.add_student(*values), on_done=saved,
+                          error_message="Invalid data", name="Saving student")
 
         ttk.Button(dialog, text="Save", command=save_student).grid(
             row=len(fields), column=0, columnspan=2, pady=10)
         dialog.columnconfigure(1, weight=1)
 
     def delete_student(self):
-        """Delete selected student"""
-        selection = self.students_tree.selection()
-        if not selection:
-            messagebox.showwarning(
-                "Warning", "Please select a student to delete")
-            return
-
-        student_id = self.students_tree.item(selection[0])['values'][0]
-        if messagebox.askyesno("Confirm", "Are you sure you want to delete this student?"):
-            self.db_manager.delete_student(student_id)
-            self.load_students_data()
-            self.update_stats()
-            messagebox.showinfo("Success", "Student deleted successfully!")
+        """Delete the selected students"""
+        self.delete_selected(self.students_tree, 'students', "student", "students")
 
     def add_faculty(self):
         """Add new faculty"""
@@ -638,44 +881,37 @@ class CampusManagementApp:
             entry.insert(0, default)
             entries[field] = entry
 
+        def saved(faculty_id):
+            dialog.destroy()
+            messagebox.showinfo("Success", "Faculty added successfully!")
+
         def save_faculty():
-            try:
-                self.db_manager.add_faculty(
-                    entries['name'].get(),
-                    entries['department'].get(),
-                    entries['email'].get(),
-                    entries['phone'].get()
-                )
-                self.load_faculty_data()
-                self.update_stats()
-                dialog.destroy()
-                messagebox.showinfo("Success", "Faculty added successfully!")
-            except Exception as e:
-                messagebox.showerror("Error", f"Invalid data: {str(e)}")
+            values = (
+                entries['name'].get(),
+                entries['department'].get(),
+                entries['email'].get(),
+                entries['phone'].get()
+            )
+            self.run_task(lambda task: self.db_manager.add_faculty(*values), on_done=saved,
+                          error_message="Invalid data", name="Saving faculty")
 
         ttk.Button(dialog, text="Save", command=save_faculty).grid(
             row=len(fields), column=0, columnspan=2, pady=10)
         dialog.columnconfigure(1, weight=1)
 
     def delete_faculty(self):
-        """Delete selected faculty"""
-        selection = self.faculty_tree.selection()
-        if not selection:
-            messagebox.showwarning(
-                "Warning", "Please select a faculty member to delete")
-            return
-
-        faculty_id = self.faculty_tree.item(selection[0])['values'][0]
-        if messagebox.askyesno("Confirm", "Are you sure you want to delete this faculty member?"):
-            self.db_manager.delete_faculty(faculty_id)
-            self.load_faculty_data()
-            self.update_stats()
-            messagebox.showinfo("Success", "Faculty deleted successfully!")
+        """Delete the selected faculty members"""
+        self.delete_selected(self.faculty_tree, 'faculty', "faculty member", "faculty members")
 
     def add_course(self):
         """Add new course"""
         # Get available faculty for dropdown
-        faculty = self.db_manager.get_all_faculty()
+        self.run_task(lambda task: self.db_manager.get_all_faculty(),
+                      on_done=self.show_course_dialog,
+                      error_message="Failed to load faculty", name="Loading faculty")
+
+    def show_course_dialog(self, faculty):
+        """Show the add course form for the given faculty list"""
         faculty_dict = {f[0]: f[1] for f in faculty}
 
         dialog = tk.Toplevel(self.root)
@@ -689,7 +925,8 @@ class CampusManagementApp:
             ('course_name', 'Course Name:', ''),
             ('credits', 'Credits:', '3'),
             ('department', 'Department:', 'CSE'),
-            ('faculty_id', 'Faculty:', '')
+            ('faculty_id', 'Faculty:', ''),
+            ('room_type', 'Room Type:', 'Classroom')
         ]
 
         entries = {}
@@ -713,44 +950,37 @@ class CampusManagementApp:
                 entry.insert(0, default)
                 entries[field] = entry
 
+        def saved(course_id):
+            dialog.destroy()
+            messagebox.showinfo("Success", "Course added successfully!")
+
         def save_course():
             try:
                 # Get faculty ID from combobox
                 faculty_str = entries['faculty_id'].get()
                 faculty_id = int(faculty_str.split(' - ')[0])
 
-                self.db_manager.add_course(
+                values = (
                     entries['course_code'].get(),
                     entries['course_name'].get(),
                     int(entries['credits'].get()),
                     entries['department'].get(),
-                    faculty_id
+                    faculty_id,
+                    entries['room_type'].get()
                 )
-                self.load_courses_data()
-                self.update_stats()
-                dialog.destroy()
-                messagebox.showinfo("Success", "Course added successfully!")
             except Exception as e:
                 messagebox.showerror("Error", f"Invalid data: {str(e)}")
+                return
+            self.run_task(lambda task: self.db_manager.add_course(*values), on_done=saved,
+                          error_message="Invalid data", name="Saving course")
 
         ttk.Button(dialog, text="Save", command=save_course).grid(
             row=len(fields), column=0, columnspan=2, pady=10)
         dialog.columnconfigure(1, weight=1)
 
     def delete_course(self):
-        """Delete selected course"""
-        selection = self.courses_tree.selection()
-        if not selection:
-            messagebox.showwarning(
-                "Warning", "Please select a course to delete")
-            return
-
-        course_id = self.courses_tree.item(selection[0])['values'][0]
-        if messagebox.askyesno("Confirm", "Are you sure you want to delete this course?"):
-            self.db_manager.delete_course(course_id)
-            self.load_courses_data()
-            self.update_stats()
-            messagebox.showinfo("Success", "Course deleted successfully!")
+        """Delete the selected courses"""
+        self.delete_selected(self.courses_tree, 'courses', "course", "courses")
 
     def add_room(self):
         """Add new room"""
@@ -776,57 +1006,219 @@ class CampusManagementApp:
             entry.insert(0, default)
             entries[field] = entry
 
+        def saved(room_id):
+            dialog.destroy()
+            messagebox.showinfo("Success", "Room added successfully!")
+
         def save_room():
             try:
-                self.db_manager.add_room(
+                values = (
                     entries['room_name'].get(),
                     int(entries['capacity'].get()),
                     entries['room_type'].get(),
                     entries['building'].get()
                 )
-                self.load_rooms_data()
-                self.update_stats()
-                dialog.destroy()
-                messagebox.showinfo("Success", "Room added successfully!")
             except Exception as e:
                 messagebox.showerror("Error", f"Invalid data: {str(e)}")
+                return
+            self.run_task(lambda task: self.db_manager.add_room(*values), on_done=saved,
+                          error_message="Invalid data", name="Saving room")
 
         ttk.Button(dialog, text="Save", command=save_room).grid(
             row=len(fields), column=0, columnspan=2, pady=10)
         dialog.columnconfigure(1, weight=1)
 
     def delete_room(self):
-        """Delete selected room"""
-        selection = self.rooms_tree.selection()
+        """Delete the selected rooms"""
+        self.delete_selected(self.rooms_tree, 'rooms', "room", "rooms")
+
+    def delete_selected(self, tree, table, noun, plural):
+        """Delete every selected row of an entity tab in one transaction"""
+        selection = tree.selection()
         if not selection:
-            messagebox.showwarning("Warning", "Please select a room to delete")
+            messagebox.showwarning("Warning", f"Please select a {noun} to delete")
+            return
+
+        ids = [tree.item(item)['values'][0] for item in selection]
+        what = f"this {noun}" if len(ids) == 1 else f"these {len(ids)} {plural}"
+        if messagebox.askyesno("Confirm", f"Are you sure you want to delete {what}?"):
+            def deleted(count):
+                messagebox.showinfo("Success", f"Deleted {count} {noun if count == 1 else plural}.")
+
+            self.run_task(lambda task: self.db_manager.delete_many(table, ids), on_done=deleted,
+                          error_message=f"Failed to delete {plural}", name=f"Deleting {plural}")
+
+    def import_data(self, entity):
+        """Bulk import an entity from a CSV or JSON Lines file"""
+        path = filedialog.askopenfilename(
+            title=f"Import {entity}",
+            filetypes=[("CSV files", "*.csv"), ("JSON Lines", "*.jsonl"), ("All files", "*.*")])
+        if not path:
+            return
+
+        def run_import(task):
+            # Raising from the progress callback rolls the whole import back
+            return campus_import.import_file(
+                self.db_manager, entity, path,
+                progress=lambda result: task.progress(None, f"{result.processed} rows read"))
+
+        def imported(result):
+            message = result.summary()
+            if result.rejected:
+                details = "\n".join(f"Line {line_no}: {reason}"
+                                    for line_no, reason in result.rejected[:10])
+                message += f"\n\nFirst rejected rows:\n{details}"
+            messagebox.showinfo("Import", message)
+
+        self.run_task(run_import, on_done=imported,
+                      error_message="Import failed", name=f"Importing {entity}")
+
+    def export_data(self, table):
+        """Export a table or the timetable to a CSV or JSON Lines file"""
+        path = filedialog.asksaveasfilename(
+            title=f"Export {table}", defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("JSON Lines", "*.jsonl")])
+        if not path:
+            return
+
+        def exported(count):
+            messagebox.showinfo("Export", f"{count} rows exported to {path}")
+
+        self.run_task(lambda task: campus_export.export_file(self.db_manager, table, path),
+                      on_done=exported, error_message="Export failed", name=f"Exporting {table}")
+
+    def export_calendars(self):
+        """Write iCalendar feeds for every room, faculty member and student cohort"""
+        directory = filedialog.askdirectory(title="Export calendars to")
+        if not directory:
             return
 
-        room_id = self.rooms_tree.item(selection[0])['values'][0]
-        if messagebox.askyesno("Confirm", "Are you sure you want to delete this room?"):
-            self.db_manager.delete_room(room_id)
-            self.load_rooms_data()
-            self.update_stats()
-            messagebox.showinfo("Success", "Room deleted successfully!")
+        def export_all(task):
+            written = {}
+            for kind in campus_export.CALENDAR_KINDS:
+                task.progress(None, f"Writing {kind} calendars")
+                written[kind] = campus_export.export_calendars(self.db_manager, kind, directory)
+            return written
+
+        def exported(written):
+            lines = [f"{kind}: up to date" if counts is None else f"{kind}: {len(counts)} feeds"
+                     for kind, counts in written.items()]
+            messagebox.showinfo("Export", "\n".join(lines))
+
+        self.run_task(export_all, on_done=exported, error_message="Calendar export failed",
+                      name="Exporting calendars")
 
     def generate_timetable(self):
-        """Generate random timetable"""
-        try:
-            count = self.db_manager.generate_timetable()
-            self.load_timetable()
+        """Generate clash-free timetable"""
+        def generated(count):
+            message = f"Timetable generated successfully with {count} entries!"
+            if self.db_manager.unscheduled:
+                message += (f"\n{len(self.db_manager.unscheduled)} sessions could not be placed "
+                            "without a clash.")
+            messagebox.showinfo("Success", message)
+
+        self.run_task(lambda task: self.db_manager.generate_timetable(progress=task.progress),
+                      on_done=generated, error_message="Failed to generate timetable",
+                      name="Generating timetable")
+
+    def optimise_timetable(self):
+        """Search for a better timetable using every CPU core"""
+        def optimised(count):
+            score = self.db_manager.last_score
             messagebox.showinfo(
-                "Success", f"Timetable generated successfully with {count} entries!")
-        except Exception as e:
-            messagebox.showerror(
-                "Error", f"Failed to generate timetable: {str(e)}")
+                "Success", f"Optimised timetable with {count} entries "
+                           f"(penalty score {score['total']:.1f}, "
+                           f"{score['unscheduled']} sessions unplaced).")
 
+        self.run_task(lambda task: self.db_manager.optimise_timetable(progress=task.progress),
+                      on_done=optimised, error_message="Failed to optimise timetable",
+                      name="Optimising timetable")
 
-def main():
+    def show_timetable_versions(self):
+        """List the kept timetable versions, to compare one with the active timetable or switch to it"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Timetable Versions")
+        dialog.geometry("640x320")
+        dialog.transient(self.root)
+
+        columns = ('Version', 'Created (UTC)', 'Source', 'Sessions', 'Unscheduled', 'Active')
+        tree = ttk.Treeview(dialog, columns=columns, show='headings', height=10, selectmode='browse')
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=100)
+        tree.pack(fill='both', expand=True, padx=10, pady=5)
+
+        def show(versions):
+            if not tree.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for version_id, created, source, sessions, unscheduled, _, active in versions:
+                tree.insert('', 'end', iid=str(version_id),
+                            values=(version_id, created, source, sessions,
+                                    '' if unscheduled is None else unscheduled, 'yes' if active else ''))
+
+        def load():
+            # Counting each version's sessions scans the timetable, so keep it off the Tk thread
+            self.run_task(lambda task: self.db_manager.get_timetable_versions(), on_done=show,
+                          error_message="Failed to load versions", name="Loading versions")
+
+        def selected():
+            selection = tree.selection()
+            if not selection:
+                messagebox.showwarning("Warning", "Please select a version", parent=dialog)
+                return None
+            return int(selection[0])
+
+        def compare():
+            version_id = selected()
+            if version_id is None:
+                return
+
+            def compared(diff):
+                messagebox.showinfo(
+                    "Compare", f"From version {version_id} to the active timetable:\n"
+                               f"{len(diff['moved'])} sessions moved, {len(diff['added'])} added, "
+                               f"{len(diff['removed'])} removed.", parent=dialog)
+
+            self.run_task(lambda task: self.db_manager.diff_timetable_versions(version_id),
+                          on_done=compared, error_message="Failed to compare versions",
+                          name="Comparing versions")
+
+        def activate(repair=False):
+            version_id = selected()
+            if version_id is None:
+                return
+
+            def activated(active):
+                load()
+                if repair:
+                    message = f"Version {version_id} restored as version {active}."
+                    if self.db_manager.unscheduled:
+                        message += (f"\n{len(self.db_manager.unscheduled)} courses could not be placed "
+                                    "again.")
+                    messagebox.showinfo("Restored", message, parent=dialog)
+
+            # The timetable tab and counts refresh themselves from the change event
+            self.run_task(lambda task: self.db_manager.activate_timetable_version(version_id, repair),
+                          on_done=activated, error_message="Failed to switch version",
+                          name="Switching version")
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill='x', padx=10, pady=5)
+        ttk.Button(button_frame, text="Compare with Active", command=compare).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Make Active", command=activate).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Restore and Repair",
+                   command=lambda: activate(repair=True)).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Close", command=dialog.destroy).pack(side='right', padx=5)
+        load()
+
+
+def main(db_name="campus_management.db", db_manager=None):
     """Main function to run the application"""
     root = tk.Tk()
-    app = CampusManagementApp(root)
+    app = CampusManagementApp(root, db_manager or DatabaseManager(db_name))
     root.mainloop()
 
 
-if _name_ == "_main_":
+if __name__ == "__main__":
     main()
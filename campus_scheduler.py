@@ -0,0 +1,875 @@
+"""Constraint-based timetable construction"""
+import heapq
+import math
+import os
+import random
+import re
+import time
+
+
+# Days are stored as numbers: 0 = Monday
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DAYS = WEEKDAYS[:5]
+# The timetable grid; these are time_slots ids 1, 2, ... in this order
+TIME_SLOTS = ['9:00-10:00', '10:00-11:00',
+              '11:00-12:00', '2:00-3:00', '3:00-4:00']
+
+# Slots are numbered day-major: slot = day * len(TIME_SLOTS) + time slot index
+SLOT_COUNT = len(DAYS) * len(TIME_SLOTS)
+ALL_SLOTS = (1 << SLOT_COUNT) - 1
+
+DEFAULT_ROOM_TYPE = 'Classroom'
+
+# Limit on eviction attempts per session before it is reported as unscheduled
+MAX_EJECTIONS = 64
+
+# Timetable quality weights: an unplaced session outweighs any amount of soft penalty
+HARD_WEIGHT = 1000.0
+GAP_WEIGHT = 1.0            # idle slot between two classes of a faculty member on one day
+BUILDING_WEIGHT = 2.0       # faculty member changing building between consecutive classes
+WASTE_WEIGHT = 1.0          # fraction of a room's seats left empty
+SAME_DAY_WEIGHT = 3.0       # course meeting more than once on the same day
+
+# Room matching works in integer costs (weights x COST_SCALE) so path lengths compare exactly
+COST_SCALE = 20
+
+
+def slot_day(slot):
+    return slot // len(TIME_SLOTS)
+
+
+def slot_label(slot):
+    """Return the (day name, time slot label) of a grid slot, for display"""
+    return DAYS[slot // len(TIME_SLOTS)], TIME_SLOTS[slot % len(TIME_SLOTS)]
+
+
+def slot_key(slot):
+    """Return the (day number, time_slots id) stored in the timetable for a grid slot"""
+    return slot // len(TIME_SLOTS), slot % len(TIME_SLOTS) + 1
+
+
+def grid_slot(day, offset):
+    """Grid slot of a day number and a position in the day's grid"""
+    return day * len(TIME_SLOTS) + offset
+
+
+def label_minutes(label):
+    """Start and end minute of the day of a label such as '2:00-3:00' (afternoon)"""
+    minutes = []
+    for part in label.split('-'):
+        hour, minute = (int(x) for x in part.strip().split(':'))
+        # Labels use a 12-hour clock with no suffix; the day runs from 8am
+        if hour < 8:
+            hour += 12
+        minutes.append(hour * 60 + minute)
+    return minutes[0], minutes[1]
+
+
+GRID_MINUTES = [label_minutes(label) for label in TIME_SLOTS]
+
+
+def minutes_label(start, end):
+    """Label of a start and end minute in the grid's style, e.g. '2:00-3:30' for 14:00-15:30;
+    times that style would misread (before 8am, from 8pm) get a 24-hour '07:00-07:50' label"""
+    label = '-'.join(f"{hour - 12 if hour > 12 else hour}:{minute:02d}"
+                     for hour, minute in (divmod(start, 60), divmod(end, 60)))
+    if label_minutes(label) == (start, end):
+        return label
+    return '-'.join(f"{hour:02d}:{minute:02d}" for hour, minute in (divmod(start, 60), divmod(end, 60)))
+
+
+def parse_time(value):
+    """Minute of the day of a 24-hour 'HH:MM' string (or a minute count)"""
+    if isinstance(value, int):
+        return value
+    hour, _, minute = str(value).strip().partition(':')
+    try:
+        hour, minute = int(hour), int(minute or 0)
+    except ValueError:
+        raise ValueError(f"Invalid time: {value}")
+    if not (0 <= hour <= 24 and 0 <= minute < 60):
+        raise ValueError(f"Invalid time: {value}")
+    return hour * 60 + minute
+
+
+def day_number(value):
+    """Day number of a weekday name or unambiguous prefix ('Tue'), or of a number"""
+    if isinstance(value, int):
+        if 0 <= value < len(WEEKDAYS):
+            return value
+    else:
+        matches = [index for index, name in enumerate(WEEKDAYS)
+                   if name.lower().startswith(str(value).strip().lower())]
+        if len(matches) == 1 and str(value).strip():
+            return matches[0]
+    raise ValueError(f"Unknown day: {value}")
+
+
+def grid_offsets(start_minute, end_minute):
+    """Positions in the day's grid that a start-end range overlaps"""
+    return [offset for offset, (start, end) in enumerate(GRID_MINUTES)
+            if start < end_minute and start_minute < end]
+
+
+def iter_bits(mask):
+    """Yield the positions of the set bits of an integer, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def course_level(course_code):
+    """Return the year a course code belongs to (CSE201 -> 2), or 0 if it has no number"""
+    numbers = re.findall(r'\d+', course_code or '')
+    return int(numbers[-1][0]) if numbers else 0
+
+
+def student_year(semester):
+    return ((semester or 1) + 1) // 2
+
+
+class FlowNetwork:
+    """Min-cost flow on a small directed graph with integer, non-negative edge costs.
+
+    Primal-dual: Dijkstra on reduced costs finds the cheapest augmenting distance,
+    then a blocking flow (Dinic) saturates every path of that length before the next
+    search, so the number of searches is the number of distinct path costs rather
+    than the number of units sent.
+    """
+
+    def __init__(self, nodes=0):
+        self.graph = [[] for _ in range(nodes)]
+        self.to, self.cap, self.cost = [], [], []
+
+    def add_node(self):
+        self.graph.append([])
+        return len(self.graph) - 1
+
+    def add_edge(self, u, v, capacity, cost=0):
+        """Add an edge and return its id, for reading its flow after solve()"""
+        edge = len(self.to)
+        self.graph[u].append(edge)
+        self.to.append(v), self.cap.append(capacity), self.cost.append(cost)
+        self.graph[v].append(edge + 1)
+        self.to.append(u), self.cap.append(0), self.cost.append(-cost)
+        return edge
+
+    def flow(self, edge):
+        return self.cap[edge ^ 1]
+
+    def solve(self, source, sink, limit):
+        """Send up to limit units as cheaply as possible; returns the units sent"""
+        graph, to, cap, cost = self.graph, self.to, self.cap, self.cost
+        push, pop = heapq.heappush, heapq.heappop
+        nodes = len(graph)
+        dual = [0] * nodes
+        infinity = float('inf')
+        sent = 0
+        while sent < limit:
+            dist = [infinity] * nodes
+            seen = [False] * nodes
+            dist[source] = 0
+            queue = [(0, source)]
+            while queue:
+                d, u = pop(queue)
+                if seen[u]:
+                    continue
+                seen[u] = True
+                if u == sink:
+                    break
+                base = d + dual[u]
+                for e in graph[u]:
+                    if cap[e]:
+                        v = to[e]
+                        nd = base + cost[e] - dual[v]
+                        if nd < dist[v]:
+                            dist[v] = nd
+                            push(queue, (nd, v))
+            if not seen[sink]:
+                break
+            for v in range(nodes):
+                if seen[v]:
+                    dual[v] -= dist[sink] - dist[v]
+
+            # Blocking flow over the edges whose reduced cost is now zero
+            while sent < limit:
+                level = [-1] * nodes
+                level[source] = 0
+                frontier = [source]
+                for u in frontier:
+                    for e in graph[u]:
+                        v = to[e]
+                        if cap[e] and level[v] < 0 and cost[e] - dual[v] + dual[u] == 0:
+                            level[v] = level[u] + 1
+                            frontier.append(v)
+                if level[sink] < 0:
+                    break
+                pointer = [0] * nodes
+                while sent < limit:
+                    pushed = self.augment(source, sink, limit - sent, level, pointer, dual)
+                    if not pushed:
+                        break
+                    sent += pushed
+        return sent
+
+    def augment(self, source, sink, limit, level, pointer, dual):
+        """Find one admissible path along increasing levels and push flow along it"""
+        graph, to, cap, cost = self.graph, self.to, self.cap, self.cost
+        path, u = [], source
+        while u != sink:
+            edges = graph[u]
+            while pointer[u] < len(edges):
+                e = edges[pointer[u]]
+                v = to[e]
+                if cap[e] and level[v] == level[u] + 1 and cost[e] - dual[v] + dual[u] == 0:
+                    break
+                pointer[u] += 1
+            else:
+                # Dead end: retreat and never try this node again in this round
+                if not path:
+                    return 0
+                level[u] = -1
+                e = path.pop()
+                u = to[e ^ 1]
+                pointer[u] += 1
+                continue
+            path.append(e)
+            u = v
+        units = min([limit] + [cap[e] for e in path])
+        for e in path:
+            cap[e] -= units
+            cap[e ^ 1] += units
+        return units
+
+
+class ResourceGrid:
+    """Week occupancy of one kind of resource (rooms or faculty).
+
+    busy maps a resource id to a mask over slots, and by_slot holds for every slot a
+    mask over resource bit positions, so "who is free at this slot" is a single AND.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.bit = {}
+        self.all = 0
+        self.busy = {}
+        self.by_slot = [0] * SLOT_COUNT
+        # Number of bookings per (resource, slot); legacy timetables may double book
+        self.counts = {}
+
+    def register(self, resource_id):
+        bit = self.bit.get(resource_id)
+        if bit is None:
+            bit = self.bit[resource_id] = len(self.ids)
+            self.ids.append(resource_id)
+            self.all |= 1 << bit
+        return bit
+
+    def unregister(self, resource_id):
+        bit = self.bit.pop(resource_id, None)
+        if bit is None:
+            return
+        # The bit position stays reserved so other resources keep their masks
+        self.ids[bit] = None
+        self.all &= ~(1 << bit)
+        for slot in iter_bits(self.busy.pop(resource_id, 0)):
+            self.by_slot[slot] &= ~(1 << bit)
+            self.counts.pop((resource_id, slot), None)
+
+    def book(self, resource_id, slot):
+        bit = self.register(resource_id)
+        key = (resource_id, slot)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.busy[resource_id] = self.busy.get(resource_id, 0) | (1 << slot)
+        self.by_slot[slot] |= 1 << bit
+
+    def release(self, resource_id, slot):
+        key = (resource_id, slot)
+        count = self.counts.get(key, 0)
+        if count > 1:
+            self.counts[key] = count - 1
+            return
+        self.counts.pop(key, None)
+        if resource_id in self.bit:
+            self.busy[resource_id] &= ~(1 << slot)
+            self.by_slot[slot] &= ~(1 << self.bit[resource_id])
+
+    def is_free(self, resource_id, slot):
+        return not (self.busy.get(resource_id, 0) >> slot) & 1
+
+    def free_mask(self, slot, candidates=None):
+        mask = self.all & ~self.by_slot[slot]
+        return mask if candidates is None else mask & candidates
+
+    def ids_of(self, mask):
+        return [self.ids[bit] for bit in iter_bits(mask)]
+
+
+class Occupancy:
+    """Room and faculty occupancy of the timetable, kept as bitmasks"""
+
+    def __init__(self, rooms=(), faculty_ids=()):
+        self.rooms = ResourceGrid()
+        self.faculty = ResourceGrid()
+        self.room_info = {}
+        for room in rooms:
+            self.add_room(room)
+        for faculty_id in faculty_ids:
+            self.faculty.register(faculty_id)
+
+    @classmethod
+    def from_timetable(cls, entries, rooms=(), faculty_ids=()):
+        """Build from (room_id, faculty_id, grid slot) bookings"""
+        occupancy = cls(rooms, faculty_ids)
+        for room_id, faculty_id, slot in entries:
+            occupancy.book(slot, room_id, faculty_id)
+        return occupancy
+
+    def add_room(self, room):
+        room_id, _, capacity, room_type = room[:4]
+        self.rooms.register(room_id)
+        self.room_info[room_id] = (capacity or 0, (room_type or DEFAULT_ROOM_TYPE).lower())
+
+    def remove_room(self, room_id):
+        self.rooms.unregister(room_id)
+        self.room_info.pop(room_id, None)
+
+    def book(self, slot, room_id=None, faculty_id=None):
+        if room_id is not None:
+            self.rooms.book(room_id, slot)
+        if faculty_id is not None:
+            self.faculty.book(faculty_id, slot)
+
+    def release(self, slot, room_id=None, faculty_id=None):
+        if room_id is not None:
+            self.rooms.release(room_id, slot)
+        if faculty_id is not None:
+            self.faculty.release(faculty_id, slot)
+
+    def is_free(self, slot, room_id=None, faculty_id=None):
+        return ((room_id is None or self.rooms.is_free(room_id, slot))
+                and (faculty_id is None or self.faculty.is_free(faculty_id, slot)))
+
+    def rooms_mask(self, room_type=None, min_capacity=0):
+        """Mask of registered rooms of a type (any type if None) with at least min_capacity seats"""
+        room_type = room_type.lower() if room_type else None
+        mask = 0
+        for room_id, (capacity, kind) in self.room_info.items():
+            if capacity >= min_capacity and (room_type is None or kind == room_type):
+                mask |= 1 << self.rooms.bit[room_id]
+        return mask
+
+    def free_rooms(self, slot, room_type=None, min_capacity=0):
+        """Ids of rooms free at a slot, smallest sufficient room first"""
+        candidates = None
+        if room_type is not None or min_capacity:
+            candidates = self.rooms_mask(room_type, min_capacity)
+        free = self.rooms.ids_of(self.rooms.free_mask(slot, candidates))
+        return sorted(free, key=lambda room_id: (self.room_info[room_id][0], room_id))
+
+    def free_faculty(self, slot):
+        return self.faculty.ids_of(self.faculty.free_mask(slot))
+
+
+class Session:
+    """One weekly meeting of a course"""
+    __slots__ = ('course_id', 'faculty_id', 'cohort', 'size', 'room_mask', 'slot', 'room')
+
+    def __init__(self, course_id, faculty_id, cohort, size, room_mask):
+        self.course_id = course_id
+        self.faculty_id = faculty_id
+        self.cohort = cohort
+        self.size = size
+        self.room_mask = room_mask
+        self.slot = None
+        self.room = None
+
+
+class TimetableSolver:
+    """Greedy most-constrained-first placement with single-eviction backtracking.
+
+    Hard constraints: no room, faculty or cohort (department + year) double booking,
+    no two courses that share an enrolled student at the same time, room capacity
+    covers the class size, the room type matches the course's room type, and a course
+    never meets twice in one slot. Each course gets `credits` sessions, spread over
+    different days where possible. Once every session has a slot, each slot's rooms
+    are re-assigned together by match_rooms.
+
+    conflicts is the course-conflict graph ({course_id: {other course_id: shared
+    students}}) and course_sizes the enrollment of each course; a course without
+    enrollments is sized by its cohort.
+
+    Passing an existing occupancy (with the cohort and course masks of the entries
+    already in it) repairs a timetable instead: only the new sessions are placed and
+    the existing entries are never moved.
+    """
+
+    def __init__(self, courses, rooms, cohort_sizes=None, occupancy=None,
+                 cohort_busy=None, course_busy=None, seed=None, conflicts=None, course_sizes=None):
+        if occupancy is None:
+            # Rooms registered in capacity order so the lowest free bit is the tightest fit
+            occupancy = Occupancy(sorted(rooms, key=lambda r: (r[2] or 0, r[0])))
+            self.rooms_by_capacity = True
+        else:
+            self.rooms_by_capacity = False
+        self.occupancy = occupancy
+        self.room_building = {room[0]: room[4] for room in rooms}
+        self.cohort_sizes = cohort_sizes or {}
+        self.conflicts = conflicts or {}
+        self.course_sizes = course_sizes or {}
+        self.rng = random.Random(seed) if seed is not None else None
+        self.sessions = []
+        self.unscheduled = []
+        self.pending = []
+        # Courses left out altogether, as (course_id, reason)
+        self.skipped = []
+
+        self.cohort_busy = dict(cohort_busy or {})
+        self.course_busy = dict(course_busy or {})
+        self.room_at = {}
+        self.faculty_at = {}
+        self.cohort_at = {}
+        self.course_at = {}
+
+        for course in courses:
+            self.add_course(course)
+
+    def add_course(self, course, sessions=None):
+        """Queue a course's sessions; `sessions` defaults to one per credit"""
+        course_id, course_code, _, credits, department, faculty_id = course[:6]
+        if faculty_id is None:
+            # Nobody to teach it (the teacher was deleted); placing it would book no faculty
+            self.skipped.append((course_id, "No faculty assigned"))
+            return
+        room_type = course[6] if len(course) > 6 else DEFAULT_ROOM_TYPE
+        cohort = (department, course_level(course_code))
+        size = self.course_sizes.get(course_id) or self.cohort_sizes.get(cohort, 0)
+        room_mask = self.occupancy.rooms_mask(room_type or DEFAULT_ROOM_TYPE, size)
+        if sessions is None:
+            sessions = max(credits or 1, 1)
+        for _ in range(sessions):
+            self.sessions.append(Session(course_id, faculty_id, cohort, size, room_mask))
+
+    def assign(self, s, slot, room):
+        bit = 1 << slot
+        s.slot, s.room = slot, room
+        self.occupancy.book(slot, self.occupancy.rooms.ids[room], s.faculty_id)
+        self.room_at[room, slot] = s
+        self.course_busy[s.course_id] = self.course_busy.get(s.course_id, 0) | bit
+        self.cohort_busy[s.cohort] = self.cohort_busy.get(s.cohort, 0) | bit
+        self.cohort_at[s.cohort, slot] = s
+        self.course_at[s.course_id, slot] = s
+        if s.faculty_id is not None:
+            self.faculty_at[s.faculty_id, slot] = s
+
+    def unassign(self, s):
+        slot, room = s.slot, s.room
+        bit = 1 << slot
+        self.occupancy.release(slot, self.occupancy.rooms.ids[room], s.faculty_id)
+        del self.room_at[room, slot]
+        self.course_busy[s.course_id] &= ~bit
+        self.cohort_busy[s.cohort] &= ~bit
+        del self.cohort_at[s.cohort, slot]
+        del self.course_at[s.course_id, slot]
+        if s.faculty_id is not None:
+            del self.faculty_at[s.faculty_id, slot]
+        s.slot = s.room = None
+
+    def busy_mask(self, s):
+        mask = (self.course_busy.get(s.course_id, 0)
+                | self.cohort_busy.get(s.cohort, 0)
+                | self.occupancy.faculty.busy.get(s.faculty_id, 0))
+        course_busy = self.course_busy
+        for other in self.conflicts.get(s.course_id, ()):
+            mask |= course_busy.get(other, 0)
+        return mask
+
+    def used_days(self, course_id):
+        used = 0
+        for slot in iter_bits(self.course_busy.get(course_id, 0)):
+            used |= 1 << slot_day(slot)
+        return used
+
+    def pick_room(self, mask):
+        """Bit of the smallest room in a mask of free, suitable rooms"""
+        if self.rooms_by_capacity:
+            return (mask & -mask).bit_length() - 1
+        ids, info = self.occupancy.rooms.ids, self.occupancy.room_info
+        return min(iter_bits(mask), key=lambda bit: (info[ids[bit]][0], bit))
+
+    def find_free(self, s):
+        """Best clash-free (slot, room) for a session, or None"""
+        used_days = self.used_days(s.course_id)
+        best_slot, best_rooms, best_key = None, 0, None
+        for slot in iter_bits(ALL_SLOTS & ~self.busy_mask(s)):
+            rooms = self.occupancy.rooms.free_mask(slot, s.room_mask)
+            if not rooms:
+                continue
+            # Prefer a new day for the course, then the slot with the most spare rooms
+            key = ((used_days >> slot_day(slot)) & 1, -rooms.bit_count(),
+                   self.rng.random() if self.rng else 0)
+            if best_key is None or key < best_key:
+                best_slot, best_rooms, best_key = slot, rooms, key
+        if best_slot is None:
+            return None
+        return best_slot, self.pick_room(best_rooms)
+
+    def place_with_ejection(self, s):
+        """Place a session by moving one blocking session somewhere clash-free"""
+        attempts = 0
+        for slot in iter_bits(ALL_SLOTS & ~self.course_busy.get(s.course_id, 0)):
+            blockers = {self.faculty_at.get((s.faculty_id, slot)),
+                        self.cohort_at.get((s.cohort, slot))}
+            for other in self.conflicts.get(s.course_id, ()):
+                blockers.add(self.course_at.get((other, slot)))
+            blockers.discard(None)
+            if len(blockers) > 1:
+                continue
+
+            if blockers:
+                blocker = blockers.pop()
+                rooms = self.occupancy.rooms.free_mask(slot, s.room_mask)
+                if rooms:
+                    room = self.pick_room(rooms)
+                elif (s.room_mask >> blocker.room) & 1:
+                    room = blocker.room
+                else:
+                    continue
+                candidates = [(blocker, room)]
+            else:
+                taken = s.room_mask & self.occupancy.rooms.by_slot[slot]
+                candidates = [(self.room_at[room, slot], room) for room in iter_bits(taken)]
+
+            for blocker, room in candidates:
+                if attempts >= MAX_EJECTIONS:
+                    return False
+                attempts += 1
+                old_slot, old_room = blocker.slot, blocker.room
+                self.unassign(blocker)
+                self.assign(s, slot, room)
+                target = self.find_free(blocker)
+                if target:
+                    self.assign(blocker, *target)
+                    return True
+                self.unassign(s)
+                self.assign(blocker, old_slot, old_room)
+        return False
+
+    def difficulty(self, s):
+        """Sort key: sessions with the fewest rooms, busiest faculty/cohort and most conflicts go first"""
+        key = (s.room_mask.bit_count(),
+               -self.faculty_load.get(s.faculty_id, 0),
+               -self.cohort_load.get(s.cohort, 0),
+               -len(self.conflicts.get(s.course_id, ())),
+               s.course_id)
+        if self.rng:
+            # Seeded runs jitter the order so restarts explore different constructions
+            key = (key[0] * self.rng.uniform(0.7, 1.3),
+                   key[1] * self.rng.uniform(0.7, 1.3)) + key[2:]
+        return key
+
+    def solve(self, allow_ejection=True, progress=None):
+        """Place every session; returns the list of timetable rows.
+
+        progress(fraction, message) is called periodically and may raise to abort.
+        """
+        self.faculty_load = {}
+        self.cohort_load = {}
+        for s in self.sessions:
+            self.faculty_load[s.faculty_id] = self.faculty_load.get(s.faculty_id, 0) + 1
+            self.cohort_load[s.cohort] = self.cohort_load.get(s.cohort, 0) + 1
+
+        ordered = sorted(self.sessions, key=self.difficulty)
+        for done, s in enumerate(ordered):
+            if progress and done % 250 == 0:
+                progress(done / len(ordered), "Placing sessions")
+            if not s.room_mask:
+                self.pending.append((s, "No room of the required type and capacity"))
+                continue
+            target = self.find_free(s)
+            if target:
+                self.assign(s, *target)
+            elif not allow_ejection or not self.place_with_ejection(s):
+                self.pending.append((s, "No clash-free slot available"))
+
+        self.unscheduled = self.skipped + [(s.course_id, reason) for s, reason in self.pending]
+        self.match_rooms(progress)
+        return self.entries()
+
+    def adjacent_buildings(self, s):
+        """Buildings of the faculty member's classes just before and after a session that day"""
+        if s.faculty_id is None:
+            return ()
+        width = len(TIME_SLOTS)
+        day_start = slot_day(s.slot) * width
+        busy = self.occupancy.faculty.busy.get(s.faculty_id, 0)
+        earlier = busy & ((1 << s.slot) - 1) & ~((1 << day_start) - 1)
+        later = (busy >> (s.slot + 1)) & ((1 << (day_start + width - s.slot - 1)) - 1)
+        slots = []
+        if earlier:
+            slots.append(earlier.bit_length() - 1)
+        if later:
+            slots.append(s.slot + 1 + (later & -later).bit_length() - 1)
+        buildings = []
+        for slot in slots:
+            other = self.faculty_at.get((s.faculty_id, slot))
+            if other is not None:
+                buildings.append(self.room_building.get(self.occupancy.rooms.ids[other.room]))
+        return tuple(buildings)
+
+    def match_rooms(self, progress=None):
+        """Re-seat each slot's sessions as a min-cost bipartite matching of sessions to rooms.
+
+        Slots are taken in order and the sessions in one keep their slot, so no new
+        clash can appear. A session may use any free room of its type with enough
+        seats; the cost is the weighted share of empty seats plus a building change
+        against the faculty member's neighbouring classes. Sessions (by room need,
+        size and neighbouring buildings) and rooms (by capacity, type and building)
+        that are interchangeable are grouped, which keeps the flow network small.
+        """
+        ids, info, grid = self.occupancy.rooms.ids, self.occupancy.room_info, self.occupancy.rooms
+        by_slot = [[] for _ in range(SLOT_COUNT)]
+        for s in self.sessions:
+            if s.slot is not None:
+                by_slot[s.slot].append(s)
+
+        for slot, sessions in enumerate(by_slot):
+            if progress:
+                progress(slot / SLOT_COUNT, "Assigning rooms")
+            if len(sessions) < 2:
+                continue
+            for s in sessions:
+                grid.release(ids[s.room], slot)
+                del self.room_at[s.room, slot]
+
+            groups = {}
+            for s in sessions:
+                groups.setdefault((s.room_mask, s.size, self.adjacent_buildings(s)), []).append(s)
+            classes = {}
+            for bit in iter_bits(grid.free_mask(slot)):
+                capacity, kind = info[ids[bit]]
+                classes.setdefault((capacity, kind, self.room_building.get(ids[bit])), []).append(bit)
+
+            # Rooms of one capacity and type meet at a hub, so a group needs an edge per hub
+            # plus direct edges only to the buildings its faculty member is already in
+            network = FlowNetwork(2)
+            source, sink = 0, 1
+            class_node, hubs = {}, {}
+            for key, bits in classes.items():
+                class_node[key] = node = network.add_node()
+                network.add_edge(node, sink, len(bits))
+                hub = hubs.get(key[:2])
+                if hub is None:
+                    hub = hubs[key[:2]] = (network.add_node(), bits[0])
+                network.add_edge(hub[0], node, len(bits))
+
+            edges = []
+            for (room_mask, size, adjacent), members in groups.items():
+                node = network.add_node()
+                network.add_edge(source, node, len(members))
+                for (capacity, kind), (hub, bit) in hubs.items():
+                    if not (room_mask >> bit) & 1:
+                        continue
+                    waste = WASTE_WEIGHT * (1 - size / capacity) if capacity else 0.0
+                    edges.append((members, (capacity, kind), None, network.add_edge(
+                        node, hub, len(members),
+                        round(COST_SCALE * (waste + BUILDING_WEIGHT * len(adjacent))))))
+                    for building in set(adjacent):
+                        key = (capacity, kind, building)
+                        if key in class_node:
+                            moves = sum(1 for other in adjacent if other != building)
+                            edges.append((members, None, key, network.add_edge(
+                                node, class_node[key], len(members),
+                                round(COST_SCALE * (waste + BUILDING_WEIGHT * moves)))))
+
+            if network.solve(source, sink, len(sessions)) == len(sessions):
+                # Direct placements first; rooms left over are shared out through the hubs
+                for members, _, key, edge in edges:
+                    if key is not None:
+                        for _ in range(network.flow(edge)):
+                            members.pop().room = classes[key].pop()
+                pools = {}
+                for key, bits in classes.items():
+                    pools.setdefault(key[:2], []).extend(bits)
+                for members, hub, _, edge in edges:
+                    if hub is not None:
+                        for _ in range(network.flow(edge)):
+                            members.pop().room = pools[hub].pop()
+            # Otherwise (only if rooms were booked from outside meanwhile) keep the old seats
+            for s in sessions:
+                grid.book(ids[s.room], slot)
+                self.room_at[s.room, slot] = s
+
+    def faculty_day_cost(self, faculty_id, day):
+        """Gap and building-change penalty of one faculty member's day"""
+        if faculty_id is None:
+            return 0.0
+        width = len(TIME_SLOTS)
+        day_mask = (self.occupancy.faculty.busy.get(faculty_id, 0) >> (day * width)) & ((1 << width) - 1)
+        if not day_mask:
+            return 0.0
+        span = day_mask.bit_length() - ((day_mask & -day_mask).bit_length() - 1)
+        cost = GAP_WEIGHT * (span - day_mask.bit_count())
+
+        previous = None
+        for offset in iter_bits(day_mask):
+            s = self.faculty_at.get((faculty_id, day * width + offset))
+            building = self.room_building.get(self.occupancy.rooms.ids[s.room]) if s else None
+            if previous is not None and building != previous:
+                cost += BUILDING_WEIGHT
+            previous = building
+        return cost
+
+    def course_cost(self, course_id):
+        """Penalty for a course meeting more than once on a day"""
+        width = len(TIME_SLOTS)
+        busy = self.course_busy.get(course_id, 0)
+        cost = 0.0
+        for day in range(len(DAYS)):
+            count = ((busy >> (day * width)) & ((1 << width) - 1)).bit_count()
+            if count > 1:
+                cost += SAME_DAY_WEIGHT * (count - 1)
+        return cost
+
+    def waste_cost(self, s):
+        capacity = self.occupancy.room_info[self.occupancy.rooms.ids[s.room]][0]
+        return WASTE_WEIGHT * (1 - s.size / capacity) if capacity else 0.0
+
+    def score_breakdown(self):
+        """Hard and soft penalties of the current timetable; lower is better"""
+        placed = [s for s in self.sessions if s.slot is not None]
+        faculty_ids = {s.faculty_id for s in placed}
+        breakdown = {
+            'unscheduled': len(self.pending),
+            'faculty': sum(self.faculty_day_cost(f, day)
+                           for f in faculty_ids for day in range(len(DAYS))),
+            'waste': sum(self.waste_cost(s) for s in placed),
+            'same_day': sum(self.course_cost(c) for c in {s.course_id for s in placed}),
+        }
+        breakdown['total'] = (HARD_WEIGHT * breakdown['unscheduled'] + breakdown['faculty']
+                              + breakdown['waste'] + breakdown['same_day'])
+        return breakdown
+
+    def score(self):
+        return self.score_breakdown()['total']
+
+    def local_cost(self, s, days):
+        return (sum(self.faculty_day_cost(s.faculty_id, day) for day in days)
+                + self.course_cost(s.course_id) + self.waste_cost(s))
+
+    def improve(self, iterations, deadline=None, temperature=2.0):
+        """Simulated annealing over single-session moves; never introduces a clash"""
+        rng = self.rng or random.Random(0)
+        placed = [s for s in self.sessions if s.slot is not None]
+        for i in range(iterations):
+            if deadline is not None and i % 256 == 0 and time.time() > deadline:
+                break
+
+            # Now and then retry a pending session; the board may have loosened up
+            if self.pending and rng.random() < 0.05:
+                index = rng.randrange(len(self.pending))
+                s = self.pending[index][0]
+                if not s.room_mask:
+                    continue
+                target = self.find_free(s)
+                if target:
+                    self.assign(s, *target)
+                if target or (self.rooms_by_capacity and self.place_with_ejection(s)):
+                    placed.append(s)
+                    self.pending.pop(index)
+                continue
+
+            if not placed:
+                break
+            s = rng.choice(placed)
+            free_slots = list(iter_bits(ALL_SLOTS & ~self.busy_mask(s)))
+            if not free_slots:
+                continue
+            slot = rng.choice(free_slots)
+            rooms = self.occupancy.rooms.free_mask(slot, s.room_mask)
+            if not rooms:
+                continue
+
+            old_slot, old_room = s.slot, s.room
+            days = {slot_day(old_slot), slot_day(slot)}
+            before = self.local_cost(s, days)
+            self.unassign(s)
+            self.assign(s, slot, self.pick_room(rooms))
+            delta = self.local_cost(s, days) - before
+
+            heat = temperature * (1 - i / iterations)
+            if delta > 0 and (heat <= 0 or rng.random() >= math.exp(-delta / heat)):
+                self.unassign(s)
+                self.assign(s, old_slot, old_room)
+
+        self.unscheduled = self.skipped + [(s.course_id, reason) for s, reason in self.pending]
+
+    def entries(self):
+        """Placed sessions as (course_id, faculty_id, room_id, day, slot_id) rows"""
+        placed = sorted((s.slot, self.occupancy.rooms.ids[s.room], s) for s in self.sessions
+                        if s.slot is not None)
+        return [(s.course_id, s.faculty_id, room_id) + slot_key(slot) for slot, room_id, s in placed]
+
+
+class SearchResult:
+    """Outcome of one seeded timetable search"""
+
+    def __init__(self, seed, score, breakdown, entries, unscheduled):
+        self.seed = seed
+        self.score = score
+        self.breakdown = breakdown
+        self.entries = entries
+        self.unscheduled = unscheduled
+
+
+def run_search(courses, rooms, cohort_sizes, seed, iterations, deadline=None,
+               conflicts=None, course_sizes=None):
+    """Construct a timetable with a seeded order and improve it by annealing"""
+    solver = TimetableSolver(courses, rooms, cohort_sizes, seed=seed, conflicts=conflicts,
+                             course_sizes=course_sizes)
+    solver.solve()
+    solver.improve(iterations, deadline)
+    solver.match_rooms()
+    breakdown = solver.score_breakdown()
+    return SearchResult(seed, breakdown['total'], breakdown, solver.entries(), solver.unscheduled)
+
+
+def optimise(courses, rooms, cohort_sizes=None, starts=None, workers=None, seed=0,
+             time_budget=10.0, iterations=200000, progress=None, conflicts=None, course_sizes=None):
+    """Run independent seeded searches across processes and keep the best timetable.
+
+    Seeds are seed, seed + 1, ... so a run is reproducible as long as no search is cut
+    short by the wall-clock budget.
+    """
+    workers = workers or os.cpu_count() or 1
+    starts = starts or workers
+    deadline = time.time() + time_budget
+    seeds = [seed + i for i in range(starts)]
+
+    results = []
+    if workers == 1 or starts == 1:
+        for s in seeds:
+            results.append(run_search(courses, rooms, cohort_sizes, s, iterations, deadline,
+                                      conflicts, course_sizes))
+            if progress:
+                progress(len(results) / starts, f"{len(results)} of {starts} searches done")
+    else:
+        # Imported here: the process pool machinery is slow to import and rarely needed
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=min(workers, starts)) as pool:
+            futures = [pool.submit(run_search, courses, rooms, cohort_sizes, s, iterations, deadline,
+                                   conflicts, course_sizes)
+                       for s in seeds]
+            try:
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    if progress:
+                        progress(len(results) / starts, f"{len(results)} of {starts} searches done")
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    return min(results, key=lambda result: (result.score, result.seed))
@@ -0,0 +1,189 @@
+"""Deterministic synthetic campus data for benchmarks and load testing"""
+import math
+import random
+
+import campus_scheduler
+
+
+# (discipline, code prefix, share of students, share of courses taught in labs)
+DISCIPLINES = [
+    ('Computer Science', 'CS', 0.22, 0.35),
+    ('Electronics', 'EC', 0.14, 0.40),
+    ('Mechanical Engineering', 'ME', 0.13, 0.30),
+    ('Civil Engineering', 'CE', 0.10, 0.25),
+    ('Electrical Engineering', 'EE', 0.09, 0.35),
+    ('Business', 'BA', 0.12, 0.0),
+    ('Mathematics', 'MA', 0.07, 0.0),
+    ('Physics', 'PH', 0.05, 0.40),
+    ('Chemistry', 'CH', 0.05, 0.50),
+    ('Humanities', 'HU', 0.03, 0.0),
+]
+
+FIRST_NAMES = ['Aarav', 'Aisha', 'Ben', 'Chloe', 'Diego', 'Elena', 'Farah', 'George', 'Hana',
+               'Ivan', 'Jia', 'Kofi', 'Leila', 'Mateo', 'Nina', 'Omar', 'Priya', 'Quinn',
+               'Rosa', 'Sanjay', 'Tara', 'Umar', 'Vera', 'Wei', 'Yusuf', 'Zara']
+LAST_NAMES = ['Ahmed', 'Brown', 'Chen', 'Das', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Iyer',
+              'Jones', 'Khan', 'Lopez', 'Mehta', 'Nguyen', 'Okafor', 'Patel', 'Rossi', 'Singh',
+              'Tanaka', 'Usman', 'Varga', 'Wang', 'Yadav', 'Zhou']
+SUBJECTS = ['Foundations', 'Methods', 'Systems', 'Design', 'Analysis', 'Laboratory', 'Theory',
+            'Applications', 'Modelling', 'Project', 'Seminar', 'Practice']
+
+# A programme is one intake of students; its year groups are the timetable's cohorts
+STUDENTS_PER_PROGRAMME = 200
+COURSES_PER_YEAR = 6
+COURSES_PER_FACULTY = 2
+YEARS = 4
+# Share of room-slots the generated rooms would be busy if every session were placed
+ROOM_LOAD = 0.7
+# Share of students who swap one of their courses for the same-numbered course of the
+# sister programme in their discipline
+ELECTIVE_SHARE = 0.05
+CHUNK_SIZE = 10000
+
+
+def programme_code(prefix, index):
+    """CS, CSB, CSC ... CSZ, CSAA ...: letters only so course numbers stay unambiguous"""
+    if index == 0:
+        return prefix
+    suffix = ''
+    index += 1
+    while index:
+        index, letter = divmod(index - 1, 26)
+        suffix = chr(ord('A') + letter) + suffix
+    return prefix + suffix
+
+
+def plan_programmes(students):
+    """(department code, discipline index) of every programme, sized to the student count"""
+    programmes = []
+    for index, (_, prefix, share, _) in enumerate(DISCIPLINES):
+        count = max(1, round(students * share / STUDENTS_PER_PROGRAMME))
+        programmes += [(programme_code(prefix, i), index) for i in range(count)]
+    return programmes
+
+
+def person(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def in_chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def generate_campus(db_manager, students, seed=0, progress=None):
+    """Fill the database with a campus of the given size; the same seed gives the same data.
+
+    Returns the number of rows added per table.
+    """
+    rng = random.Random(seed)
+    programmes = plan_programmes(students)
+    counts = {'students': 0, 'faculty': 0, 'courses': 0, 'rooms': 0, 'enrollments': 0}
+
+    def insert(table, rows, columns):
+        ids = []
+        for chunk in in_chunks(rows):
+            ids += db_manager.bulk_insert(table, chunk, columns)
+            counts[table] += len(chunk)
+            if progress:
+                progress(table, counts[table])
+        return ids
+
+    with db_manager.transaction():
+        # Faculty: enough per programme to teach its courses
+        faculty_rows, faculty_programme = [], []
+        per_programme = math.ceil(YEARS * COURSES_PER_YEAR / COURSES_PER_FACULTY)
+        for code, _ in programmes:
+            for _ in range(per_programme):
+                name = "Dr. " + person(rng)
+                faculty_rows.append((name, code, f"{name.split()[-1].lower()}{len(faculty_rows)}@campus.edu",
+                                     f"+1-555-{rng.randrange(10 ** 7):07d}"))
+                faculty_programme.append(code)
+        faculty_ids = insert('faculty', faculty_rows, ('name', 'department', 'email', 'phone'))
+        teachers = {}
+        for faculty_id, code in zip(faculty_ids, faculty_programme):
+            teachers.setdefault(code, []).append(faculty_id)
+
+        # Courses: COURSES_PER_YEAR per programme year, some of them in labs
+        course_rows = []
+        for code, discipline in programmes:
+            lab_share = DISCIPLINES[discipline][3]
+            staff = teachers[code]
+            for year in range(1, YEARS + 1):
+                for number in range(1, COURSES_PER_YEAR + 1):
+                    lab = rng.random() < lab_share
+                    course_rows.append((
+                        f"{code}{year}{number:02d}",
+                        f"{DISCIPLINES[discipline][0]} {rng.choice(SUBJECTS)} {year}{number:02d}",
+                        rng.choice((2, 3, 3, 3, 4)),
+                        code,
+                        staff[len(course_rows) % len(staff)],
+                        'Lab' if lab else campus_scheduler.DEFAULT_ROOM_TYPE))
+        course_ids = insert('courses', course_rows,
+                            ('course_code', 'course_name', 'credits', 'department', 'faculty_id',
+                             'room_type'))
+
+        # Rooms: enough seats and slots for every session at ROOM_LOAD, lab share as needed
+        sessions = sum(row[2] for row in course_rows)
+        lab_sessions = sum(row[2] for row in course_rows if row[5] == 'Lab')
+        room_count = max(2, math.ceil(sessions / (campus_scheduler.SLOT_COUNT * ROOM_LOAD)))
+        lab_count = max(1, round(room_count * lab_sessions / max(sessions, 1)))
+        room_rows = []
+        for i in range(room_count):
+            discipline = DISCIPLINES[i % len(DISCIPLINES)]
+            building = f"{discipline[0]} Block {i // (len(DISCIPLINES) * 20) + 1}"
+            if i < lab_count:
+                room_rows.append((f"L-{i + 1:04d}", rng.choice((60, 70, 80)), 'Lab', building))
+            else:
+                capacity = rng.choice((60, 70, 80, 80, 100, 120, 150, 200))
+                room_rows.append((f"R-{i + 1:04d}", capacity, 'Classroom', building))
+        insert('rooms', room_rows, ('room_name', 'capacity', 'room_type', 'building'))
+
+        # Students spread over programmes and semesters
+        placements = []
+
+        def student_rows():
+            for i in range(students):
+                programme = rng.randrange(len(programmes))
+                semester = rng.randint(1, YEARS * 2)
+                placements.append((programme, (semester + 1) // 2))
+                name = person(rng)
+                yield (name, programmes[programme][0], semester,
+                       f"{name.split()[0].lower()}.{i}@students.campus.edu")
+        student_ids = insert('students', student_rows(), ('name', 'department', 'semester', 'email'))
+
+        # Every course of the student's programme year, one of them now and then swapped
+        # for the sister programme's (programmes of a discipline are paired off)
+        by_discipline = {}
+        for index, (_, discipline) in enumerate(programmes):
+            by_discipline.setdefault(discipline, []).append(index)
+        sister = {}
+        for indexes in by_discipline.values():
+            for position, index in enumerate(indexes):
+                sister[index] = indexes[position ^ 1] if position ^ 1 < len(indexes) else None
+
+        def year_courses(programme, year):
+            first = (programme * YEARS + year - 1) * COURSES_PER_YEAR
+            return course_ids[first:first + COURSES_PER_YEAR]
+
+        def enrollment_rows():
+            for student_id, (programme, year) in zip(student_ids, placements):
+                courses = year_courses(programme, year)
+                if sister[programme] is not None and rng.random() < ELECTIVE_SHARE:
+                    swap = rng.randrange(COURSES_PER_YEAR)
+                    courses = list(courses)
+                    courses[swap] = year_courses(sister[programme], year)[swap]
+                for course_id in courses:
+                    yield student_id, course_id
+
+        for chunk in in_chunks(enrollment_rows()):
+            counts['enrollments'] += db_manager.enroll(chunk)
+            if progress:
+                progress('enrollments', counts['enrollments'])
+    return counts
@@ -0,0 +1,114 @@
+"""Asyncio HTTP/JSON API"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http import HTTPStatus
+
+from campus_api import CampusAPI, HTTPError
+from campus_db import DatabaseManager
+
+
+class APITest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+        self.db.bulk_insert('students', [(f'Student {i}', 'CSE', 1, '') for i in range(45)],
+                            ('name', 'department', 'semester', 'email'))
+        self.api = CampusAPI(self.db, workers=4)
+
+    def tearDown(self):
+        self.api.close()
+        self.db.close()
+        self.directory.cleanup()
+
+    def request(self, method, target, body=None):
+        data = json.dumps(body).encode() if body is not None else b''
+        return asyncio.run(self.api.handle(method, target, data))
+
+    def test_pages_follow_the_cursor(self):
+        ids, cursor = [], None
+        while True:
+            target = '/api/students?limit=20' + (f'&after={cursor}' if cursor else '')
+            status, page = self.request('GET', target)
+            self.assertEqual(status, HTTPStatus.OK)
+            ids += [row['student_id'] for row in page['rows']]
+            cursor = page['next']
+            if cursor is None:
+                break
+        self.assertEqual(ids, sorted(row[0] for row in self.db.get_all_students()))
+
+    def test_filtered_listing(self):
+        status, page = self.request('GET', '/api/students?limit=100&department=ECE')
+        self.assertEqual({row['department'] for row in page['rows']}, {'ECE'})
+
+    def test_add_get_and_delete_a_row(self):
+        status, created = self.request('POST', '/api/rooms', {'room_name': 'D-1', 'capacity': 20})
+        self.assertEqual(status, HTTPStatus.CREATED)
+        status, room = self.request('GET', f"/api/rooms/{created['id']}")
+        self.assertEqual(room['room_name'], 'D-1')
+
+        self.assertEqual(self.request('DELETE', f"/api/rooms/{created['id']}")[0], HTTPStatus.OK)
+        with self.assertRaises(HTTPError) as caught:
+            self.request('DELETE', f"/api/rooms/{created['id']}")
+        self.assertEqual(caught.exception.status, HTTPStatus.NOT_FOUND)
+
+    def test_writes_are_serialised(self):
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_write():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        async def run():
+            await asyncio.gather(*(self.api.write(slow_write) for _ in range(5)),
+                                 *(self.api.call(self.db.get_all_rooms) for _ in range(5)))
+
+        asyncio.run(run())
+        self.assertEqual(peak[0], 1)
+
+    def test_batch_answers_each_entry(self):
+        status, answers = self.request('POST', '/api/batch', [
+            {'path': '/api/stats'},
+            {'path': '/api/students/999999'},
+            {'path': '/api/students'},
+            {'method': 'POST', 'path': '/api/students', 'body': {'name': 'Batch Student'}},
+        ])
+        self.assertEqual([answer['status'] for answer in answers], [200, 404, 400, 201])
+        # Entries run concurrently, so stats may or may not see the new student
+        self.assertIn(answers[0]['body']['students'], (50, 51))
+
+    def test_whole_table_streams_over_http(self):
+        async def run():
+            server = await self.api.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(b"GET /api/students HTTP/1.1\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+                response = await reader.read()
+                writer.close()
+            return response
+
+        head, _, body = asyncio.run(run()).partition(b'\r\n\r\n')
+        self.assertIn(b'Transfer-Encoding: chunked', head)
+        chunks, rest = [], body
+        while True:
+            size, _, rest = rest.partition(b'\r\n')
+            if int(size, 16) == 0:
+                break
+            chunks.append(rest[:int(size, 16)])
+            rest = rest[int(size, 16) + 2:]
+        self.assertEqual(len(json.loads(b''.join(chunks))), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Row-level change events and table version counters"""
+import os
+import tempfile
+import unittest
+
+from campus_db import DatabaseManager
+
+
+class ChangeEventTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'campus.db')
+        self.db = DatabaseManager(self.path)
+        self.events = []
+        self.db.subscribe(lambda table, op, keys, version: self.events.append((table, op, keys)))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_events_arrive_after_commit(self):
+        with self.db.transaction():
+            student_id = self.db.add_student('Dana Kim', 'ECE', 1, 'dana@college.edu')
+            self.assertEqual(self.events, [])
+        self.db.delete_student(student_id)
+
+        self.assertEqual(self.events, [('students', 'insert', [student_id]),
+                                       ('students', 'delete', [student_id])])
+
+    def test_rolled_back_changes_are_not_reported(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.add_student('Dana Kim', 'ECE', 1, 'dana@college.edu')
+                raise RuntimeError("abandon")
+
+        self.assertEqual(self.events, [])
+        self.db.add_room('D-1', 20, 'Classroom', 'Annex')
+        self.assertEqual([event[:2] for event in self.events], [('rooms', 'insert')])
+
+    def test_generation_resets_the_timetable(self):
+        self.db.generate_timetable()
+        self.assertIn(('timetable', 'reset', None), self.events)
+
+    def test_writes_from_another_connection_bump_the_version(self):
+        before = self.db.table_versions()
+        other = DatabaseManager(self.path)
+        try:
+            other.execute_query("UPDATE rooms SET capacity = capacity + 1 WHERE room_id = 1")
+        finally:
+            other.close()
+
+        after = self.db.table_versions()
+        self.assertGreater(after['rooms'], before['rooms'])
+        self.assertEqual(after['students'], before['students'])
+
+
+if __name__ == '__main__':
+    unittest.main()
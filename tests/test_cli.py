@@ -0,0 +1,84 @@
+"""Headless command line interface and streaming export"""
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import campus_cli
+import campus_export
+from campus_db import DatabaseManager
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'campus.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_cli(self, *argv):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            status = campus_cli.main(['--db', self.path] + list(argv))
+        return status, out.getvalue(), err.getvalue()
+
+    def test_stats_as_json(self):
+        status, out, _ = self.run_cli('stats', '--json')
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(out)['students'], 5)
+
+    def test_export_then_import_round_trips(self):
+        exported = os.path.join(self.directory.name, 'students.jsonl')
+        self.assertEqual(self.run_cli('export', 'students', exported)[0], 0)
+        db = DatabaseManager(self.path)
+        try:
+            db.execute_query("DELETE FROM students")
+        finally:
+            db.close()
+
+        status, out, _ = self.run_cli('import', 'students', exported)
+
+        self.assertEqual(status, 0)
+        self.assertIn('5 imported, 0 rejected', out)
+
+    def test_generate_timetable(self):
+        status, out, _ = self.run_cli('generate-timetable')
+        self.assertEqual(status, 0)
+        self.assertIn('Timetable generated with', out)
+
+    def test_errors_are_reported_with_a_status(self):
+        status, _, err = self.run_cli('import', 'students', os.path.join(self.directory.name, 'nope.csv'))
+        self.assertEqual(status, 1)
+        self.assertTrue(err.startswith('Error:'))
+
+    def test_does_not_load_tk(self):
+        code = "import sys, campus_cli; print('tkinter' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+class ExportTest(unittest.TestCase):
+    def test_csv_has_a_header_and_every_row(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db = DatabaseManager(os.path.join(directory, 'campus.db'))
+            try:
+                db.generate_timetable()
+                path = os.path.join(directory, 'timetable.csv')
+                count = campus_export.export_file(db, 'timetable', path)
+                with open(path, encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+                self.assertEqual(lines[0], ','.join(campus_export.EXPORT_COLUMNS['timetable']))
+                self.assertEqual(count, len(db.get_timetable()))
+                self.assertEqual(len(lines), count + 1)
+            finally:
+                db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
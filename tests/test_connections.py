@@ -0,0 +1,65 @@
+"""Pooled per-thread connections, on a file and in memory"""
+import os
+import tempfile
+import threading
+import unittest
+
+from campus_db import DatabaseManager
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def run_concurrently(self, db):
+        errors = []
+
+        def writer():
+            try:
+                for i in range(100):
+                    db.add_student(f"Student {i}", 'CSE', 1, f"s{i}@college.edu")
+            except Exception as e:
+                errors.append(e)
+
+        def reader():
+            try:
+                for _ in range(100):
+                    db.get_all_students()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=job) for job in (writer, reader, reader)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(db.get_all_students()), 105)
+
+    def test_file_database_with_concurrent_threads(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db = DatabaseManager(os.path.join(directory, 'campus.db'))
+            try:
+                self.run_concurrently(db)
+            finally:
+                db.close()
+
+    def test_memory_database_with_concurrent_threads(self):
+        db = DatabaseManager(':memory:')
+        path = db.path
+        try:
+            self.run_concurrently(db)
+        finally:
+            db.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_memory_databases_are_separate(self):
+        first, second = DatabaseManager(':memory:'), DatabaseManager(':memory:')
+        try:
+            first.add_student('Only Here', 'CSE', 1, 'only@college.edu')
+            self.assertEqual(len(first.get_all_students()), 6)
+            self.assertEqual(len(second.get_all_students()), 5)
+        finally:
+            first.close()
+            second.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
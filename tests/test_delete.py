@@ -0,0 +1,110 @@
+"""Foreign key delete rules, batch delete and the delete command"""
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import campus_cli
+from campus_db import DatabaseManager
+from test_migrations import make_baseline_database
+
+
+class DeleteTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'campus.db')
+        self.db = DatabaseManager(self.path)
+        self.db.generate_timetable()
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def count(self, query, params=()):
+        return self.db.execute_query(query, params)[0][0]
+
+    def test_deleting_a_student_takes_their_enrollments(self):
+        self.db.enroll([(1, 1), (1, 2), (2, 1)])
+        self.assertEqual(self.db.delete_many('students', [1, 2, 99]), 2)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM enrollments"), 0)
+
+    def test_deleting_faculty_keeps_their_courses_without_a_teacher(self):
+        self.assertGreater(self.count("SELECT COUNT(*) FROM timetable WHERE faculty_id = 1"), 0)
+        self.assertEqual(self.db.delete_many('faculty', [1]), 1)
+        self.assertEqual(self.db.execute_query("SELECT faculty_id FROM courses WHERE course_id IN (1, 2)"),
+                         [(None,), (None,)])
+        self.assertEqual(self.count("SELECT COUNT(*) FROM timetable WHERE faculty_id = 1"), 0)
+
+    def test_deleting_a_room_takes_its_sessions(self):
+        self.db.delete_room(1)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM timetable WHERE room_id = 1"), 0)
+        self.assertNotIn(1, self.db.find_free_rooms('Monday', '9:00-10:00'))
+
+    def test_time_slot_in_use_cannot_be_deleted(self):
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db.execute_query("DELETE FROM time_slots WHERE slot_id IN (SELECT slot_id FROM timetable)")
+
+    def test_courses_without_a_teacher_are_not_generated(self):
+        self.db.delete_many('faculty', [1])
+        self.db.generate_timetable()
+        self.assertEqual(self.count("SELECT COUNT(*) FROM timetable WHERE course_id IN (1, 2)"), 0)
+        self.assertIn((1, "No faculty assigned"), self.db.unscheduled)
+
+    def test_unknown_faculty_is_a_value_error(self):
+        with self.assertRaises(ValueError):
+            self.db.add_course('CSE999', 'Nothing', 3, 'CSE', 99)
+
+
+class OrphanMigrationTest(unittest.TestCase):
+    def test_orphaned_rows_are_cleared(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'campus.db')
+            make_baseline_database(path)
+            conn = sqlite3.connect(path)
+            conn.execute("DELETE FROM faculty WHERE faculty_id = 2")
+            conn.execute("DELETE FROM rooms WHERE room_id = 2")
+            conn.commit()
+            conn.close()
+
+            db = DatabaseManager(path)
+            try:
+                self.assertEqual(db.execute_query("SELECT faculty_id FROM courses WHERE course_id = 2"),
+                                 [(None,)])
+                # Sessions 2 (room 2) and 3 (faculty 2) pointed at rows that are gone
+                self.assertEqual(db.execute_query("SELECT timetable_id FROM timetable"), [(1,)])
+                self.assertEqual(db.execute_query("PRAGMA foreign_key_check"), [])
+            finally:
+                db.close()
+
+
+class DeleteCommandTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'campus.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_cli(self, *argv):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            status = campus_cli.main(['--db', self.path] + list(argv))
+        return status, out.getvalue(), err.getvalue()
+
+    def test_deletes_by_filter(self):
+        status, out, _ = self.run_cli('delete', 'students', '--filter', 'department=CSE')
+        self.assertEqual(status, 0)
+        self.assertIn('students deleted', out)
+        self.assertEqual(self.run_cli('delete', 'students', '--filter', 'department=CSE')[0], 1)
+
+    def test_rejects_an_empty_filter(self):
+        for item in ('department=', 'department', '=CSE'):
+            status, _, err = self.run_cli('delete', 'students', '--filter', item)
+            self.assertEqual(status, 1)
+            self.assertIn('COLUMN=VALUE', err)
+
+
+if __name__ == '__main__':
+    unittest.main()
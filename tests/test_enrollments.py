@@ -0,0 +1,75 @@
+"""Enrollments, the course-conflict graph and the student clash report"""
+import os
+import tempfile
+import unittest
+
+import campus_scheduler
+from campus_db import DatabaseManager
+
+
+class EnrollmentTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+        # Students 1-3 share courses 1 and 4 (CSE101 and ECE101: different cohorts and teachers)
+        self.db.enroll([(1, 1), (1, 4), (2, 1), (2, 4), (3, 1), (3, 4), (4, 2)])
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_enroll_counts_only_new_pairs(self):
+        self.assertEqual(self.db.enroll([(1, 1), (5, 1)]), 1)
+        self.assertEqual(self.db.get_course_students(1), [1, 2, 3, 5])
+        self.assertEqual(self.db.unenroll([(5, 1), (5, 2)]), 1)
+        self.assertEqual(self.db.get_student_courses(1), [1, 4])
+
+    def test_conflict_graph_counts_shared_students(self):
+        graph = self.db.course_conflicts()
+        self.assertEqual(graph, {1: {4: 3}, 4: {1: 3}})
+        self.assertIs(self.db.course_conflicts(), graph)
+
+        self.db.enroll([(4, 1)])
+        self.assertEqual(self.db.course_conflicts()[1], {4: 3, 2: 1})
+
+    def test_deleting_a_student_drops_their_enrollments(self):
+        self.db.delete_student(1)
+        self.assertEqual(self.db.get_course_students(4), [2, 3])
+
+    def test_solver_keeps_conflicting_courses_apart(self):
+        self.db.generate_timetable()
+        slots = {}
+        for course_id, day, slot_id in self.db.execute_query(
+                "SELECT course_id, day, slot_id FROM timetable WHERE course_id IN (1, 4)"):
+            slots.setdefault(course_id, set()).add((day, slot_id))
+        self.assertEqual(len(slots), 2)
+        self.assertFalse(slots[1] & slots[4])
+        self.assertEqual(self.db.student_clash_report(), [])
+
+    def test_clash_report_names_the_students(self):
+        # Different teachers and rooms, so only the shared students clash
+        self.db.add_timetable_entry(1, 1, 'Monday', '9:00-10:00')
+        self.db.add_timetable_entry(4, 2, 'Monday', '9:00-10:00')
+
+        self.assertEqual(self.db.student_clash_report(),
+                         [(student_id, 1, 4, 'Monday', '9:00-10:00') for student_id in (1, 2, 3)])
+
+
+class ConflictSolverTest(unittest.TestCase):
+    def test_conflict_edges_are_hard_constraints(self):
+        # Every course conflicts with every other, and the departments differ so cohorts do not
+        courses = [(i, f'D{i}101', f'C{i}', 1, f'D{i}', i, 'Classroom') for i in range(1, 31)]
+        rooms = [(i, f'R-{i}', 40, 'Classroom', 'Main') for i in range(1, 6)]
+        conflicts = {a: {b: 1 for b in range(1, 31) if b != a} for a in range(1, 31)}
+
+        solver = campus_scheduler.TimetableSolver(courses, rooms, conflicts=conflicts)
+        entries = solver.solve()
+
+        slots = [(day, time_slot) for _, _, _, day, time_slot in entries]
+        self.assertEqual(len(slots), len(set(slots)))
+        self.assertEqual(len(entries), campus_scheduler.SLOT_COUNT)
+        self.assertEqual(len(solver.unscheduled), 30 - campus_scheduler.SLOT_COUNT)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""iCalendar feeds and skip-if-unchanged exports"""
+import datetime
+import os
+import tempfile
+import unittest
+
+import campus_export
+from campus_db import DatabaseManager
+
+
+class CalendarExportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.out = os.path.join(self.directory.name, 'feeds')
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+        self.db.generate_timetable()
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_one_event_per_session_in_each_room_feed(self):
+        counts = campus_export.export_calendars(self.db, 'room', self.out, workers=3,
+                                                term_start=datetime.date(2026, 9, 2))
+
+        sessions = dict(self.db.execute_query("SELECT room_id, COUNT(*) FROM timetable GROUP BY room_id"))
+        self.assertEqual(len(counts), len(self.db.get_all_rooms()))
+        for room_id, name in self.db.execute_query("SELECT room_id, room_name FROM rooms"):
+            file_name = campus_export.feed_name('room', room_id, name) + '.ics'
+            self.assertEqual(counts[file_name], sessions.get(room_id, 0))
+            with open(os.path.join(self.out, file_name), 'rb') as f:
+                text = f.read()
+            self.assertTrue(text.startswith(b'BEGIN:VCALENDAR\r\n'))
+            self.assertEqual(text.count(b'BEGIN:VEVENT'), sessions.get(room_id, 0))
+        # Events start in the week of the term start, which began on Monday 31 August
+        busiest = max(counts, key=counts.get)
+        with open(os.path.join(self.out, busiest), 'rb') as f:
+            self.assertRegex(f.read(), rb'DTSTART:2026(0831|090[1-4])T')
+
+    def test_unchanged_feeds_are_not_rewritten(self):
+        self.assertIsNotNone(campus_export.export_calendars(self.db, 'faculty', self.out))
+        self.assertIsNone(campus_export.export_calendars(self.db, 'faculty', self.out))
+
+        self.db.add_faculty('Dr. New', 'CSE', 'new@college.edu', '')
+        self.assertIsNotNone(campus_export.export_calendars(self.db, 'faculty', self.out))
+
+    def test_workers_leave_no_connections_behind(self):
+        before = len(self.db._connections)
+        for _ in range(3):
+            campus_export.export_calendars(self.db, 'cohort', self.out, workers=4, skip_unchanged=False)
+        self.assertEqual(len(self.db._connections), before)
+
+    def test_file_export_skips_when_unchanged(self):
+        path = os.path.join(self.directory.name, 'rooms.csv')
+        self.assertEqual(campus_export.export_file(self.db, 'rooms', path, skip_unchanged=True),
+                         len(self.db.get_all_rooms()))
+        self.assertIsNone(campus_export.export_file(self.db, 'rooms', path, skip_unchanged=True))
+        os.remove(path)
+        self.assertIsNotNone(campus_export.export_file(self.db, 'rooms', path, skip_unchanged=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Id allocation by rowid and reserved blocks"""
+import os
+import tempfile
+import threading
+import unittest
+
+from campus_db import DatabaseManager
+
+
+class IdAllocationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'campus.db')
+        self.db = DatabaseManager(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_add_returns_the_new_id(self):
+        first = self.db.add_student('New One', 'CSE', 1, 'one@college.edu')
+        second = self.db.add_student('New Two', 'CSE', 1, 'two@college.edu')
+        self.assertEqual(second, first + 1)
+        self.assertEqual(self.db.execute_query(
+            "SELECT name FROM students WHERE student_id = ?", (second,)), [('New Two',)])
+
+    def test_bulk_insert_uses_one_contiguous_block(self):
+        ids = self.db.bulk_insert('rooms', [(f'R-{i}', 30, 'Classroom', 'Annex') for i in range(50)],
+                                  ('room_name', 'capacity', 'room_type', 'building'))
+        self.assertEqual(len(ids), 50)
+        self.assertEqual(list(ids), list(range(ids[0], ids[0] + 50)))
+        self.assertEqual(self.db.execute_query(
+            "SELECT COUNT(*) FROM rooms WHERE building = 'Annex'"), [(50,)])
+
+    def test_reserve_ids_needs_a_transaction(self):
+        with self.assertRaises(RuntimeError):
+            self.db.reserve_ids('students', 10)
+
+    def test_concurrent_writers_never_share_an_id(self):
+        managers = [DatabaseManager(self.path) for _ in range(3)]
+        errors = []
+
+        def load(db, name):
+            try:
+                for batch in range(10):
+                    db.bulk_insert('students', [(f'{name}-{batch}-{i}', 'ECE', 2, '') for i in range(20)],
+                                   ('name', 'department', 'semester', 'email'))
+                    db.add_student(f'{name}-single-{batch}', 'ECE', 2, '')
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=load, args=(db, f'w{i}')) for i, db in enumerate(managers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for db in managers:
+            db.close()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.db.execute_query(
+            "SELECT COUNT(*) FROM students WHERE name LIKE 'w%'"), [(3 * 10 * 21,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
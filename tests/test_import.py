@@ -0,0 +1,85 @@
+"""Streaming CSV and JSON Lines import"""
+import json
+import os
+import tempfile
+import unittest
+
+import campus_import
+from campus_db import DatabaseManager
+
+
+class ImportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        return path
+
+    def test_csv_rows_are_imported_in_chunks(self):
+        lines = ['name,department,semester,email']
+        lines += [f'Student {i},CSE,{i % 8 + 1},s{i}@college.edu' for i in range(25)]
+        path = self.write('students.csv', '\n'.join(lines) + '\n')
+        chunks = []
+
+        result = campus_import.import_file(self.db, 'students', path, chunk_size=10,
+                                           progress=lambda r: chunks.append(r.processed))
+
+        self.assertEqual((result.processed, result.imported, result.rejected_count), (25, 25, 0))
+        self.assertEqual(chunks, [10, 20, 25])
+        # Contiguous blocks from each chunk merge into one id range
+        self.assertEqual(len(result.ids), 1)
+        start, stop = result.ids[0]
+        self.assertEqual(stop - start, 25)
+        self.assertEqual(self.db.execute_query(
+            "SELECT COUNT(*) FROM students WHERE student_id >= ? AND student_id < ?", (start, stop)),
+            [(25,)])
+
+    def test_invalid_rows_are_rejected_and_reported(self):
+        path = self.write('students.csv', 'name,department,semester,email\n'
+                                          'Good,CSE,3,g@college.edu\n'
+                                          ',CSE,3,missing@college.edu\n'
+                                          'Bad Semester,CSE,three,b@college.edu\n')
+        rejects = os.path.join(self.directory.name, 'rejects.jsonl')
+
+        result = campus_import.import_file(self.db, 'students', path, reject_file=rejects)
+
+        self.assertEqual((result.imported, result.rejected_count), (1, 2))
+        self.assertEqual([line for line, _ in result.rejected], [3, 4])
+        with open(rejects, encoding='utf-8') as f:
+            written = [json.loads(line) for line in f]
+        self.assertEqual([entry['line'] for entry in written], [3, 4])
+        self.assertIn('semester', written[1]['error'])
+
+    def test_json_lines_courses_check_their_faculty(self):
+        path = self.write('courses.jsonl', '\n'.join([
+            json.dumps({'course_code': 'CSE900', 'course_name': 'Compilers', 'credits': 3,
+                        'department': 'CSE', 'faculty_id': 1}),
+            json.dumps({'course_code': 'CSE901', 'faculty_id': 999}),
+            '{not json',
+            '',
+        ]))
+
+        result = campus_import.import_file(self.db, 'courses', path)
+
+        self.assertEqual(result.imported, 1)
+        reasons = [reason for _, reason in result.rejected]
+        self.assertIn('Unknown faculty_id 999', reasons)
+        self.assertTrue(any(reason.startswith('Invalid JSON') for reason in reasons))
+        self.assertEqual(self.db.execute_query(
+            "SELECT course_name FROM courses WHERE course_code = 'CSE900'"), [('Compilers',)])
+
+    def test_unknown_entity(self):
+        with self.assertRaises(ValueError):
+            campus_import.import_file(self.db, 'timetable', self.write('t.csv', 'a\n1\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Query metrics and the slow-query log"""
+import json
+import os
+import tempfile
+import unittest
+
+import campus_metrics
+from campus_db import DatabaseManager
+
+
+class MetricsTest(unittest.TestCase):
+    def test_in_lists_share_a_shape(self):
+        self.assertEqual(campus_metrics.query_shape("SELECT *  FROM rooms\n WHERE room_id IN (?, ?,?)"),
+                         campus_metrics.query_shape("SELECT * FROM rooms WHERE room_id IN (?, ?)"))
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = campus_metrics.Histogram()
+        for seconds in (0.00005, 0.002, 0.002, 20):
+            histogram.observe(seconds)
+        buckets = histogram.snapshot()['buckets']
+        self.assertEqual(buckets['0.0001'], 1)
+        self.assertEqual(buckets['0.005'], 3)
+        self.assertEqual(buckets['10.0'], 3)
+        self.assertEqual(buckets['+Inf'], 4)
+
+
+class DatabaseMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_off_by_default(self):
+        self.db.get_all_rooms()
+        self.assertEqual(self.db.metrics_snapshot(), {})
+
+    def test_queries_spans_and_slow_log_are_recorded(self):
+        # A zero threshold logs every statement, with its query plan
+        self.db.enable_metrics(slow_threshold=0)
+        self.db.get_courses_by_faculty(1)
+        self.db.generate_timetable()
+
+        snapshot = self.db.metrics_snapshot()
+        shape = "SELECT * FROM courses WHERE faculty_id = ?"
+        self.assertEqual(snapshot['queries'][shape]['count'], 1)
+        self.assertTrue(snapshot['spans'])
+        slow = [entry for entry in snapshot['slow_queries'] if entry['query'] == shape]
+        self.assertTrue(any('idx_courses_faculty' in step for step in slow[0]['plan']))
+
+    def test_exports_json_and_prometheus(self):
+        self.db.enable_metrics()
+        self.db.get_all_students()
+        json_path = os.path.join(self.directory.name, 'metrics.json')
+        prom_path = os.path.join(self.directory.name, 'metrics.prom')
+        self.db.write_metrics(json_path)
+        self.db.write_metrics(prom_path)
+
+        with open(json_path, encoding='utf-8') as f:
+            self.assertIn('SELECT * FROM students', json.load(f)['queries'])
+        with open(prom_path, encoding='utf-8') as f:
+            text = f.read()
+        self.assertIn('campus_query_seconds_count{query="SELECT * FROM students"} 1', text)
+        self.assertIn('# TYPE campus_cache_hits_total counter', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
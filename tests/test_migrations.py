@@ -0,0 +1,87 @@
+"""Opening a database made by the original release upgrades it in place"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from campus_db import DatabaseManager
+
+# The tables as the first release created them, before any migration
+BASELINE_SCHEMA = [
+    '''CREATE TABLE students (student_id INTEGER PRIMARY KEY, name TEXT NOT NULL,
+       department TEXT, semester INTEGER, email TEXT)''',
+    '''CREATE TABLE faculty (faculty_id INTEGER PRIMARY KEY, name TEXT NOT NULL,
+       department TEXT, email TEXT, phone TEXT)''',
+    '''CREATE TABLE courses (course_id INTEGER PRIMARY KEY, course_code TEXT NOT NULL,
+       course_name TEXT, credits INTEGER, department TEXT, faculty_id INTEGER,
+       FOREIGN KEY (faculty_id) REFERENCES faculty (faculty_id))''',
+    '''CREATE TABLE rooms (room_id INTEGER PRIMARY KEY, room_name TEXT NOT NULL,
+       capacity INTEGER, room_type TEXT, building TEXT)''',
+    '''CREATE TABLE timetable (timetable_id INTEGER PRIMARY KEY AUTOINCREMENT,
+       course_id INTEGER, faculty_id INTEGER, room_id INTEGER, day TEXT, time_slot TEXT,
+       FOREIGN KEY (course_id) REFERENCES courses (course_id),
+       FOREIGN KEY (faculty_id) REFERENCES faculty (faculty_id),
+       FOREIGN KEY (room_id) REFERENCES rooms (room_id))''',
+]
+
+BASELINE_ROWS = {
+    'students': [(1, 'Asha Rao', 'CSE', 3, 'asha@college.edu'),
+                 (2, 'Ben Ode', 'ECE', 5, 'ben@college.edu')],
+    'faculty': [(1, 'Dr. Rao', 'CSE', 'rao@college.edu', '1'),
+                (2, 'Dr. Ode', 'ECE', 'ode@college.edu', '2')],
+    'courses': [(1, 'CSE201', 'Algorithms', 2, 'CSE', 1),
+                (2, 'ECE301', 'Signals', 1, 'ECE', 2)],
+    'rooms': [(1, 'C-101', 60, 'Classroom', 'Main Building'),
+              (2, 'C-102', 40, 'Classroom', 'Main Building')],
+    'timetable': [(1, 1, 1, 1, 'Monday', '9:00-10:00'),
+                  (2, 1, 1, 2, 'Wednesday', '2:00-3:00'),
+                  (3, 2, 2, 1, 'Tuesday', '11:00-12:00')],
+}
+
+
+def make_baseline_database(path):
+    conn = sqlite3.connect(path)
+    for statement in BASELINE_SCHEMA:
+        conn.execute(statement)
+    for table, rows in BASELINE_ROWS.items():
+        conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(rows[0]))})", rows)
+    conn.commit()
+    conn.close()
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'campus.db')
+        make_baseline_database(self.path)
+        self.db = DatabaseManager(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_upgrades_to_the_latest_schema(self):
+        self.assertEqual(self.db.schema_version(), len(DatabaseManager.MIGRATIONS))
+
+    def test_keeps_every_row(self):
+        for table, rows in BASELINE_ROWS.items():
+            count = self.db.execute_query(f"SELECT COUNT(*) FROM {table}")[0][0]
+            self.assertEqual(count, len(rows), table)
+        self.assertEqual(len(self.db.get_timetable()), len(BASELINE_ROWS['timetable']))
+
+    def test_adds_no_sample_data_to_an_existing_database(self):
+        self.assertEqual([row[1] for row in self.db.get_all_students()], ['Asha Rao', 'Ben Ode'])
+
+    def test_lookups_use_the_new_indexes(self):
+        plan = self.db.execute_query("EXPLAIN QUERY PLAN SELECT * FROM courses WHERE faculty_id = 1")
+        self.assertIn('USING INDEX', ' '.join(row[-1] for row in plan))
+
+    def test_reopening_is_a_no_op(self):
+        self.db.close()
+        self.db = DatabaseManager(self.path)
+        self.assertEqual(self.db.schema_version(), len(DatabaseManager.MIGRATIONS))
+        self.assertEqual(len(self.db.get_all_courses()), len(BASELINE_ROWS['courses']))
+
+
+if __name__ == '__main__':
+    unittest.main()
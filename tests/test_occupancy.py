@@ -0,0 +1,84 @@
+"""Bitset room and faculty occupancy"""
+import os
+import tempfile
+import unittest
+
+import campus_scheduler
+from campus_db import DatabaseManager
+
+
+class OccupancyTest(unittest.TestCase):
+    def setUp(self):
+        rooms = [(1, 'A-101', 60, 'Classroom'), (2, 'A-102', 30, 'Classroom'), (3, 'L-1', 40, 'Lab')]
+        self.occupancy = campus_scheduler.Occupancy(rooms, [10, 11])
+
+    def test_booking_takes_the_room_and_faculty_off_the_free_lists(self):
+        self.occupancy.book(3, room_id=1, faculty_id=10)
+
+        self.assertFalse(self.occupancy.is_free(3, room_id=1))
+        self.assertFalse(self.occupancy.is_free(3, faculty_id=10))
+        self.assertTrue(self.occupancy.is_free(4, room_id=1, faculty_id=10))
+        self.assertEqual(self.occupancy.free_rooms(3), [2, 3])
+        self.assertEqual(self.occupancy.free_faculty(3), [11])
+
+    def test_free_rooms_filter_by_type_and_capacity(self):
+        self.assertEqual(self.occupancy.free_rooms(0), [2, 3, 1])
+        self.assertEqual(self.occupancy.free_rooms(0, 'classroom', 40), [1])
+        self.assertEqual(self.occupancy.free_rooms(0, 'Lab'), [3])
+
+    def test_double_bookings_release_one_at_a_time(self):
+        # Legacy timetables may hold clashes; the slot frees up only after the last one goes
+        self.occupancy.book(0, room_id=2)
+        self.occupancy.book(0, room_id=2)
+        self.occupancy.release(0, room_id=2)
+        self.assertFalse(self.occupancy.is_free(0, room_id=2))
+        self.occupancy.release(0, room_id=2)
+        self.assertTrue(self.occupancy.is_free(0, room_id=2))
+
+    def test_removed_room_keeps_other_masks(self):
+        self.occupancy.book(5, room_id=3)
+        self.occupancy.remove_room(1)
+        self.assertEqual(self.occupancy.free_rooms(5), [2])
+        self.occupancy.add_room((4, 'B-1', 10, 'Classroom'))
+        self.assertEqual(self.occupancy.free_rooms(5), [4, 2])
+
+
+class DatabaseOccupancyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+        self.db.execute_query("DELETE FROM timetable")
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_add_timetable_entry_refuses_clashes(self):
+        course_id, faculty_id = self.db.execute_query(
+            "SELECT course_id, faculty_id FROM courses ORDER BY course_id LIMIT 1")[0]
+        other_course = self.db.execute_query(
+            "SELECT course_id FROM courses WHERE faculty_id = ? AND course_id != ?",
+            (faculty_id, course_id))[0][0]
+        self.db.add_timetable_entry(course_id, 1, 'Monday', '9:00-10:00')
+
+        with self.assertRaisesRegex(ValueError, 'Room 1'):
+            self.db.add_timetable_entry(other_course, 1, 'Monday', '9:00-10:00')
+        with self.assertRaisesRegex(ValueError, f'Faculty {faculty_id}'):
+            self.db.add_timetable_entry(other_course, 2, 'Monday', '9:00-10:00')
+        self.assertNotIn(1, self.db.find_free_rooms('Monday', '9:00-10:00'))
+        self.assertNotIn(faculty_id, self.db.find_free_faculty('Monday', '9:00-10:00'))
+
+    def test_deleting_an_entry_frees_its_room(self):
+        course_id = self.db.execute_query("SELECT MIN(course_id) FROM courses")[0][0]
+        timetable_id = self.db.add_timetable_entry(course_id, 1, 'Friday', '3:00-4:00')
+        self.db.delete_timetable_entry(timetable_id)
+        self.assertIn(1, self.db.find_free_rooms('Friday', '3:00-4:00'))
+
+    def test_occupancy_matches_a_generated_timetable(self):
+        self.db.generate_timetable()
+        for room_id, day, slot_id in self.db.execute_query("SELECT room_id, day, slot_id FROM timetable"):
+            self.assertNotIn(room_id, self.db.find_free_rooms(day, slot_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
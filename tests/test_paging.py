@@ -0,0 +1,46 @@
+"""Keyset paging of entity and timetable lists"""
+import os
+import tempfile
+import unittest
+
+from campus_db import DatabaseManager
+
+
+class PagingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+        self.db.bulk_insert('students', [(f'Student {i}', 'CSE', 1, '') for i in range(95)],
+                            ('name', 'department', 'semester', 'email'))
+        self.db.generate_timetable()
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def walk(self, table, limit):
+        pages = [self.db.get_page(table, limit)]
+        while len(pages[-1]) == limit:
+            pages.append(self.db.get_page(table, limit, after=self.db.page_key(table, pages[-1][-1])))
+        return pages
+
+    def test_forward_pages_cover_every_row_once(self):
+        for table in ('students', 'timetable'):
+            rows = [row for page in self.walk(table, 7) for row in page]
+            self.assertEqual(len(rows), self.db.count_rows(table), table)
+            self.assertEqual(len({row[0] for row in rows}), len(rows), table)
+            keys = [self.db.page_key(table, row) for row in rows]
+            self.assertEqual(keys, sorted(keys), table)
+
+    def test_backward_page_matches_the_forward_one(self):
+        pages = self.walk('students', 10)
+        previous = self.db.get_page('students', 10, before=self.db.page_key('students', pages[3][0]))
+        self.assertEqual(previous, pages[2])
+
+    def test_offset_jumps_to_a_position(self):
+        pages = self.walk('timetable', 5)
+        self.assertEqual(self.db.get_page('timetable', 5, offset=10), pages[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
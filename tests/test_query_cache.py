@@ -0,0 +1,102 @@
+"""Read-through query result cache"""
+import os
+import tempfile
+import unittest
+
+from campus_db import DatabaseManager, QueryCache, query_tables
+
+
+class QueryTablesTest(unittest.TestCase):
+    def test_classifies_statements(self):
+        self.assertEqual(query_tables("SELECT * FROM courses c JOIN faculty f ON 1"),
+                         ('read', frozenset({'courses', 'faculty'})))
+        self.assertEqual(query_tables("INSERT OR IGNORE INTO rooms VALUES (1)"),
+                         ('write', frozenset({'rooms'})))
+        self.assertEqual(query_tables("  update students SET name = ''"),
+                         ('write', frozenset({'students'})))
+        self.assertEqual(query_tables("DELETE FROM timetable"), ('write', frozenset({'timetable'})))
+        self.assertEqual(query_tables("CREATE INDEX i ON rooms (room_type)")[0], 'schema')
+
+
+class QueryCacheTest(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = QueryCache(max_entries=2)
+        cache.put('a', ((1,),), {'rooms'}, cache.epoch)
+        cache.put('b', ((2,),), {'rooms'}, cache.epoch)
+        cache.get('a')
+        cache.put('c', ((3,),), {'rooms'}, cache.epoch)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), ((1,),))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_byte_budget_bounds_the_cache(self):
+        rows = tuple((i, 'x' * 100) for i in range(100))
+        cache = QueryCache()
+        cache.max_bytes = cache.estimate(rows) * 2
+        for key in 'abc':
+            cache.put(key, rows, {'students'}, cache.epoch)
+        self.assertLessEqual(cache.stats()['bytes'], cache.max_bytes)
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_invalidation_drops_only_readers_of_the_table(self):
+        cache = QueryCache()
+        cache.put('rooms', ((1,),), {'rooms'}, cache.epoch)
+        cache.put('both', ((2,),), {'rooms', 'timetable'}, cache.epoch)
+        cache.put('students', ((3,),), {'students'}, cache.epoch)
+
+        cache.invalidate({'timetable'})
+
+        self.assertEqual(cache.get('rooms'), ((1,),))
+        self.assertIsNone(cache.get('both'))
+        self.assertEqual(cache.get('students'), ((3,),))
+
+    def test_result_read_before_a_write_is_not_stored(self):
+        cache = QueryCache()
+        epoch = cache.epoch
+        cache.invalidate({'rooms'})
+        cache.put('rooms', ((1,),), {'rooms'}, epoch)
+        self.assertIsNone(cache.get('rooms'))
+
+
+class DatabaseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'campus.db')
+        self.db = DatabaseManager(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_repeated_reads_hit_the_cache(self):
+        self.db.get_all_rooms()
+        hits = self.db.cache_stats()['hits']
+        self.db.get_all_rooms()
+        self.assertEqual(self.db.cache_stats()['hits'], hits + 1)
+
+    def test_own_writes_are_visible_at_once(self):
+        before = len(self.db.get_all_rooms())
+        with self.db.transaction():
+            self.db.add_room('D-1', 20, 'Classroom', 'Annex')
+            self.assertEqual(len(self.db.get_all_rooms()), before + 1)
+        self.assertEqual(len(self.db.get_all_rooms()), before + 1)
+
+    def test_writes_from_another_connection_are_visible(self):
+        before = len(self.db.get_all_students())
+        other = DatabaseManager(self.path)
+        try:
+            other.add_student('Remote Student', 'MECH', 1, 'remote@college.edu')
+        finally:
+            other.close()
+        self.assertEqual(len(self.db.get_all_students()), before + 1)
+
+    def test_cache_can_be_turned_off(self):
+        self.db.close()
+        self.db = DatabaseManager(self.path, cache_entries=0)
+        self.db.get_all_rooms()
+        self.assertEqual(self.db.cache_stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Incremental timetable repair"""
+import os
+import tempfile
+import unittest
+
+from campus_db import DatabaseManager
+
+
+class RepairTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+        self.db.generate_timetable()
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def timetable(self):
+        return set(self.db.execute_query(
+            "SELECT timetable_id, course_id, faculty_id, room_id, day, slot_id FROM timetable"))
+
+    def assertClashFree(self):
+        for column in ('room_id', 'faculty_id'):
+            self.assertEqual(self.db.execute_query(f'''SELECT {column}, day, slot_id FROM timetable
+                                                      GROUP BY {column}, day, slot_id
+                                                      HAVING COUNT(*) > 1'''), [])
+
+    def test_new_course_is_placed_without_moving_others(self):
+        before = self.timetable()
+        course_id = self.db.add_course('CSE401', 'Compilers', 3, 'CSE', 1)
+
+        after = self.timetable()
+        self.assertTrue(before <= after)
+        self.assertEqual([row[1] for row in after - before], [course_id] * 3)
+        self.assertClashFree()
+
+    def test_deleted_room_sessions_move_elsewhere(self):
+        room_id = self.db.execute_query("SELECT room_id FROM timetable GROUP BY room_id "
+                                        "ORDER BY COUNT(*) DESC LIMIT 1")[0][0]
+        count = len(self.timetable())
+        untouched = {row for row in self.timetable() if row[3] != room_id}
+
+        self.db.delete_room(room_id)
+
+        after = self.timetable()
+        self.assertTrue(untouched <= after)
+        self.assertNotIn(room_id, {row[3] for row in after})
+        self.assertEqual(len(after) + len(self.db.unscheduled), count)
+        self.assertClashFree()
+
+    def test_deleted_faculty_courses_are_reported(self):
+        course_ids = {row[0] for row in self.db.execute_query(
+            "SELECT course_id FROM courses WHERE faculty_id = 1")}
+
+        self.db.delete_faculty(1)
+
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) FROM timetable WHERE faculty_id = 1"),
+                         [(0,)])
+        self.assertEqual({course_id for course_id, _ in self.db.unscheduled}, course_ids)
+
+    def test_deleted_course_leaves_no_sessions(self):
+        self.db.delete_course(1)
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) FROM timetable WHERE course_id = 1"),
+                         [(0,)])
+
+    def test_auto_repair_can_be_turned_off(self):
+        self.db.auto_repair = False
+        course_id = self.db.add_course('CSE402', 'Networks', 2, 'CSE', 2)
+        self.assertEqual(self.db.execute_query(
+            "SELECT COUNT(*) FROM timetable WHERE course_id = ?", (course_id,)), [(0,)])
+
+        self.assertEqual(self.db.repair_timetable([course_id]), 2)
+        self.assertClashFree()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Min-cost room matching"""
+import itertools
+import random
+import unittest
+
+import campus_scheduler
+from test_scheduler import ClashAssertions, make_problem
+
+
+class FlowNetworkTest(unittest.TestCase):
+    def assignment(self, costs):
+        """Solve a square assignment problem; returns (total cost, column of each row)"""
+        n = len(costs)
+        network = campus_scheduler.FlowNetwork(2 * n + 2)
+        source, sink = 2 * n, 2 * n + 1
+        edges = {}
+        for i in range(n):
+            network.add_edge(source, i, 1)
+            network.add_edge(n + i, sink, 1)
+            for j in range(n):
+                edges[i, j] = network.add_edge(i, n + j, 1, costs[i][j])
+        sent = network.solve(source, sink, n)
+        columns = [j for i in range(n) for j in range(n) if network.flow(edges[i, j])]
+        return sent, sum(costs[i][j] for i, j in enumerate(columns)), columns
+
+    def test_matches_brute_force_on_random_assignments(self):
+        rng = random.Random(11)
+        for _ in range(30):
+            n = rng.randint(1, 6)
+            costs = [[rng.randint(0, 9) for _ in range(n)] for _ in range(n)]
+            sent, total, columns = self.assignment(costs)
+            self.assertEqual(sent, n)
+            self.assertEqual(sorted(columns), list(range(n)))
+            best = min(sum(costs[i][j] for i, j in enumerate(p)) for p in itertools.permutations(range(n)))
+            self.assertEqual(total, best)
+
+    def test_stops_at_the_limit_or_when_nothing_more_fits(self):
+        network = campus_scheduler.FlowNetwork(3)
+        cheap = network.add_edge(0, 1, 5, 1)
+        network.add_edge(1, 2, 3, 0)
+        dear = network.add_edge(0, 2, 4, 10)
+        self.assertEqual(network.solve(0, 2, 5), 5)
+        self.assertEqual((network.flow(cheap), network.flow(dear)), (3, 2))
+
+        network = campus_scheduler.FlowNetwork(2)
+        network.add_edge(0, 1, 2, 0)
+        self.assertEqual(network.solve(0, 1, 10), 2)
+
+
+class MatchRoomsTest(ClashAssertions, unittest.TestCase):
+    def solved(self, match):
+        courses, rooms = make_problem(courses=120, rooms=14, faculty=30)
+        rooms = [room[:4] + (f'Block {room[0] % 3}',) for room in rooms]
+        solver = campus_scheduler.TimetableSolver(courses, rooms, {('CSE', 2): 45}, seed=4)
+        if not match:
+            solver.match_rooms = lambda progress=None: None
+        solver.solve()
+        return courses, solver
+
+    def test_matching_keeps_slots_and_lowers_the_penalty(self):
+        courses, unmatched = self.solved(match=False)
+        _, matched = self.solved(match=True)
+
+        self.assertClashFree(matched.entries(), courses)
+        self.assertEqual(sorted((row[0], row[3], row[4]) for row in matched.entries()),
+                         sorted((row[0], row[3], row[4]) for row in unmatched.entries()))
+        self.assertLessEqual(matched.score(), unmatched.score())
+
+
+if __name__ == '__main__':
+    unittest.main()
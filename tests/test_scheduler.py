@@ -0,0 +1,138 @@
+"""Constraint-based timetable construction"""
+import os
+import random
+import tempfile
+import unittest
+from collections import Counter
+
+import campus_scheduler
+from campus_db import DatabaseManager
+
+
+def make_problem(courses=60, rooms=8, faculty=12, seed=7):
+    rng = random.Random(seed)
+    course_rows = [(i, f"{rng.choice(['CSE', 'ECE'])}{rng.randint(1, 4)}0{i % 10}", f"Course {i}",
+                    rng.randint(1, 3), rng.choice(['CSE', 'ECE']), rng.randint(1, faculty),
+                    'Lab' if i % 10 == 0 else 'Classroom')
+                   for i in range(1, courses + 1)]
+    room_rows = [(i, f"R-{i}", rng.choice([30, 60, 120]), 'Lab' if i == 1 else 'Classroom', 'Main')
+                 for i in range(1, rooms + 1)]
+    return course_rows, room_rows
+
+
+class ClashAssertions:
+    def assertClashFree(self, entries, courses):
+        cohorts = {row[0]: (row[4], campus_scheduler.course_level(row[1])) for row in courses}
+        for what, key in (('room', lambda r: (r[2], r[3], r[4])),
+                          ('faculty', lambda r: (r[1], r[3], r[4])),
+                          ('cohort', lambda r: (cohorts[r[0]], r[3], r[4]))):
+            clashes = [k for k, n in Counter(map(key, entries)).items() if n > 1]
+            self.assertEqual(clashes, [], f"{what} double booked")
+
+
+class TimetableSolverTest(ClashAssertions, unittest.TestCase):
+    def test_solution_has_no_clashes(self):
+        courses, rooms = make_problem()
+        solver = campus_scheduler.TimetableSolver(courses, rooms)
+        entries = solver.solve()
+
+        self.assertClashFree(entries, courses)
+        credits = sum(max(row[3], 1) for row in courses)
+        self.assertEqual(len(entries) + len(solver.unscheduled), credits)
+
+    def test_rooms_match_type_and_capacity(self):
+        courses, rooms = make_problem()
+        sizes = {('CSE', 2): 50, ('ECE', 3): 100}
+        entries = campus_scheduler.TimetableSolver(courses, rooms, sizes).solve()
+
+        room_by_id = {row[0]: row for row in rooms}
+        course_by_id = {row[0]: row for row in courses}
+        for course_id, _, room_id, _, _ in entries:
+            course, room = course_by_id[course_id], room_by_id[room_id]
+            self.assertEqual(room[3], course[6])
+            cohort = (course[4], campus_scheduler.course_level(course[1]))
+            self.assertGreaterEqual(room[2], sizes.get(cohort, 0))
+
+    def test_sessions_without_a_room_are_reported_not_double_booked(self):
+        courses = [(1, 'CSE101', 'Intro', 2, 'CSE', 1, 'Lab'),
+                   (2, 'CSE102', 'Systems', 1, 'CSE', 2, 'Classroom')]
+        rooms = [(1, 'A-101', 40, 'Classroom', 'Main')]
+        solver = campus_scheduler.TimetableSolver(courses, rooms)
+        entries = solver.solve()
+
+        self.assertEqual([row[0] for row in entries], [2])
+        self.assertEqual([course_id for course_id, _ in solver.unscheduled], [1, 1])
+
+    def test_overloaded_faculty_is_not_double_booked(self):
+        # One teacher, more sessions than there are slots in the week
+        courses = [(i, f'CSE10{i}', f'C{i}', 3, 'CSE', 1, 'Classroom') for i in range(1, 11)]
+        rooms = [(i, f'R-{i}', 40, 'Classroom', 'Main') for i in range(1, 4)]
+        solver = campus_scheduler.TimetableSolver(courses, rooms)
+        entries = solver.solve()
+
+        self.assertClashFree(entries, courses)
+        self.assertEqual(len(entries), campus_scheduler.SLOT_COUNT)
+        self.assertEqual(len(solver.unscheduled), 30 - campus_scheduler.SLOT_COUNT)
+
+
+class OptimiseTest(ClashAssertions, unittest.TestCase):
+    def test_improve_never_introduces_a_clash(self):
+        courses, rooms = make_problem()
+        solver = campus_scheduler.TimetableSolver(courses, rooms, seed=3)
+        solver.solve()
+        placed = len(solver.entries())
+
+        solver.improve(5000)
+
+        self.assertClashFree(solver.entries(), courses)
+        self.assertGreaterEqual(len(solver.entries()), placed)
+
+    def test_search_is_reproducible_for_a_seed(self):
+        courses, rooms = make_problem()
+        first = campus_scheduler.run_search(courses, rooms, {}, 5, 2000)
+        second = campus_scheduler.run_search(courses, rooms, {}, 5, 2000)
+        self.assertEqual(first.entries, second.entries)
+        self.assertEqual(first.score, second.score)
+
+    def test_optimise_keeps_the_best_start(self):
+        courses, rooms = make_problem()
+        results = [campus_scheduler.run_search(courses, rooms, {}, seed, 2000) for seed in range(3)]
+
+        best = campus_scheduler.optimise(courses, rooms, {}, starts=3, workers=2, seed=0,
+                                         time_budget=60, iterations=2000)
+
+        self.assertEqual(best.score, min(result.score for result in results))
+        self.assertClashFree(best.entries, courses)
+
+
+class GenerateTimetableTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_sample_data_gets_one_session_per_credit(self):
+        count = self.db.generate_timetable()
+
+        credits = sum(max(row[3] or 1, 1) for row in self.db.get_all_courses())
+        self.assertEqual(count + len(self.db.unscheduled), credits)
+        for what, column in (('room', 'room_id'), ('faculty', 'faculty_id')):
+            clashes = self.db.execute_query(f'''SELECT {column}, day, slot_id FROM timetable
+                                               GROUP BY {column}, day, slot_id HAVING COUNT(*) > 1''')
+            self.assertEqual(clashes, [], f"{what} double booked")
+
+    def test_optimise_timetable_writes_the_best_result(self):
+        count = self.db.optimise_timetable(starts=2, workers=1, time_budget=0.5)
+
+        self.assertEqual(len(self.db.get_timetable()), count)
+        self.assertEqual(self.db.last_score['unscheduled'], len(self.db.unscheduled))
+
+    def test_courses_have_a_room_type(self):
+        self.assertEqual(self.db.execute_query("SELECT DISTINCT room_type FROM courses"), [('Classroom',)])
+
+
+if __name__ == '__main__':
+    unittest.main()
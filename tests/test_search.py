@@ -0,0 +1,63 @@
+"""Full-text search and column filters"""
+import os
+import tempfile
+import unittest
+
+from campus_db import DatabaseManager
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def names(self, table, search=None, filters=None):
+        return sorted(row[1] for row in self.db.get_page(table, 100, search=search, filters=filters))
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        if not self.db.full_text:
+            self.skipTest("SQLite built without FTS5")
+        student_id = self.db.add_student('Zora Quill', 'ECE', 1, 'zora@college.edu')
+        self.assertEqual(self.names('students', 'quill'), ['Zora Quill'])
+
+        self.db.execute_query("UPDATE students SET name = 'Zora Vance' WHERE student_id = ?", (student_id,))
+        self.assertEqual(self.names('students', 'quill'), [])
+        self.assertEqual(self.names('students', 'vance'), ['Zora Vance'])
+
+        self.db.delete_student(student_id)
+        self.assertEqual(self.names('students', 'vance'), [])
+        self.assertEqual(self.db.execute_query(
+            "SELECT COUNT(*) FROM students_fts WHERE students_fts MATCH 'zora'"), [(0,)])
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.db.add_student('Zora Quill', 'ECE', 1, 'zora@college.edu')
+        self.db.add_student('Zora Brook', 'ECE', 1, 'brook@college.edu')
+
+        self.assertEqual(self.names('students', 'zor'), ['Zora Brook', 'Zora Quill'])
+        self.assertEqual(self.names('students', 'zo qui'), ['Zora Quill'])
+        self.assertEqual(self.db.count_rows('students', 'zora'), 2)
+
+    def test_like_fallback_finds_the_same_rows(self):
+        self.db.add_room('Physics Lab 2', 30, 'Lab', 'Science Block')
+        expected = self.names('rooms', 'science')
+        self.db.full_text = False
+        self.assertEqual(self.names('rooms', 'science'), expected)
+        self.assertEqual(expected, ['Physics Lab 2'])
+
+    def test_filters_combine_with_search(self):
+        self.db.add_student('Zora Quill', 'ECE', 1, 'zora@college.edu')
+        self.db.add_student('Zora Brook', 'CSE', 3, 'brook@college.edu')
+
+        self.assertEqual(self.names('students', 'zora', {'department': 'CSE'}), ['Zora Brook'])
+        self.assertEqual(self.names('students', 'zora', {'department': ''}), ['Zora Brook', 'Zora Quill'])
+        self.assertIn('ECE', self.db.get_filter_values('students', 'department'))
+        with self.assertRaises(ValueError):
+            self.db.get_page('students', 10, filters={'email': 'x'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Dashboard statistics"""
+import os
+import tempfile
+import unittest
+
+import campus_scheduler
+from campus_db import DatabaseManager
+
+
+class StatsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'campus.db')
+        self.db = DatabaseManager(self.path)
+        self.db.generate_timetable()
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_counts_match_the_tables(self):
+        stats = self.db.get_stats()
+
+        self.assertEqual(stats['students'], len(self.db.get_all_students()))
+        self.assertEqual(stats['faculty'], len(self.db.get_all_faculty()))
+        self.assertEqual(stats['courses'], len(self.db.get_all_courses()))
+        self.assertEqual(stats['rooms'], len(self.db.get_all_rooms()))
+        self.assertEqual(stats['sessions'], len(self.db.get_timetable()))
+        self.assertEqual(sum(d['students'] for d in stats['departments'].values()), stats['students'])
+        self.assertAlmostEqual(stats['room_utilisation'],
+                               100.0 * stats['sessions'] / (stats['rooms'] * campus_scheduler.SLOT_COUNT))
+        self.assertEqual(stats['conflicts'], 0)
+
+    def test_double_bookings_are_counted(self):
+        # A legacy clash written behind the manager's back: same room, other faculty
+        course_id, faculty_id, room_id, day, slot_id, version_id = self.db.execute_query(
+            "SELECT course_id, faculty_id, room_id, day, slot_id, version_id FROM timetable LIMIT 1")[0]
+        other = self.db.execute_query("SELECT faculty_id FROM faculty WHERE faculty_id != ? LIMIT 1",
+                                      (faculty_id,))[0][0]
+        self.db.execute_query('''INSERT INTO timetable (course_id, faculty_id, room_id, day, slot_id, version_id)
+                              VALUES (?, ?, ?, ?, ?, ?)''', (course_id, other, room_id, day, slot_id, version_id))
+
+        self.assertGreaterEqual(self.db.get_stats()['conflicts'], 1)
+
+    def test_cached_until_another_connection_writes(self):
+        first = self.db.get_stats()
+        self.assertIs(self.db.get_stats(), first)
+
+        other = DatabaseManager(self.path)
+        try:
+            other.add_student('Remote Student', 'MECH', 1, 'remote@college.edu')
+        finally:
+            other.close()
+
+        stats = self.db.get_stats()
+        self.assertEqual(stats['students'], first['students'] + 1)
+        self.assertEqual(stats['departments']['MECH']['students'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
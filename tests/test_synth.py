@@ -0,0 +1,76 @@
+"""Synthetic campus generator and benchmark harness"""
+import os
+import tempfile
+import unittest
+
+import campus_bench
+import campus_scheduler
+import campus_synth
+from campus_db import DatabaseManager
+
+
+class SynthTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def campus(self, name, students, seed):
+        db = DatabaseManager(os.path.join(self.directory.name, name), cache_entries=0)
+        counts = campus_synth.generate_campus(db, students, seed)
+        return db, counts
+
+    def test_same_seed_gives_the_same_campus(self):
+        first, counts = self.campus('a.db', 600, 3)
+        second, _ = self.campus('b.db', 600, 3)
+        try:
+            self.assertEqual(counts['students'], 600)
+            for table in ('students', 'faculty', 'courses', 'rooms'):
+                self.assertEqual(first.execute_query(f"SELECT * FROM {table}"),
+                                 second.execute_query(f"SELECT * FROM {table}"), table)
+        finally:
+            first.close()
+            second.close()
+
+    def test_campus_can_be_timetabled(self):
+        db, counts = self.campus('c.db', 800, 1)
+        try:
+            for code, in db.execute_query("SELECT course_code FROM courses"):
+                self.assertIn(campus_scheduler.course_level(code), range(1, campus_synth.YEARS + 1))
+            sessions = db.generate_timetable()
+            self.assertEqual(db.unscheduled, [])
+            load = sessions / (counts['rooms'] * campus_scheduler.SLOT_COUNT)
+            # The sample rows of a new database nudge it a little over the target
+            self.assertAlmostEqual(load, campus_synth.ROOM_LOAD, delta=0.05)
+        finally:
+            db.close()
+
+
+class BenchTest(unittest.TestCase):
+    def test_small_run_reports_every_timing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            result = campus_bench.bench_scale(300, 0, 2, directory, lambda message: None)
+            self.assertEqual(os.listdir(directory), [])
+        self.assertEqual(result['scale'], 300)
+        for name in ('insert', 'get_all_students', 'get_all_students_cached', 'generate_timetable',
+                     'stats', 'stats_cached', 'search'):
+            self.assertGreaterEqual(result['timings'][name], 0, name)
+
+    def test_clear_cache_forces_fresh_reads(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db = DatabaseManager(os.path.join(directory, 'campus.db'))
+            try:
+                stats = db.get_stats()
+                db.get_all_rooms()
+                db.clear_cache()
+                self.assertIsNot(db.get_stats(), stats)
+                misses = db.cache_stats()['misses']
+                db.get_all_rooms()
+                self.assertEqual(db.cache_stats()['misses'], misses + 1)
+            finally:
+                db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
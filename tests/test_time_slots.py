@@ -0,0 +1,88 @@
+"""Day numbers and time_slots ids in the timetable, and slots of any length"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from campus_db import DatabaseManager
+from test_migrations import make_baseline_database
+
+
+class SlotMigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'campus.db')
+        make_baseline_database(self.path)
+        conn = sqlite3.connect(self.path)
+        # An off-grid session and a zero-padded spelling of a grid slot
+        conn.executemany("INSERT INTO timetable VALUES (?, ?, ?, ?, ?, ?)",
+                         [(4, 2, 2, 2, 'Friday', '12:30-1:45'), (5, 2, 2, 2, 'Thursday', '09:00-10:00')])
+        conn.commit()
+        conn.close()
+        self.db = DatabaseManager(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_days_and_slots_become_numbers(self):
+        self.assertEqual(self.db.execute_query(
+            "SELECT timetable_id, day, slot_id FROM timetable ORDER BY timetable_id"),
+            [(1, 0, 1), (2, 2, 4), (3, 1, 3), (4, 4, 6), (5, 3, 1)])
+
+    def test_off_grid_label_gets_its_own_slot(self):
+        self.assertIn((6, '12:30-1:45', 750, 825), self.db.get_time_slots())
+
+    def test_overlap_with_an_off_grid_session_is_refused(self):
+        # Room 2 holds Friday 12:30-1:45, which overlaps the 1:00-2:00 hour
+        slot_id = self.db.add_time_slot('13:00', '14:00')
+        with self.assertRaises(ValueError):
+            self.db.add_timetable_entry(1, 2, 'Friday', slot_id)
+
+
+class TimeSlotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.directory.name, 'campus.db'))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_default_label_follows_the_grid_style(self):
+        slot_id = self.db.add_time_slot('14:00', '15:30')
+        self.assertIn((slot_id, '2:00-3:30', 840, 930), self.db.get_time_slots())
+        slot_id = self.db.add_time_slot('7:00', '7:50')
+        self.assertIn((slot_id, '07:00-07:50', 420, 470), self.db.get_time_slots())
+
+    def test_existing_range_returns_its_slot(self):
+        slot_id = self.db.add_time_slot('14:00', '15:30')
+        count = len(self.db.get_time_slots())
+        self.assertEqual(self.db.add_time_slot('14:00', '15:30', label='Long lab'), slot_id)
+        self.assertEqual(self.db.add_time_slot('9:00', '10:00'), 1)
+        self.assertEqual(len(self.db.get_time_slots()), count)
+
+    def test_label_in_use_is_refused(self):
+        with self.assertRaises(ValueError):
+            self.db.add_time_slot('6:00', '6:30', label='9:00-10:00')
+        with self.assertRaises(ValueError):
+            self.db.add_time_slot('15:00', '14:00')
+
+    def test_range_is_unique_in_the_schema(self):
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db.execute_query("INSERT INTO time_slots (label, start_minute, end_minute) "
+                                  "VALUES ('Morning', 540, 600)")
+
+    def test_find_sessions_by_day_and_range(self):
+        self.db.generate_timetable()
+        sessions = self.db.find_sessions(days=['Monday'], start='9:30', end='10:00')
+        self.assertTrue(sessions)
+        for session in sessions:
+            self.assertEqual(session[5], 'Monday')
+            self.assertLess(session[8], 600)
+            self.assertGreater(session[9], 570)
+        self.assertEqual(len(self.db.find_sessions()), len(self.db.get_timetable()))
+
+
+if __name__ == '__main__':
+    unittest.main()
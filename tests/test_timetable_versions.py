@@ -0,0 +1,139 @@
+"""Timetable versions: pointer switches, repair on restore and cache freshness"""
+import os
+import tempfile
+import unittest
+
+from campus_db import DatabaseManager
+from test_migrations import BASELINE_ROWS, make_baseline_database
+
+
+class TimetableVersionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'campus.db')
+        self.db = DatabaseManager(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def session_count(self, version_id=None):
+        if version_id is None:
+            return self.db.get_stats()['sessions']
+        return self.db.execute_query("SELECT COUNT(*) FROM timetable WHERE version_id = ?",
+                                     (version_id,), cache=False)[0][0]
+
+    def delete_busiest_room(self):
+        room_id = self.db.execute_query('''SELECT room_id FROM timetable GROUP BY room_id
+                                        ORDER BY COUNT(*) DESC LIMIT 1''')[0][0]
+        self.db.delete_room(room_id)
+        return room_id
+
+    def test_activate_only_moves_the_pointer(self):
+        self.db.generate_timetable()
+        old = self.db.active_timetable_version()
+        self.db.generate_timetable()
+        self.delete_busiest_room()
+        kept = self.session_count(old)
+
+        self.assertEqual(self.db.activate_timetable_version(old), old)
+
+        self.assertEqual(self.db.active_timetable_version(), old)
+        self.assertEqual(self.session_count(old), kept)
+        self.assertEqual(self.session_count(), kept)
+
+    def test_restore_with_repair_leaves_the_kept_version_alone(self):
+        self.db.generate_timetable()
+        old = self.db.active_timetable_version()
+        expected = self.session_count()
+        self.db.generate_timetable()
+        room_id = self.delete_busiest_room()
+        kept = self.session_count(old)
+        self.assertLess(kept, expected)
+
+        restored = self.db.activate_timetable_version(old, repair=True)
+
+        self.assertNotEqual(restored, old)
+        self.assertEqual(self.db.active_timetable_version(), restored)
+        self.assertEqual(self.session_count(old), kept)
+        self.assertEqual(self.db.courses_short_of_sessions(), [])
+        self.assertEqual(self.session_count(), expected)
+        self.assertEqual(len(self.db.get_timetable()), expected)
+        self.assertFalse(self.db.execute_query(
+            "SELECT 1 FROM timetable WHERE room_id = ?", (room_id,)))
+
+    def test_restore_reports_courses_without_faculty(self):
+        self.db.generate_timetable()
+        old = self.db.active_timetable_version()
+        self.db.generate_timetable()
+
+        self.db.delete_faculty(1)
+        self.db.activate_timetable_version(old, repair=True)
+
+        orphaned = [row[0] for row in self.db.execute_query(
+            "SELECT course_id FROM courses WHERE faculty_id IS NULL")]
+        self.assertTrue(orphaned)
+        self.assertEqual(sorted(self.db.unscheduled),
+                         [(course_id, "No faculty assigned") for course_id in orphaned])
+        self.assertEqual(self.session_count(), len(self.db.get_timetable()))
+
+    def test_new_database_starts_without_versions(self):
+        self.assertEqual(self.db.get_timetable_versions(), [])
+        self.assertIsNone(self.db.active_timetable_version())
+        self.assertEqual(self.db.get_timetable(), [])
+
+        self.db.generate_timetable()
+        self.assertEqual([(row[2], row[6]) for row in self.db.get_timetable_versions()],
+                         [('generated', 1)])
+
+    def test_diff_and_prune(self):
+        self.db.generate_timetable()
+        entry = self.db.get_timetable()[0][0]
+        snapshot = self.db.snapshot_timetable()
+        self.db.delete_timetable_entry(entry)
+
+        diff = self.db.diff_timetable_versions(snapshot)
+        self.assertEqual((len(diff['moved']), len(diff['added']), len(diff['removed'])), (0, 0, 1))
+
+        for _ in range(3):
+            self.db.generate_timetable()
+        active = self.db.active_timetable_version()
+        self.assertEqual(len(self.db.prune_timetable_versions(1)), 3)
+        self.assertIn(active, [row[0] for row in self.db.get_timetable_versions()])
+        self.assertEqual(len(self.db.get_timetable_versions()), 2)
+
+    def test_switch_by_another_connection_reaches_the_cache(self):
+        self.db.generate_timetable()
+        first = self.db.active_timetable_version()
+        other = DatabaseManager(self.path)
+        try:
+            second = other.snapshot_timetable()
+            other.activate_timetable_version(second)
+        finally:
+            other.close()
+
+        self.assertEqual(self.db.active_timetable_version(), second)
+        course_id = self.db.add_course('CSE999', 'Seminar', 1, 'CSE', 2)
+        versions = dict(self.db.execute_query(
+            "SELECT version_id, COUNT(*) FROM timetable WHERE course_id = ? GROUP BY version_id",
+            (course_id,)))
+        self.assertEqual(list(versions), [second])
+        self.assertNotIn(first, versions)
+
+
+class VersionMigrationTest(unittest.TestCase):
+    def test_existing_timetable_becomes_version_one(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'campus.db')
+            make_baseline_database(path)
+            db = DatabaseManager(path)
+            try:
+                self.assertEqual([(row[0], row[2], row[3], row[6]) for row in db.get_timetable_versions()],
+                                 [(1, 'migrated', len(BASELINE_ROWS['timetable']), 1)])
+                self.assertEqual(len(db.get_timetable()), len(BASELINE_ROWS['timetable']))
+            finally:
+                db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()